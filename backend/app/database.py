@@ -31,4 +31,6 @@ def init_db():
     """Initialize database tables."""
     # Import models to register them with Base
     from .models.user import User, Graphic
+    from .models.order_line import OrderLine
+    from .models.photo_ref import PhotoRef
     Base.metadata.create_all(bind=engine)
@@ -5,6 +5,8 @@ Utility functions for layout engine.
 from typing import List
 import math
 
+from ..utils.text_fit import wrap_lines
+
 
 def pt_to_mm(pt: float) -> float:
     """
@@ -40,8 +42,9 @@ def wrap_text(text: str, max_width_mm: float, font_size_pt: float, font_family:
     """
     Wrap text to fit within a maximum width.
     
-    This is a simplified version that splits on newlines and estimates character width.
-    For production, you might want to use a proper text measurement library.
+    Explicit newlines are kept; each paragraph is then word-wrapped using real
+    font metrics (see app.utils.text_fit). Families not registered with
+    ReportLab are measured with the closest core font.
     
     Args:
         text: Text to wrap
@@ -52,14 +55,7 @@ def wrap_text(text: str, max_width_mm: float, font_size_pt: float, font_family:
     Returns:
         List of text lines
     """
-    # First split on explicit newlines
-    lines = text.split('\n')
-    
-    # For now, return as-is (simple newline splitting)
-    # TODO: Implement proper word wrapping based on font metrics
-    # This would require measuring actual text width, which is complex without a font library
-    
-    return lines
+    return wrap_lines(text, font_family, font_size_pt, max_width_mm)
 
 
 def calculate_line_height(font_size_pt: float, line_spacing: float = 1.2) -> float:
@@ -2,11 +2,17 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from .settings import settings
-from .routers import catalog, ingest_amazon, jobs, assets, layout_engine, auth_router, graphics_router
+from .routers import catalog, ingest_amazon, jobs, pipeline, assets, layout_engine, auth_router, graphics_router
 from .database import init_db
-from .utils import sku_map
-import shutil
+from .utils import sku_map, http_pool, ingest_sessions
+from .utils.circuit_breaker import get_breaker
+from .utils.retry_queue import get_queue
+from .utils.janitor import get_janitor
+from .utils.storage import close_storage
+from .utils.job_paths import ShardedStaticFiles, migrate_all as migrate_job_dirs
+from .processors import render_pool
 import os
+import threading
 
 # Sentry error tracking
 import sentry_sdk
@@ -57,14 +63,15 @@ app.add_middleware(
 app.include_router(catalog.router, prefix=settings.API_PREFIX)
 app.include_router(ingest_amazon.router, prefix=settings.API_PREFIX)
 app.include_router(jobs.router, prefix=settings.API_PREFIX)
+app.include_router(pipeline.router, prefix=settings.API_PREFIX)
 app.include_router(assets.router, prefix=settings.API_PREFIX)
 app.include_router(layout_engine.router)  # Layout engine (has its own prefix)
 app.include_router(auth_router.router)  # Authentication
 app.include_router(graphics_router.router)  # Graphics management
 
-# Static mounts for previews and jobs artifacts
-app.mount("/static/previews", StaticFiles(directory=settings.PREVIEWS_DIR), name="previews")
-app.mount("/static/jobs", StaticFiles(directory=settings.JOBS_DIR), name="jobs")
+# Static mounts for previews and jobs artifacts (sharded on disk, see utils/job_paths.py)
+app.mount("/static/previews", ShardedStaticFiles(directory=settings.PREVIEWS_DIR), name="previews")
+app.mount("/static/jobs", ShardedStaticFiles(directory=settings.JOBS_DIR), name="jobs")
 app.mount("/static/uploads", StaticFiles(directory=settings.UPLOADS_DIR), name="uploads")
 app.mount("/static/storage", StaticFiles(directory=settings.DATA_DIR / "storage"), name="storage")
 app.mount("/static/photos", StaticFiles(directory=settings.PHOTOS_DIR), name="photos")
@@ -99,17 +106,19 @@ async def startup_event():
     """Initialize database tables on startup."""
     init_db()
     print("[STARTUP] Database initialized", flush=True)
-
-# Optionally clear photos cache on start
-try:
-    if settings.CLEAN_PHOTOS_ON_START and settings.PHOTOS_DIR.exists():
-        for p in settings.PHOTOS_DIR.iterdir():
-            if p.is_file():
-                p.unlink(missing_ok=True)
-            elif p.is_dir():
-                shutil.rmtree(p, ignore_errors=True)
-except Exception:
-    pass
+    if settings.JOB_DIR_SHARDING and settings.JOB_DIR_MIGRATE_ON_START:
+        threading.Thread(target=migrate_job_dirs, name="job-dir-migrate", daemon=True).start()
+    if settings.JANITOR_ENABLED:
+        get_janitor().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop batch render workers, background retries and the janitor, close pooled HTTP and S3 connections."""
+    render_pool.shutdown()
+    get_queue().shutdown()
+    get_janitor().shutdown()
+    http_pool.close_session()
+    close_storage()
 
 # Initialize SKU map (load once; start hot-reload if configured)
 try:
@@ -138,6 +147,11 @@ async def status():
         "service": "personaliser-api",
         "version": "1.0.3",  # Layout engine enabled
         "storage": settings.STORAGE_BACKEND,
+        "http_pool": http_pool.pool_stats(),
+        "download_hosts": get_breaker().snapshot(),
+        "download_retry_queue": get_queue().stats(),
+        "ingest_sessions": ingest_sessions.get_store().stats(),
+        "janitor": get_janitor().stats(),
         "timestamp": "2025-10-28T10:00:00Z"
     }
 
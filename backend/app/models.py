@@ -1,7 +1,7 @@
 from __future__ import annotations
 from pydantic import BaseModel, Field
 from enum import Enum
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 class Severity(str, Enum):
     info = "info"
@@ -51,19 +51,36 @@ class PlacedRect(Rect):
     y: float
 
 class GenerateRequest(BaseModel):
-    items: List[OrderItem]
+    # Either the items themselves, or the ingest_id an ingest returned plus
+    # optional indexes into its items (all of them when omitted)
+    items: List[OrderItem] = Field(default_factory=list)
+    ingest_id: Optional[str] = None
+    selection: Optional[List[int]] = None
     machine_id: str
     seed: Optional[int] = None
+    # Override settings.GROUP_BY_MATERIAL for this job
+    group_by_material: Optional[bool] = None
 
 class PreviewResponse(BaseModel):
     job_id: str
     preview_url: str
     warnings: List[QaWarning] = Field(default_factory=list)
 
+class BedPlanSummary(BaseModel):
+    beds: int = 0
+    changeovers: int = 0
+    # Cost of packing in input order without material grouping
+    ungrouped_beds: int = 0
+    ungrouped_changeovers: int = 0
+    groups: Dict[str, int] = Field(default_factory=dict)
+
 class GenerateResponse(BaseModel):
     job_id: str
     artifacts: List[str]
     warnings: List[QaWarning] = Field(default_factory=list)
+    # Expected material changeovers across all batch outputs (None for legacy path)
+    changeovers: Optional[int] = None
+    plans: Dict[str, BedPlanSummary] = Field(default_factory=dict)
 
 class IngestItem(BaseModel):
     order_ref: str
@@ -86,3 +103,20 @@ class IngestItem(BaseModel):
 class IngestResponse(BaseModel):
     items: List[IngestItem]
     warnings: List[QaWarning] = []
+    cache: Dict[str, int] = {}
+    skipped: int = 0  # rows served from the order-line index (mode=incremental)
+    ingest_id: Optional[str] = None  # pass to /jobs/generate instead of the items
+
+class IngestSource(BaseModel):
+    file: str  # upload name, or "<zip>/<member>" for reports inside a ZIP
+    row: int   # 0-based data row within that file
+
+class IngestFileSummary(BaseModel):
+    name: str
+    rows: int = 0
+    duplicates: int = 0  # rows already seen in an earlier file or row
+    error: Optional[str] = None
+
+class BatchIngestResponse(IngestResponse):
+    files: List[IngestFileSummary] = []
+    provenance: List[List[IngestSource]] = []  # aligned with items
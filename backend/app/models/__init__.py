@@ -27,17 +27,24 @@ PlacedRect = _models_module.PlacedRect
 GenerateRequest = _models_module.GenerateRequest
 PreviewResponse = _models_module.PreviewResponse
 GenerateResponse = _models_module.GenerateResponse
+BedPlanSummary = _models_module.BedPlanSummary
 IngestItem = _models_module.IngestItem
 IngestResponse = _models_module.IngestResponse
+IngestSource = _models_module.IngestSource
+IngestFileSummary = _models_module.IngestFileSummary
+BatchIngestResponse = _models_module.BatchIngestResponse
 
 # Import new user/graphics models
 from .user import User, Graphic
+from .order_line import OrderLine
+from .photo_ref import PhotoRef
 
 __all__ = [
     # Existing models
     "Severity", "QaWarning", "LineField", "TextLine", "OrderItem",
     "Rect", "PlacedRect", "GenerateRequest", "PreviewResponse",
-    "GenerateResponse", "IngestItem", "IngestResponse",
+    "GenerateResponse", "BedPlanSummary", "IngestItem", "IngestResponse",
+    "IngestSource", "IngestFileSummary", "BatchIngestResponse",
     # New models
-    "User", "Graphic"
+    "User", "Graphic", "OrderLine", "PhotoRef"
 ]
@@ -0,0 +1,27 @@
+"""
+Order-line index for incremental Amazon report ingest.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint
+from ..database import Base
+
+
+class OrderLine(Base):
+    """One ingested report row, keyed by order id, SKU and row fingerprint."""
+
+    __tablename__ = "order_lines"
+    __table_args__ = (UniqueConstraint("order_id", "sku", "fingerprint", name="uq_order_line"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(String, index=True, nullable=False)
+    sku = Column(String, nullable=False, default="")
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the normalised row
+    status = Column(String, nullable=False, default="ingested")  # "ingested" | "failed"
+    item_json = Column(Text, nullable=False)  # IngestItem as JSON
+    warnings_json = Column(Text, nullable=False, default="[]")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<OrderLine(order_id='{self.order_id}', sku='{self.sku}', status='{self.status}')>"
@@ -0,0 +1,26 @@
+"""
+Order line -> photo blob references for content-addressed photo storage.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from ..database import Base
+
+
+class PhotoRef(Base):
+    """The photo blob an ingested order line points at."""
+
+    __tablename__ = "photo_refs"
+    __table_args__ = (UniqueConstraint("order_id", "sku", "fingerprint", name="uq_photo_ref"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(String, index=True, nullable=False)
+    sku = Column(String, nullable=False, default="")
+    fingerprint = Column(String(64), nullable=False)  # same key as order_lines
+    sha256 = Column(String(64), index=True, nullable=False)
+    blob_name = Column(String, nullable=False)  # "<sha256><ext>" under photos/
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<PhotoRef(order_id='{self.order_id}', sku='{self.sku}', blob='{self.blob_name}')>"
@@ -0,0 +1,174 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+
+# Material/colour grouping ahead of bed filling. Every material swap on the
+# flatbed (copper -> gold, slate blanks, ...) costs setup time, so items are
+# bucketed by material and each bucket fills its own beds.
+
+UNSPECIFIED = "unspecified"
+
+# Default print order; unknown materials follow in order of first appearance
+MATERIAL_PRIORITY: Dict[str, int] = {
+    "copper": 0,
+    "gold": 1,
+    "silver": 2,
+    "stone": 3,
+    "marble": 4,
+    "black": 5,
+    "slate": 6,
+    "brass": 7,
+    "aluminium": 8,
+}
+
+
+def material_key(item: Any) -> str:
+    """Normalised material for an item: explicit material if present, else SKU COLOUR."""
+    raw = getattr(item, "material", None) or getattr(item, "colour", None)
+    if raw is None and isinstance(item, dict):
+        raw = item.get("material") or item.get("colour")
+    key = (raw or "").strip().lower()
+    return key or UNSPECIFIED
+
+
+def group_by_material(items: List[Any], priority: Optional[Dict[str, int]] = None) -> List[Tuple[str, List[Any]]]:
+    """Bucket items by material, keeping input order inside each bucket."""
+    prio = MATERIAL_PRIORITY if priority is None else priority
+    buckets: Dict[str, List[Any]] = {}
+    first_seen: Dict[str, int] = {}
+    for idx, it in enumerate(items):
+        k = material_key(it)
+        if k not in buckets:
+            buckets[k] = []
+            first_seen[k] = idx
+        buckets[k].append(it)
+    order = sorted(buckets.keys(), key=lambda k: (prio.get(k, len(prio)), first_seen[k]))
+    return [(k, buckets[k]) for k in order]
+
+
+def count_changeovers(beds: List[List[str]]) -> int:
+    """Material swaps needed to print beds in order.
+
+    Each bed is the list of materials placed on it; a bed holding k materials
+    needs k loads. A changeover is counted whenever the material loaded differs
+    from the previous one.
+    """
+    changes = 0
+    current: Optional[str] = None
+    for mats in beds:
+        seen: List[str] = []
+        for m in mats:
+            if m not in seen:
+                seen.append(m)
+        # Start with the material already loaded if this bed uses it
+        if current in seen:
+            seen.remove(current)
+            seen.insert(0, current)
+        for m in seen:
+            if current is not None and m != current:
+                changes += 1
+            current = m
+    return changes
+
+
+def _chunk(items: List[Any], size: int) -> List[List[Any]]:
+    size = max(1, int(size))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+@dataclass
+class BedPlan:
+    """Beds in print order, each as (material, items). Mixed beds use material "mixed"."""
+    beds: List[Tuple[str, List[Any]]] = field(default_factory=list)
+    changeovers: int = 0
+    # What packing without grouping would have cost, for comparison
+    ungrouped_beds: int = 0
+    ungrouped_changeovers: int = 0
+
+    def summary(self) -> Dict[str, Any]:
+        groups: Dict[str, int] = {}
+        for mat, its in self.beds:
+            groups[mat] = groups.get(mat, 0) + len(its)
+        return {
+            "beds": len(self.beds),
+            "changeovers": self.changeovers,
+            "ungrouped_beds": self.ungrouped_beds,
+            "ungrouped_changeovers": self.ungrouped_changeovers,
+            "groups": groups,
+        }
+
+
+def plan_beds(
+    items: List[Any],
+    capacity: int,
+    *,
+    grouped: bool = True,
+    priority: Optional[Dict[str, int]] = None,
+) -> BedPlan:
+    """Split items into beds of at most `capacity` slots.
+
+    With grouped=True every material bucket starts on a fresh bed, trading a
+    partly filled last bed per material for one changeover per material.
+    With grouped=False items are chunked in input order (legacy behaviour).
+    """
+    mixed = _chunk(list(items), capacity) if items else []
+    ungrouped_beds = len(mixed)
+    ungrouped_changeovers = count_changeovers([[material_key(it) for it in bed] for bed in mixed])
+
+    plan = BedPlan(ungrouped_beds=ungrouped_beds, ungrouped_changeovers=ungrouped_changeovers)
+    if not grouped:
+        for bed in mixed:
+            mats = {material_key(it) for it in bed}
+            plan.beds.append((mats.pop() if len(mats) == 1 else "mixed", bed))
+        plan.changeovers = ungrouped_changeovers
+        return plan
+
+    bed_mats: List[List[str]] = []
+    for mat, bucket in group_by_material(list(items), priority):
+        for bed in _chunk(bucket, capacity):
+            plan.beds.append((mat, bed))
+            bed_mats.append([mat])
+    plan.changeovers = count_changeovers(bed_mats)
+    return plan
+
+
+class BedFiller:
+    """plan_beds for items that arrive one at a time.
+
+    Items are bucketed per processor key (and per material when grouped);
+    add() returns a bed as soon as its bucket reaches the processor's
+    capacity, flush() returns what is left once the input ends. Bed contents
+    match what plan_beds would produce for the same items. A capacity of
+    None holds the whole bucket for flush(), for processors that paginate
+    themselves.
+    """
+
+    def __init__(self, capacity_for: Callable[[str], Optional[int]], *, grouped: bool = True) -> None:
+        self._capacity_for = capacity_for
+        self._capacity: Dict[str, Optional[int]] = {}
+        self.grouped = grouped
+        self._buckets: Dict[Tuple[str, str], List[Any]] = {}
+
+    def _label(self, material: str, bed: List[Any]) -> str:
+        if self.grouped:
+            return material
+        mats = {material_key(it) for it in bed}
+        return mats.pop() if len(mats) == 1 else "mixed"
+
+    def add(self, key: str, item: Any) -> Optional[Tuple[str, str, List[Any]]]:
+        """Add item for processor key; returns (key, material, items) when a bed fills."""
+        if key not in self._capacity:
+            self._capacity[key] = self._capacity_for(key)
+        material = material_key(item) if self.grouped else ""
+        bucket = self._buckets.setdefault((key, material), [])
+        bucket.append(item)
+        capacity = self._capacity[key]
+        if capacity is None or len(bucket) < max(1, capacity):
+            return None
+        del self._buckets[(key, material)]
+        return key, self._label(material, bucket), bucket
+
+    def flush(self) -> List[Tuple[str, str, List[Any]]]:
+        beds = [(key, self._label(material, bucket), bucket) for (key, material), bucket in self._buckets.items()]
+        self._buckets.clear()
+        return beds
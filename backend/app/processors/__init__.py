@@ -1,8 +1,2 @@
-# Import all processors to register them
-from . import text_only_v1
-from . import photo_basic_v1
-from . import uv_regular_v1
-# from . import regular_stake_v1  # Temporarily disabled - using PDF version
-from . import regular_stake_pdf_v1
-# from . import photo_stakes_v1  # Temporarily disabled - using PDF version
-from . import photo_stakes_pdf_v1
\ No newline at end of file
+# Processors are loaded lazily by item_router on first lookup
+# (see item_router.PROCESSOR_MODULES / BATCH_PROCESSOR_MODULES).
@@ -1,21 +1,51 @@
 from __future__ import annotations
 from typing import Callable, Dict, Tuple, List
+import importlib
+import sys
+import logging
+import threading
 from ..models import OrderItem
 from ..models import IngestItem
 
 print("[ITEM_ROUTER] Module loaded - using PDF processor for photo stakes", flush=True)
 
+logger = logging.getLogger(__name__)
+
 RenderFn = Callable[[OrderItem], str]
 
 _registry: Dict[Tuple[str, str], RenderFn] = {}
 BatchProcessorFn = Callable[[List[IngestItem], dict], Tuple[str, str, list[str]]]
 _batch_registry: Dict[str, BatchProcessorFn] = {}
 
+# Declarative processor registry: key -> module path (relative to this package).
+# Modules are imported on first lookup and register themselves on import, so
+# ReportLab, svgwrite and font loading only happen for processors actually used.
+PROCESSOR_MODULES: Dict[Tuple[str, str], str] = {
+    ("uv_regular", "1.0.0"): ".uv_regular_v1",
+}
+BATCH_PROCESSOR_MODULES: Dict[str, str] = {
+    "text_only_v1": ".text_only_v1",
+    "photo_basic_v1": ".photo_basic_v1",
+    # "regular_stake_v1": ".regular_stake_v1",  # DISABLED - using PDF version
+    "regular_stake_pdf_v1": ".regular_stake_pdf_v1",
+    # "photo_stakes_v1": ".photo_stakes_v1",  # DISABLED - using PDF version
+    "photo_stakes_pdf_v1": ".photo_stakes_pdf_v1",
+}
+# Out-of-tree processors: entry point name is the batch key, value is either
+# "pkg.module" (self-registering) or "pkg.module:run" (the batch function).
+ENTRY_POINT_GROUP = "personaliser.processors"
+
+_load_lock = threading.RLock()
+_entry_points_cache: Dict[str, object] | None = None
+
+
 def register(name: str, version: str, fn: RenderFn) -> None:
     _registry[(name, version)] = fn
 
 def get(name: str, version: str) -> RenderFn:
     key = (name, version)
+    if key not in _registry and key in PROCESSOR_MODULES:
+        _import_processor(PROCESSOR_MODULES[key])
     if key not in _registry:
         raise KeyError(f"Processor not found: {name} v{version}")
     return _registry[key]
@@ -24,10 +54,61 @@ def register_batch(key: str, fn: BatchProcessorFn) -> None:
     _batch_registry[key] = fn
 
 def get_batch(key: str) -> BatchProcessorFn:
+    fn = _batch_registry.get(key)
+    if fn is not None:
+        return fn
+    with _load_lock:
+        if key not in _batch_registry:
+            if key in BATCH_PROCESSOR_MODULES:
+                _import_processor(BATCH_PROCESSOR_MODULES[key])
+            else:
+                _load_entry_point(key)
     if key not in _batch_registry:
         raise KeyError(f"Batch processor not found: {key}")
     return _batch_registry[key]
 
+def batch_capacity(key: str) -> int | None:
+    """Items per bed for a batch processor (its module's BATCH_SIZE), if it declares one."""
+    module = sys.modules.get(getattr(get_batch(key), "__module__", ""))
+    size = getattr(module, "BATCH_SIZE", None)
+    return int(size) if size else None
+
+def available_batch() -> List[str]:
+    """Batch processor keys that can be loaded (without importing them)."""
+    keys = set(_batch_registry) | set(BATCH_PROCESSOR_MODULES) | set(_entry_points())
+    return sorted(keys)
+
+
+def _import_processor(module: str) -> None:
+    with _load_lock:
+        # Import registers the processor as a side effect; later calls hit the registry
+        importlib.import_module(module, __package__)
+        logger.info("processor module loaded: %s", module)
+
+
+def _entry_points() -> Dict[str, object]:
+    global _entry_points_cache
+    if _entry_points_cache is None:
+        found: Dict[str, object] = {}
+        try:
+            from importlib.metadata import entry_points
+            for ep in entry_points(group=ENTRY_POINT_GROUP):
+                found[ep.name] = ep
+        except Exception:
+            logger.exception("processor entry point discovery failed")
+        _entry_points_cache = found
+    return _entry_points_cache
+
+
+def _load_entry_point(key: str) -> None:
+    ep = _entry_points().get(key)
+    if ep is None:
+        return
+    obj = ep.load()  # type: ignore[attr-defined]
+    if callable(obj) and key not in _batch_registry:
+        register_batch(key, obj)
+
+
 def key_for_item(item) -> str:
     """
     Route items to appropriate processor based on SKU attributes.
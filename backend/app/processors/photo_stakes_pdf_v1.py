@@ -10,19 +10,20 @@ import gc
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 
 from ..models import IngestItem
 from ..settings import settings
+from ..utils.job_paths import job_url
 from .item_router import register_batch
 from .base import write_batch_csv
+from ..utils.text_fit import register_font, shrink_to_fit
+from ..packer.grouping import plan_beds
 
 # Register Georgia font
 FONTS_DIR = Path(__file__).resolve().parents[3] / "fonts"
 georgia_path = FONTS_DIR / "georgia.ttf"
 if georgia_path.exists():
-    pdfmetrics.registerFont(TTFont('Georgia', str(georgia_path)))
+    register_font('Georgia', str(georgia_path))  # also drops fallback metrics cached for Georgia
     print(f"[PHOTO PDF] Registered Georgia font from {georgia_path}", flush=True)
 else:
     print(f"[PHOTO PDF] WARNING: Georgia font not found at {georgia_path}", flush=True)
@@ -35,6 +36,7 @@ MEMORIAL_H_MM = 90.0
 COLS = 3
 ROWS = 3
 BATCH_SIZE = COLS * ROWS
+COLOUR_PRIORITY = {"copper": 0, "gold": 1, "silver": 2, "stone": 3, "marble": 4}
 
 # Centered grid layout
 X_OFF_MM = (PAGE_W_MM - (MEMORIAL_W_MM * COLS)) / 2.0
@@ -57,6 +59,9 @@ LINE3_Y_MM = 28.0
 LINE1_PT = 17
 LINE2_PT = 25
 LINE3_PT = 13
+MIN_PT = 9.0
+# Usable text width right of the photo (centred on TEXT_X_OFFSET_MM)
+TEXT_MAX_W_MM = 70.0
 
 # Font setup
 FONT_NAME = "Georgia"
@@ -147,17 +152,17 @@ def _add_photo_memorial(c: canvas.Canvas, x_mm: float, y_mm: float, item: Ingest
     
     # Field 1: Top (17pt)
     if l1:
-        c.setFont(FONT_NAME, LINE1_PT)
+        c.setFont(FONT_NAME, shrink_to_fit(l1, FONT_NAME, TEXT_MAX_W_MM, size_pt=LINE1_PT, min_size_pt=MIN_PT))
         c.drawCentredString(text_x_mm * mm, (y_mm + LINE1_Y_MM) * mm, l1)
     
     # Field 2: Center (25pt, bold)
     if l2:
-        c.setFont(FONT_NAME_BOLD, LINE2_PT)
+        c.setFont(FONT_NAME_BOLD, shrink_to_fit(l2, FONT_NAME_BOLD, TEXT_MAX_W_MM, size_pt=LINE2_PT, min_size_pt=MIN_PT))
         c.drawCentredString(text_x_mm * mm, (y_mm + LINE2_Y_MM) * mm, l2)
     
     # Field 3: Bottom (13pt)
     if l3:
-        c.setFont(FONT_NAME, LINE3_PT)
+        c.setFont(FONT_NAME, shrink_to_fit(l3, FONT_NAME, TEXT_MAX_W_MM, size_pt=LINE3_PT, min_size_pt=MIN_PT))
         c.drawCentredString(text_x_mm * mm, (y_mm + LINE3_Y_MM) * mm, l3)
 
 
@@ -173,46 +178,58 @@ def run(items: List[IngestItem], cfg: dict) -> Tuple[str, str, List[str]]:
     
     c = canvas.Canvas(str(pdf_path), pagesize=(PAGE_W_MM * mm, PAGE_H_MM * mm))
     
-    # White background
-    c.setFillColorRGB(1, 1, 1)
-    c.rect(0, 0, PAGE_W_MM * mm, PAGE_H_MM * mm, fill=1, stroke=0)
+    # Each colour gets its own beds (one PDF page per bed) to minimise changeovers
+    plan = plan_beds(
+        list(items),
+        BATCH_SIZE,
+        grouped=bool(cfg.get("group_by_material", settings.GROUP_BY_MATERIAL)),
+        priority=COLOUR_PRIORITY,
+    )
+    cfg["bed_plan"] = plan.summary()
     
     rows_csv: List[dict] = []
     
-    # Layout memorials in centered grid
-    for idx, item in enumerate(items):
-        if idx >= BATCH_SIZE:
-            break
-        col = idx % COLS
-        row = idx // COLS
-        x_mm = X_OFF_MM + col * MEMORIAL_W_MM
-        # PDF coordinates are bottom-up, so flip Y
-        y_mm = PAGE_H_MM - (Y_OFF_MM + (row + 1) * MEMORIAL_H_MM)
+    for bed_no, (_material, place) in enumerate(plan.beds or [("", [])], start=1):
+        if bed_no > 1:
+            c.showPage()
+        
+        # White background
+        c.setFillColorRGB(1, 1, 1)
+        c.rect(0, 0, PAGE_W_MM * mm, PAGE_H_MM * mm, fill=1, stroke=0)
         
-        _add_photo_memorial(c, x_mm, y_mm, item, idx)
+        # Layout memorials in centered grid
+        for idx, item in enumerate(place):
+            col = idx % COLS
+            row = idx // COLS
+            x_mm = X_OFF_MM + col * MEMORIAL_W_MM
+            # PDF coordinates are bottom-up, so flip Y
+            y_mm = PAGE_H_MM - (Y_OFF_MM + (row + 1) * MEMORIAL_H_MM)
+            
+            _add_photo_memorial(c, x_mm, y_mm, item, idx)
+            
+            l1, l2, l3 = _text_lines_map(item)
+            photo_url = getattr(item, 'photo_asset_url', None) or getattr(item, 'photo_url', None) or ""
+            rows_csv.append({
+                "bed": bed_no,
+                "order_ref": getattr(item, 'order_ref', ''),
+                "sku": getattr(item, 'sku', '') or "",
+                "graphics_key": getattr(item, 'graphics_key', '') or "",
+                "colour": getattr(item, 'colour', '') or "",
+                "type": getattr(item, 'product_type', '') or "",
+                "photo_url": photo_url,
+                "line_1": l1,
+                "line_2": l2,
+                "line_3": l3,
+                "cell_row": row,
+                "cell_col": col,
+            })
         
-        l1, l2, l3 = _text_lines_map(item)
-        photo_url = getattr(item, 'photo_asset_url', None) or getattr(item, 'photo_url', None) or ""
-        rows_csv.append({
-            "order_ref": getattr(item, 'order_ref', ''),
-            "sku": getattr(item, 'sku', '') or "",
-            "graphics_key": getattr(item, 'graphics_key', '') or "",
-            "colour": getattr(item, 'colour', '') or "",
-            "type": getattr(item, 'product_type', '') or "",
-            "photo_url": photo_url,
-            "line_1": l1,
-            "line_2": l2,
-            "line_3": l3,
-            "cell_row": row,
-            "cell_col": col,
-        })
-    
-    # Add reference marker (blue square at bottom-right)
-    ref_size_mm = 0.1
-    ref_x = PAGE_W_MM - ref_size_mm
-    ref_y = 0.1  # Bottom in PDF coordinates
-    c.setFillColorRGB(0, 0, 1)
-    c.rect(ref_x * mm, ref_y * mm, ref_size_mm * mm, ref_size_mm * mm, fill=1, stroke=0)
+        # Add reference marker (blue square at bottom-right)
+        ref_size_mm = 0.1
+        ref_x = PAGE_W_MM - ref_size_mm
+        ref_y = 0.1  # Bottom in PDF coordinates
+        c.setFillColorRGB(0, 0, 1)
+        c.rect(ref_x * mm, ref_y * mm, ref_size_mm * mm, ref_size_mm * mm, fill=1, stroke=0)
     
     c.save()
     
@@ -224,8 +241,8 @@ def run(items: List[IngestItem], cfg: dict) -> Tuple[str, str, List[str]]:
     gc.collect()
     
     # Return URLs
-    pdf_url = f"/static/jobs/{job_id}/{pdf_path.name}"
-    csv_url = f"/static/jobs/{job_id}/{csv_path.name}"
+    pdf_url = job_url(job_id, pdf_path.name)
+    csv_url = job_url(job_id, csv_path.name)
     
     return pdf_url, csv_url, []
 
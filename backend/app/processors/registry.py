@@ -0,0 +1,11 @@
+# Public alias for the processor registry; processors load lazily on lookup.
+from .item_router import (  # noqa: F401
+    register,
+    get,
+    register_batch,
+    get_batch,
+    available_batch,
+    key_for_item,
+    PROCESSOR_MODULES,
+    BATCH_PROCESSOR_MODULES,
+)
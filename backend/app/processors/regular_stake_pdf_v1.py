@@ -10,19 +10,20 @@ import gc
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 
 from ..models import IngestItem
 from ..settings import settings
+from ..utils.job_paths import job_url
 from .item_router import register_batch
 from .base import write_batch_csv
+from ..utils.text_fit import register_font, fit_text, shrink_to_fit
+from ..packer.grouping import plan_beds
 
 # Register Georgia font
 FONTS_DIR = Path(__file__).resolve().parents[3] / "fonts"
 georgia_path = FONTS_DIR / "georgia.ttf"
 if georgia_path.exists():
-    pdfmetrics.registerFont(TTFont('Georgia', str(georgia_path)))
+    register_font('Georgia', str(georgia_path))  # also drops fallback metrics cached for Georgia
     print(f"[REGULAR PDF] Registered Georgia font from {georgia_path}", flush=True)
 else:
     print(f"[REGULAR PDF] WARNING: Georgia font not found at {georgia_path}", flush=True)
@@ -50,6 +51,13 @@ LINE1_PT = 17 * 1.2  # 20.4pt
 LINE2_PT = 25 * 1.2  # 30pt
 LINE3_PT = 12 * 1.1  # 13.2pt
 
+# Text fitting (widths from font metrics)
+TEXT_MAX_W_MM = MEMORIAL_W_MM - 20.0
+LINE3_MAX_W_MM = MEMORIAL_W_MM * 0.6
+LINE3_MAX_LINES = 5
+LINE3_MIN_PT = LINE3_PT * 0.7
+MIN_PT = 10.0
+
 # Font setup
 FONT_NAME = "Georgia"
 
@@ -72,44 +80,23 @@ def _text_lines_map(it: Any) -> Tuple[str, str, str]:
 
 def _wrap_line3(text: str) -> Tuple[List[str], float]:
     """Wrap line 3 text and determine font size"""
-    PT_TO_MM = 0.2645833333
-    base_pt = LINE3_PT
-    font_mm = base_pt * PT_TO_MM
-    char_w_mm = 0.5 * font_mm
-    max_line_mm = MEMORIAL_W_MM * 0.6
-    max_chars = max(1, int(max_line_mm / char_w_mm))
-    
-    words = (text or "").split()
-    lines: List[str] = []
-    cur: List[str] = []
-    
-    for w in words:
-        test = (" ".join(cur + [w])).strip()
-        if len(test) > max_chars and cur:
-            lines.append(" ".join(cur))
-            cur = [w]
-        else:
-            cur.append(w)
-    if cur:
-        lines.append(" ".join(cur))
-    
-    if len(lines) == 1 and lines[0]:
-        s = lines[0]
-        if len(s) > 30:
-            lines = [s[:30].rstrip(), s[30:].lstrip()]
-    
-    lines = lines[:5]
-    
-    # Adjust font size based on total characters
-    total_chars = sum(len(x) for x in lines)
+    # Preferred size by amount of text (legacy tiers), then shrink until it fits
+    total_chars = len((text or "").strip())
     if 10 <= total_chars <= 30:
         pt = LINE1_PT
     elif 31 <= total_chars <= 90:
         pt = LINE1_PT * 0.9
     else:
         pt = LINE3_PT
-    
-    return lines, pt
+    fit = fit_text(
+        text or "",
+        FONT_NAME,
+        LINE3_MAX_W_MM,
+        size_pt=pt,
+        min_size_pt=min(pt, LINE3_MIN_PT),
+        max_lines=LINE3_MAX_LINES,
+    )
+    return list(fit.lines), fit.size_pt
 
 
 def _add_regular_memorial(c: canvas.Canvas, x_mm: float, y_mm: float, item: Any, idx: int, warnings: List[str]):
@@ -184,13 +171,13 @@ def _add_regular_memorial(c: canvas.Canvas, x_mm: float, y_mm: float, item: Any,
     
     # Line 1 (PDF coords: flip Y from top to bottom)
     if l1:
-        c.setFont(FONT_NAME, LINE1_PT)
+        c.setFont(FONT_NAME, shrink_to_fit(l1, FONT_NAME, TEXT_MAX_W_MM, size_pt=LINE1_PT, min_size_pt=MIN_PT))
         y1 = y_mm + (MEMORIAL_H_MM - LINE1_Y_MM)  # Flip: bottom-up coords
         c.drawCentredString(cx_mm * mm, y1 * mm, l1)
     
     # Line 2
     if l2:
-        c.setFont(FONT_NAME, LINE2_PT)
+        c.setFont(FONT_NAME, shrink_to_fit(l2, FONT_NAME, TEXT_MAX_W_MM, size_pt=LINE2_PT, min_size_pt=MIN_PT))
         y2 = y_mm + (MEMORIAL_H_MM - LINE2_Y_MM)  # Flip: bottom-up coords
         c.drawCentredString(cx_mm * mm, y2 * mm, l2)
     
@@ -230,11 +217,15 @@ def run(items: List[Any], cfg: dict) -> Tuple[str, str, List[str]]:
         if (typ == "regular stake") and (deco == "graphic") and (colour in ALLOWED_COLOURS):
             eligible.append(it)
     
-    # Sort by colour priority
+    # Sort by colour priority, then give each colour its own beds (one PDF page per bed)
     eligible.sort(key=lambda it: COLOUR_PRIORITY.get(_norm(getattr(it, "colour", "")), 99))
-    
-    # Limit to one bed
-    place = eligible[:BATCH_SIZE]
+    plan = plan_beds(
+        eligible,
+        BATCH_SIZE,
+        grouped=bool(cfg.get("group_by_material", settings.GROUP_BY_MATERIAL)),
+        priority=COLOUR_PRIORITY,
+    )
+    cfg["bed_plan"] = plan.summary()
     
     # Create PDF
     date_str = datetime.now().strftime("%Y%m%d")
@@ -242,42 +233,47 @@ def run(items: List[Any], cfg: dict) -> Tuple[str, str, List[str]]:
     
     c = canvas.Canvas(str(pdf_path), pagesize=(PAGE_W_MM * mm, PAGE_H_MM * mm))
     
-    # White background
-    c.setFillColorRGB(1, 1, 1)
-    c.rect(0, 0, PAGE_W_MM * mm, PAGE_H_MM * mm, fill=1, stroke=0)
-    
-    # Add memorials
     rows_csv = []
-    for idx, item in enumerate(place):
-        col = idx % COLS
-        row = idx // COLS
-        x_mm = X_OFF_MM + col * MEMORIAL_W_MM
-        y_mm = Y_OFF_MM + row * MEMORIAL_H_MM
+    for bed_no, (_material, place) in enumerate(plan.beds or [("", [])], start=1):
+        if bed_no > 1:
+            c.showPage()
         
-        _add_regular_memorial(c, x_mm, y_mm, item, idx, warnings)
+        # White background
+        c.setFillColorRGB(1, 1, 1)
+        c.rect(0, 0, PAGE_W_MM * mm, PAGE_H_MM * mm, fill=1, stroke=0)
         
-        # CSV row
-        order_ref = getattr(item, "order_ref", "") or ""
-        l1, l2, l3 = _text_lines_map(item)
-        rows_csv.append({
-            "bed": 1,
-            "position": idx + 1,
-            "order_ref": order_ref,
-            "line_1": l1,
-            "line_2": l2,
-            "line_3": l3,
-        })
+        # Add memorials
+        for idx, item in enumerate(place):
+            col = idx % COLS
+            row = idx // COLS
+            x_mm = X_OFF_MM + col * MEMORIAL_W_MM
+            y_mm = Y_OFF_MM + row * MEMORIAL_H_MM
+            
+            _add_regular_memorial(c, x_mm, y_mm, item, idx, warnings)
+            
+            # CSV row
+            order_ref = getattr(item, "order_ref", "") or ""
+            l1, l2, l3 = _text_lines_map(item)
+            rows_csv.append({
+                "bed": bed_no,
+                "position": idx + 1,
+                "order_ref": order_ref,
+                "colour": getattr(item, "colour", "") or "",
+                "line_1": l1,
+                "line_2": l2,
+                "line_3": l3,
+            })
+            
+            # Force garbage collection every 3 items to free memory
+            if (idx + 1) % 3 == 0:
+                gc.collect()
         
-        # Force garbage collection every 3 items to free memory
-        if (idx + 1) % 3 == 0:
-            gc.collect()
-    
-    # Add blue reference marker (bottom-right corner)
-    ref_size_mm = 0.1
-    ref_x = PAGE_W_MM - ref_size_mm
-    ref_y = 0.1
-    c.setFillColorRGB(0, 0, 1)
-    c.rect(ref_x * mm, ref_y * mm, ref_size_mm * mm, ref_size_mm * mm, fill=1, stroke=0)
+        # Add blue reference marker (bottom-right corner)
+        ref_size_mm = 0.1
+        ref_x = PAGE_W_MM - ref_size_mm
+        ref_y = 0.1
+        c.setFillColorRGB(0, 0, 1)
+        c.rect(ref_x * mm, ref_y * mm, ref_size_mm * mm, ref_size_mm * mm, fill=1, stroke=0)
     
     c.save()
     
@@ -289,8 +285,8 @@ def run(items: List[Any], cfg: dict) -> Tuple[str, str, List[str]]:
     gc.collect()
     
     # Return URLs
-    pdf_url = f"/static/jobs/{job_id}/{pdf_path.name}"
-    csv_url = f"/static/jobs/{job_id}/{csv_path.name}"
+    pdf_url = job_url(job_id, pdf_path.name)
+    csv_url = job_url(job_id, csv_path.name)
     
     return pdf_url, csv_url, warnings
 
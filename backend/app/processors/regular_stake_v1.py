@@ -9,6 +9,7 @@ from ..utils import storage
 from .item_router import register_batch
 from .base import write_batch_csv
 from ..utils.svg_embed import embed_image_as_data_uri
+from ..utils.text_fit import fit_text
 
 # Legacy geometry (mm)
 PAGE_W_MM = 439.8
@@ -55,39 +56,16 @@ def _lines_map(it: Any) -> Tuple[str, str, str]:
 
 
 def _wrap_line3(text: str) -> Tuple[List[str], float]:
-    # Simple width heuristic based on legacy code: 0.5 * font_mm per char, max ~60% of width
-    base_pt = LINE3_PT
-    font_mm = base_pt * PT_TO_MM
-    char_w_mm = 0.5 * font_mm
-    max_line_mm = MEM_W_MM * 0.6
-    max_chars = max(1, int(max_line_mm / char_w_mm))
-    words = (text or "").split()
-    lines: List[str] = []
-    cur: List[str] = []
-    for w in words:
-        test = (" ".join(cur + [w])).strip()
-        if len(test) > max_chars and cur:
-            lines.append(" ".join(cur))
-            cur = [w]
-        else:
-            cur.append(w)
-    if cur:
-        lines.append(" ".join(cur))
-    if len(lines) == 1 and lines[0]:
-        # Secondary split if a single long line
-        s = lines[0]
-        if len(s) > 30:
-            lines = [s[:30].rstrip(), s[30:].lstrip()]
-    lines = lines[:5]
-    # Legacy-like conditional sizing by total chars
-    total_chars = sum(len(x) for x in lines)
+    # Preferred size by amount of text (legacy tiers), then shrink using Georgia metrics until it fits
+    total_chars = len((text or "").strip())
     if 10 <= total_chars <= 30:
         pt = LINE1_PT
     elif 31 <= total_chars <= 90:
         pt = LINE1_PT * 0.9
     else:
         pt = LINE3_PT
-    return lines, pt
+    fit = fit_text(text or "", "Georgia", MEM_W_MM * 0.6, size_pt=pt, min_size_pt=min(pt, LINE3_PT * 0.7), max_lines=5)
+    return list(fit.lines), fit.size_pt
 
 
 def run(items: List[Any], cfg: dict):
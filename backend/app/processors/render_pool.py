@@ -0,0 +1,191 @@
+from __future__ import annotations
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logging
+import multiprocessing
+import os
+import threading
+
+from ..settings import settings
+
+# Batch processors run in a pool of worker processes with a per-worker
+# address-space cap, recycled after RENDER_WORKER_MAX_TASKS jobs. A photo that
+# blows the cap kills (or MemoryErrors) that worker only; the caller gets a
+# RenderWorkerError for the job instead of the API process going down.
+# A hung job cannot be stopped on its own, so a timeout retires the whole
+# pool; jobs of other callers caught in that (or in a crash) are resubmitted
+# once to a fresh pool rather than failed. Workers report their PIDs from the
+# initializer, so a retired pool's busy workers can be terminated without
+# reaching into the executor.
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Per pool: the queue its workers report their PIDs on, and the PIDs read so far
+_pool_pids: Dict[ProcessPoolExecutor, Tuple[Any, Set[int]]] = {}
+_RESUBMITS = 1
+
+
+class RenderWorkerError(Exception):
+    def __init__(self, key: str, reason: str):
+        super().__init__(f"Render worker failed for {key}: {reason}")
+        self.key = key
+        self.reason = reason
+
+
+def _limit_memory(max_mb: int) -> None:
+    if max_mb <= 0:
+        return
+    try:
+        import resource
+        limit = max_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except Exception:  # not available on this platform
+        logger.warning("render worker: address-space limit not applied")
+
+
+def _init_worker(max_mb: int, pids: Any = None) -> None:
+    if pids is not None:
+        pids.put(os.getpid())
+    _limit_memory(max_mb)
+
+
+def _dump_items(items: List[Any]) -> Tuple[str, List[Any]]:
+    # Models are loaded under a synthetic module name (see app/models/__init__.py)
+    # and cannot be pickled directly; ship plain dicts and rebuild in the worker.
+    if items and hasattr(items[0], "model_dump"):
+        return type(items[0]).__name__, [it.model_dump() for it in items]
+    return "", list(items)
+
+
+def _load_items(model: str, data: List[Any]) -> List[Any]:
+    if not model:
+        return data
+    from .. import models
+    cls = getattr(models, model)
+    return [cls(**d) for d in data]
+
+
+def _run_task(key: str, model: str, data: List[Any], cfg: dict, settings_snapshot: Dict[str, Any]) -> Tuple[Tuple[str, str, List[str]], dict]:
+    # Mirror the parent's settings so the worker writes where the API expects
+    for k, v in settings_snapshot.items():
+        setattr(settings, k, v)
+    from .item_router import get_batch
+    fn = get_batch(key)
+    result = fn(_load_items(model, data), cfg)
+    # cfg carries processor outputs (bed_plan, bed_urls) back to the caller
+    return result, cfg
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            ctx = multiprocessing.get_context("spawn")
+            pids = ctx.SimpleQueue()
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, settings.RENDER_WORKERS),
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(settings.RENDER_WORKER_MAX_MB, pids),
+                max_tasks_per_child=max(1, settings.RENDER_WORKER_MAX_TASKS),
+            )
+            _pool_pids[_pool] = (pids, set())
+        return _pool
+
+
+def _worker_pids(reported: Optional[Tuple[Any, Set[int]]]) -> Set[int]:
+    """Every PID a pool's workers have reported (recycled workers included)."""
+    if reported is None:
+        return set()
+    queue, seen = reported
+    while not queue.empty():
+        seen.add(queue.get())
+    return seen
+
+
+def _retire_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not pool:
+            return  # already retired by another caller
+        _pool = None
+        reported = _pool_pids.pop(pool, None)
+    # Stop any worker still busy with a timed-out job. Other callers' futures
+    # on this pool fail with BrokenProcessPool and are resubmitted by them.
+    # Only live children are signalled, so a recycled worker's PID reused by
+    # an unrelated process is never hit.
+    pids = _worker_pids(reported)
+    for proc in multiprocessing.active_children():
+        if proc.pid in pids:
+            try:
+                proc.terminate()
+            except Exception:
+                pass
+    pool.shutdown(wait=False)
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+        if pool is not None:
+            _pool_pids.pop(pool, None)
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_batch(key: str, items: List[Any], cfg: dict) -> Tuple[str, str, List[str]]:
+    """Run a batch processor, isolated in a worker process when RENDER_WORKERS > 0.
+
+    Processor outputs written into cfg by the worker are copied back into cfg.
+    Raises KeyError for unknown processors and RenderWorkerError when the worker
+    dies, runs out of memory or exceeds RENDER_TIMEOUT_S.
+    """
+    if settings.RENDER_WORKERS <= 0:
+        from .item_router import get_batch
+        return get_batch(key)(items, cfg)
+
+    from .item_router import available_batch
+    if key not in available_batch():
+        raise KeyError(f"Batch processor not found: {key}")
+
+    model, data = _dump_items(items)
+    snapshot = settings.model_dump()
+    attempt = 0
+    while True:
+        pool = _get_pool()
+        try:
+            fut = pool.submit(_run_task, key, model, data, cfg, snapshot)
+        except RuntimeError as e:  # includes BrokenProcessPool
+            # Broken, or retired by another caller since _get_pool; after
+            # interpreter shutdown every new pool refuses too, so don't spin
+            _retire_pool(pool)
+            if attempt < _RESUBMITS:
+                attempt += 1
+                continue
+            logger.error("render pool unavailable key=%s: %s", key, e)
+            raise RenderWorkerError(key, f"render pool unavailable: {e}")
+        try:
+            result, out_cfg = fut.result(timeout=settings.RENDER_TIMEOUT_S or None)
+        except FutureTimeout:
+            logger.error("render worker timed out key=%s", key)
+            _retire_pool(pool)
+            raise RenderWorkerError(key, f"timed out after {settings.RENDER_TIMEOUT_S}s")
+        except BrokenProcessPool:
+            # A worker crashed, or another caller's job timed out and the pool was retired
+            _retire_pool(pool)
+            if attempt < _RESUBMITS:
+                attempt += 1
+                logger.warning("render pool restarted; resubmitting key=%s", key)
+                continue
+            logger.error("render worker crashed key=%s", key)
+            raise RenderWorkerError(key, "worker process crashed (likely out of memory)")
+        except CancelledError:
+            raise RenderWorkerError(key, "render pool shut down")
+        except MemoryError:
+            raise RenderWorkerError(key, f"exceeded {settings.RENDER_WORKER_MAX_MB} MB")
+        cfg.update(out_cfg)
+        return result
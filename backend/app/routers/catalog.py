@@ -1,18 +1,13 @@
-from fastapi import APIRouter
-from pathlib import Path
-import json
-from ..settings import settings
+from fastapi import APIRouter, Request, Response
+from ..utils import catalog_service
 
 router = APIRouter()
 
 @router.get("/catalog")
-def get_catalog():
-    cat_path = settings.DATA_DIR / "catalog.json"
-    machines = json.loads((settings.DATA_DIR / "machines" / "MUTOH-UJF-461.json").read_text("utf-8"))
-    materials = json.loads((settings.DATA_DIR / "materials" / "ALU-ACM-1MM.json").read_text("utf-8"))
-    catalog = json.loads(cat_path.read_text("utf-8"))
-    return {
-        "templates": catalog.get("templates", []),
-        "machines": [machines],
-        "materials": [materials],
-    }
+def get_catalog(request: Request, response: Response):
+    snap = catalog_service.get_catalog()
+    headers = {"ETag": snap.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == snap.etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return snap.payload()
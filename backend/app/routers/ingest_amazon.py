@@ -1,16 +1,30 @@
-from fastapi import APIRouter, HTTPException, Body, Depends, Request, UploadFile, File
+from fastapi import APIRouter, HTTPException, Body, Depends, Query, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any, Tuple
+from dataclasses import dataclass, field
+import asyncio
 import io
 import json
+import time
+import zipfile
 from pathlib import Path
-from ..models import IngestItem, LineField, QaWarning, Severity
-from ..utils.qa import merge_qa, run_qa
-from ..utils.tsv import parse_tsv
-from ..utils.zip_ingest import download_zip, safe_extract, parse_personalisation, ZipTooLargeError, ZipHttpError
+import requests
+from ..models import IngestFileSummary, IngestItem, IngestSource, LineField, QaWarning, Severity
+from ..utils.qa import QaEngine, QaSubject, merge_qa
+from ..utils.tsv import aiter_tsv_rows, iter_tsv_rows, parse_tsv
+from ..utils.zip_ingest import download_zip, safe_extract, parse_archive, parse_personalisation, ZipTooLargeError, ZipHttpError
 from ..settings import settings
 from ..auth import get_current_user
-from ..utils.storage import get_storage, put_photo_local, upload_photo_and_presign, save_photo_local
-from ..utils.sku_map import get_meta_for_sku
+from .. import database
+from ..database import get_db
+from ..utils import catalog_service, ingest_cache, order_index, photo_store
+from ..utils.circuit_breaker import HostUnavailableError, RetryBudget, get_breaker, host_of
+from ..utils.retry_queue import get_queue
+from ..utils.download_stage import DownloadStage
+from ..utils.ingest_sessions import get_store as get_sessions
+from ..utils.storage import get_storage, publish_file
+from ..utils.sku_map import get_meta_for_sku, get_meta_for_sku_many
 from ..utils.security import validate_upload, sanitize_filename
 from ..middleware.rate_limit import limiter
 import logging
@@ -20,28 +34,20 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/ingest/amazon")
-@limiter.limit("20/minute")
-async def ingest_amazon(
-    request: Request,
-    file: Optional[UploadFile] = File(None),
-    payload: Optional[Dict[str, Any]] = Body(None),
-    user=Depends(get_current_user),
-):
-    items: List[IngestItem] = []
-    warnings: List[QaWarning] = []
-    rows: List[Dict[str, Any]] = []
+def _lower_keys(d: Dict[str, Any]) -> Dict[str, Any]:
+    return {str(k).lower(): v for k, v in d.items()}
+
 
-    def _lower_keys(d: Dict[str, Any]) -> Dict[str, Any]:
-        return {str(k).lower(): v for k, v in d.items()}
+def _get(d: Dict[str, Any], keys: List[str]) -> Any:
+    dl = _lower_keys(d)
+    for k in keys:
+        if k.lower() in dl:
+            return dl[k.lower()]
+    return None
 
-    def _get(d: Dict[str, Any], keys: List[str]) -> Any:
-        dl = _lower_keys(d)
-        for k in keys:
-            if k.lower() in dl:
-                return dl[k.lower()]
-        return None
 
+async def _read_rows(request: Request, file: Optional[UploadFile], payload: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
     # Load rows: from file upload, else explicit payload, else parse request.json
     if file is not None:
         # Validate file before processing
@@ -50,10 +56,8 @@ async def ingest_amazon(
         safe_filename = sanitize_filename(file.filename)
         logger.info(f"Processing uploaded file: {safe_filename}")
         
-        raw = await file.read()
-        text = raw.decode("utf-8", errors="ignore")
-        headers, data_rows = parse_tsv(text)
-        rows = [dict(zip(headers, r)) for r in data_rows]
+        # Decode and split in chunks rather than materialising the whole body
+        rows = [r async for r in aiter_tsv_rows(file)]
     elif payload is not None and isinstance(payload, dict):
         if "text" in payload and isinstance(payload["text"], str):
             headers, data_rows = parse_tsv(payload["text"]) 
@@ -79,24 +83,165 @@ async def ingest_amazon(
         except Exception:
             raise HTTPException(status_code=400, detail="Provide multipart file, JSON {text:""}, or JSON {rows:[...]} payload")
 
-    # catalog maxlens helper
-    catalog_path = settings.DATA_DIR / "catalog.json"
-    tmpl_maxlens: Dict[str, Dict[str, int]] = {}
-    if catalog_path.exists():
-        try:
-            data = json.loads(catalog_path.read_text(encoding="utf-8"))
-            for t in data.get("templates", []):
-                lens: Dict[str, int] = {}
-                for f in t.get("options", {}).get("fields", []):
-                    if f.get("type") == "text":
-                        lens[f["id"]] = int(f.get("maxLen", 10**9))
-                tmpl_maxlens[t.get("id")] = lens
-        except Exception:
-            pass
+    return rows
+
+
+@router.post("/ingest/amazon")
+@limiter.limit("20/minute")
+async def ingest_amazon(
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    payload: Optional[Dict[str, Any]] = Body(None),
+    mode: str = Query("full", pattern="^(full|incremental)$"),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    items: List[IngestItem] = []
+    warnings: List[QaWarning] = []
+
+    rows = await _read_rows(request, file, payload)
+    if "application/x-ndjson" in (request.headers.get("accept") or ""):
+        return StreamingResponse(_ndjson_ingest(rows, mode=mode), media_type="application/x-ndjson")
+    stream, cache_stats, skipped = _start_ingest(rows, mode=mode, db=db)
+
+    async for _idx, item, row_warnings in stream:
+        items.append(item)
+        warnings.extend(row_warnings)
+
+    # merge_qa kept for parity; here we have single source
+    merged = merge_qa(warnings, [])
+    return {
+        "items": [i.model_dump() for i in items],
+        "warnings": [w.model_dump() for w in merged],
+        "cache": cache_stats,
+        "skipped": skipped,
+        "ingest_id": get_sessions().put(items),
+    }
+
+
+@router.post("/ingest/amazon/batch")
+@limiter.limit("20/minute")
+async def ingest_amazon_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    mode: str = Query("full", pattern="^(full|incremental)$"),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Ingest several report files, or ZIPs of reports, as one run.
+
+    Rows from every report are merged and deduplicated first, then go through
+    a single ingest: one download stage and retry budget, one SKU resolution
+    and catalogue snapshot, so downloads for all files run concurrently.
+    `provenance[i]` lists the file rows that produced `items[i]`.
+    """
+    loaded = await asyncio.gather(*(_read_report_upload(f) for f in files))
+
+    summaries: List[IngestFileSummary] = []
+    merged_rows: List[Dict[str, Any]] = []
+    provenance: List[List[IngestSource]] = []
+    seen: Dict[Tuple[str, ...], int] = {}
+    for name, reports, error in loaded:
+        if error:
+            summaries.append(IngestFileSummary(name=name, error=error))
+            continue
+        for report_name, rows in reports:
+            duplicates = 0
+            for i, r in enumerate(rows):
+                src = IngestSource(file=report_name, row=i)
+                key = _dedup_key(r)
+                at = seen.get(key)
+                if at is None:
+                    seen[key] = len(merged_rows)
+                    merged_rows.append(r)
+                    provenance.append([src])
+                else:
+                    provenance[at].append(src)
+                    duplicates += 1
+            summaries.append(IngestFileSummary(name=report_name, rows=len(rows), duplicates=duplicates))
+
+    stream, cache_stats, skipped = _start_ingest(merged_rows, mode=mode, db=db)
+    items: List[IngestItem] = []
+    warnings: List[QaWarning] = []
+    async for _idx, item, row_warnings in stream:
+        items.append(item)
+        warnings.extend(row_warnings)
+
+    return {
+        "items": [i.model_dump() for i in items],
+        "warnings": [w.model_dump() for w in merge_qa(warnings, [])],
+        "cache": cache_stats,
+        "skipped": skipped,
+        "ingest_id": get_sessions().put(items),
+        "files": [f.model_dump() for f in summaries],
+        "provenance": [[src.model_dump() for src in p] for p in provenance],
+    }
+
+
+_REPORT_EXTS = {".txt", ".tsv", ".csv"}
+
+
+def _dedup_key(row: Dict[str, Any]) -> Tuple[str, ...]:
+    # order-item-id identifies a line across overlapping exports; without it,
+    # only identical rows are duplicates
+    order_item_id = _get(row, ["order-item-id", "order_item_id"])
+    if order_item_id:
+        return ("order-item", str(order_item_id))
+    order_id = str(_get(row, ["amazon-order-id", "order-id", "order_id"]) or "")
+    return ("row", order_id, str(_get(row, ["sku"]) or ""), order_index.row_fingerprint(row))
+
+
+def _reports_from_zip(fileobj: Any, zip_name: str) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """(name, rows) for each report file inside a ZIP of reports."""
+    limit = settings.MAX_ZIP_MB * 1024 * 1024
+    total = 0
+    out: List[Tuple[str, List[Dict[str, Any]]]] = []
+    with zipfile.ZipFile(fileobj) as zf:
+        for info in zf.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/") or Path(name).suffix.lower() not in _REPORT_EXTS:
+                continue
+            total += info.file_size
+            if total > limit:
+                raise ZipTooLargeError(f"Report ZIP exceeds {settings.MAX_ZIP_MB} MB uncompressed")
+            with zf.open(info) as fh:
+                out.append((f"{zip_name}/{name}", list(iter_tsv_rows(fh))))
+    return out
+
+
+async def _read_report_upload(upload: UploadFile) -> Tuple[str, List[Tuple[str, List[Dict[str, Any]]]], Optional[str]]:
+    """(file name, [(report name, rows)], error) for one batch upload."""
+    name = sanitize_filename(upload.filename or "report.txt")
+    try:
+        await validate_upload(upload)
+        if name.lower().endswith(".zip"):
+            return name, await asyncio.to_thread(_reports_from_zip, upload.file, name), None
+        return name, [(name, [r async for r in aiter_tsv_rows(upload)])], None
+    except HTTPException as e:
+        detail = e.detail.get("message") if isinstance(e.detail, dict) else e.detail
+        return name, [], str(detail)
+    except (zipfile.BadZipFile, ZipTooLargeError) as e:
+        return name, [], str(e)
+
+
+def _start_ingest(rows: List[Dict[str, Any]], *, mode: str, db: Session):
+    """Plan an ingest over parsed report rows.
+
+    Returns (row stream, cache stats, skipped count). The stream yields
+    (row index, item, row warnings) in row order as rows complete; the
+    cache stats fill in as it is consumed.
+    """
+    # catalog maxlens helper (cached, reloaded when catalog.json changes)
+    tmpl_maxlens = catalog_service.get_catalog().maxlens
+    # QA rules and per-template limits compiled once for the whole report
+    qa_engine = QaEngine(limits=tmpl_maxlens, current_year=2025)
+
+    # Resolve every distinct SKU against one index snapshot up front
+    sku_metas = get_meta_for_sku_many(str(_get(r, ["sku"]) or "") for r in rows)
 
     def _infer_template_id(sku: str) -> Tuple[Optional[str], bool, str | None, List[QaWarning], Dict[str, Any]]:
         w: List[QaWarning] = []
-        meta = get_meta_for_sku(sku)
+        meta = sku_metas.get(sku) or get_meta_for_sku(sku)
         tmpl = meta.get("template_id")
         req_photo = bool(meta.get("requires_photo", False))
         default_type = meta.get("default_type")
@@ -114,177 +259,440 @@ async def ingest_amazon(
         w.append(QaWarning(code="UNKNOWN_TEMPLATE", message="Unable to infer template from sku", severity=Severity.warn))
         return None, req_photo, default_type, w, meta
 
-    downloads_root = settings.DATA_DIR / "storage" / "downloads"
     storage = get_storage()
 
-    for idx, r in enumerate(rows):
-        order_id = str(_get(r, ["amazon-order-id", "order-id", "order_id"]) or "")
-        sku = str(_get(r, ["sku"]) or "")
-        qty = int((_get(r, ["quantity"]) or 1) or 1)
-        cust_url = _get(r, ["customized-url", "customized url", "customized_url"]) or None
-        # customized-page not used directly for now
-        # Display-only reference: Amazon order-id only
-        order_ref = order_id
-        # Internal unique key for this row (not exposed in API response)
-        internal_id = f"{order_id}:{idx}"
-        logger.info("[ingest] row=%s order_id=%s sku=%s url=%r", idx, order_id, sku, cust_url)
-
-        template_id, requires_photo, default_type, w_tmpl, sku_meta = _infer_template_id(sku)
-        warnings.extend(w_tmpl)
-        # If caller provided template_id explicitly in the row payload, honor it
-        explicit_tmpl = _get(r, ["template_id"]) or None
-        if explicit_tmpl:
-            template_id = str(explicit_tmpl)
-        if not template_id:
-            template_id = "PLAQUE-140x90-V1"
-
-        fields = {
-            "line_1": str(_get(r, ["line_1"]) or ""),
-            "line_2": str(_get(r, ["line_2"]) or ""),
-            "line_3": str(_get(r, ["line_3"]) or ""),
-        }
-        images: List[Path] = []
-        asset_keys: List[str] = []
+    # Order-line index: every processed row is recorded; in incremental mode
+    # rows already ingested cleanly are answered from it without any work.
+    row_keys = [
+        (str(_get(r, ["amazon-order-id", "order-id", "order_id"]) or ""), str(_get(r, ["sku"]) or ""), order_index.row_fingerprint(r))
+        for r in rows
+    ]
+    try:
+        known = order_index.lookup(db, row_keys)
+    except Exception:
+        logger.warning("ingest: order-line index unavailable", exc_info=True)
+        known = {}
+    try:
+        photo_refs = photo_store.lookup_refs(db, row_keys)
+    except Exception:
+        logger.warning("ingest: photo reference index unavailable", exc_info=True)
+        photo_refs = {}
+    replays: Dict[int, Tuple[IngestItem, List[QaWarning]]] = {}
+    if mode == "incremental":
+        for idx, k in enumerate(row_keys):
+            if k in known and known[k].status == "ingested":
+                replay = _replay_row(known[k], photo_refs.get(k), storage)
+                if replay is not None:
+                    replays[idx] = replay
+    done = set(replays)
+
+    cache_stats = {"hits": 0, "misses": 0}
+
+    async def _process_rows():
+        """Yield (row index, item, row warnings) as each row completes, in row order."""
+        record_lines = True
+        # Download stage: fetch, extract and parse customisation ZIPs concurrently
+        # (bounded overall and per host) while rows are assembled below in order.
+        stage = DownloadStage(concurrency=settings.DOWNLOAD_CONCURRENCY, per_host=settings.DOWNLOAD_PER_HOST_CONCURRENCY)
+        # Retries beyond each row's first attempt come out of one shared budget
+        budget = RetryBudget(settings.DOWNLOAD_RETRY_BUDGET)
+        pending: Dict[int, Any] = {}
+        if settings.ALLOW_EXTERNAL_DOWNLOADS:
+            for idx, r in enumerate(rows):
+                cust_url = _get(r, ["customized-url", "customized url", "customized_url"]) or None
+                if cust_url and idx not in done:
+                    order_id = str(_get(r, ["amazon-order-id", "order-id", "order_id"]) or "")
+                    pending[idx] = stage.submit(str(cust_url), _fetch_customisation, order_id, idx, str(cust_url), storage, budget=budget)
+
+        try:
+            for idx, r in enumerate(rows):
+                if idx in done:
+                    item, row_warnings = replays[idx]
+                    yield idx, item, row_warnings
+                    continue
+                row_warnings: List[QaWarning] = []
+                order_id = str(_get(r, ["amazon-order-id", "order-id", "order_id"]) or "")
+                sku = str(_get(r, ["sku"]) or "")
+                qty = int((_get(r, ["quantity"]) or 1) or 1)
+                cust_url = _get(r, ["customized-url", "customized url", "customized_url"]) or None
+                # customized-page not used directly for now
+                # Display-only reference: Amazon order-id only
+                order_ref = order_id
+                # Internal unique key for this row (not exposed in API response)
+                internal_id = f"{order_id}:{idx}"
+                logger.info("[ingest] row=%s order_id=%s sku=%s url=%r", idx, order_id, sku, cust_url)
 
-        if cust_url:
-            if settings.ALLOW_EXTERNAL_DOWNLOADS:
+                template_id, requires_photo, default_type, w_tmpl, sku_meta = _infer_template_id(sku)
+                row_warnings.extend(w_tmpl)
+                # If caller provided template_id explicitly in the row payload, honor it
+                explicit_tmpl = _get(r, ["template_id"]) or None
+                if explicit_tmpl:
+                    template_id = str(explicit_tmpl)
+                if not template_id:
+                    template_id = "PLAQUE-140x90-V1"
+
+                fields = {
+                    "line_1": str(_get(r, ["line_1"]) or ""),
+                    "line_2": str(_get(r, ["line_2"]) or ""),
+                    "line_3": str(_get(r, ["line_3"]) or ""),
+                }
+                asset_keys: List[str] = []
+                pdata: Dict[str, Any] = {}
+
+                if cust_url:
+                    if settings.ALLOW_EXTERNAL_DOWNLOADS and idx in pending:
+                        # Wait without blocking the event loop; later rows keep downloading
+                        fetched: _FetchedRow = await asyncio.wrap_future(pending[idx])
+                        if fetched.cache:
+                            cache_stats[fetched.cache] += 1
+                        row_warnings.extend(fetched.warnings)
+                        asset_keys = fetched.asset_keys
+                        pdata = fetched.pdata
+                        # Populate fields from parser
+                        if pdata.get("line_1"):
+                            fields["line_1"] = pdata["line_1"]
+                        if pdata.get("line_2"):
+                            fields["line_2"] = pdata["line_2"]
+                        if pdata.get("line_3"):
+                            fields["line_3"] = pdata["line_3"]
+                        if pdata.get("graphics_key"):
+                            fields["graphic"] = pdata["graphics_key"]
+                        # photo mapping is set after this block
+                        # structured summary log
+                        if pdata:
+                            summary = {
+                                "graphics_key": fields.get("graphic"),
+                                "line_1": (fields.get("line_1") or "")[:10],
+                                "line_2": (fields.get("line_2") or "")[:10],
+                                "line_3": (fields.get("line_3") or "")[:10],
+                            }
+                            logger.info("ingest.parse.summary", extra={"order_id": order_id, "idx": idx, **summary})
+                    else:
+                        row_warnings.append(QaWarning(code="DOWNLOADS_DISABLED", message="External downloads disabled by env; cannot fetch customized-url", severity=Severity.info, field="customized-url"))
+                else:
+                    row_warnings.append(QaWarning(code="MISSING_CUSTOMIZED_URL", message="Row missing customized-url", severity=Severity.warn))
+
+                # Choose photo from parsed data and persist
+                photo_asset = None
+                photo_filename: Optional[str] = None
+                photo_via: str = "-"
                 try:
-                    tmp_zip = settings.DOWNLOAD_TMP_DIR / "ingest" / order_id / f"{idx}.zip"
-                    logger.info("ingest.download.start", extra={"order_id": order_id, "idx": idx, "url": str(cust_url)})
-                    download_zip(str(cust_url), tmp_zip, timeout=settings.DOWNLOAD_TIMEOUT_S, user_agent=settings.USER_AGENT)
-                    dest_dir = downloads_root / order_id / str(idx)
-                    extracted = safe_extract(tmp_zip, dest_dir, max_mb=settings.MAX_ZIP_MB)
-                    logger.info("ingest.download.done", extra={"order_id": order_id, "idx": idx, "files": len(extracted)})
-                    # Upload extracted files to storage if S3 mode; in local mode, derive keys
-                    for pth in extracted:
-                        if settings.STORAGE_BACKEND.lower() == "s3":
-                            key = f"downloads/{order_id}/{idx}/{pth.name}"
-                            try:
-                                ctype = _guess_content_type(pth.suffix)
-                                storage.put_bytes(key, pth.read_bytes(), content_type=ctype)
-                                asset_keys.append(key)
-                            except Exception as e:
-                                warnings.append(QaWarning(code="ZIP_UPLOAD_FAILED", message=str(e), severity=Severity.error))
-                        else:
-                            # local mode: key is relative to DATA_DIR
-                            rel = pth.relative_to(settings.DATA_DIR)
-                            asset_keys.append(str(rel))
-                    pdata = parse_personalisation(extracted)
-                    # Populate fields from parser
-                    if pdata.get("line_1"):
-                        fields["line_1"] = pdata["line_1"]
-                    if pdata.get("line_2"):
-                        fields["line_2"] = pdata["line_2"]
-                    if pdata.get("line_3"):
-                        fields["line_3"] = pdata["line_3"]
-                    if pdata.get("graphics_key"):
-                        fields["graphic"] = pdata["graphics_key"]
-                    # photo mapping is set after this block
-                    # structured summary log
-                    summary = {
-                        "graphics_key": fields.get("graphic"),
-                        "line_1": (fields.get("line_1") or "")[:10],
-                        "line_2": (fields.get("line_2") or "")[:10],
-                        "line_3": (fields.get("line_3") or "")[:10],
-                    }
-                    logger.info("ingest.parse.summary", extra={"order_id": order_id, "idx": idx, **summary})
-                except ZipTooLargeError as ze:
-                    warnings.append(QaWarning(code="ZIP_TOO_LARGE", message=str(ze), severity=Severity.error, field="customized-url"))
-                except ZipHttpError as he:
-                    warnings.append(QaWarning(code="ZIP_DOWNLOAD_FAILED", message=f"HTTP {he.status}", severity=Severity.error, field="customized-url"))
+                    p_path = pdata.get("photo_path") if isinstance(pdata, dict) else None
+                    p_name = pdata.get("photo_filename") if isinstance(pdata, dict) else None
+                    photo_via = pdata.get("photo_via") or "-"
+                    if isinstance(p_path, Path) and p_path.exists():
+                        # Content-addressed: bytes already stored for this hash are not copied again
+                        p_sha = pdata.get("photo_sha256")
+                        ref = photo_refs.get(row_keys[idx])
+                        published = await asyncio.to_thread(
+                            photo_store.publish, p_path, sha256=p_sha, storage=storage,
+                            known=bool(ref is not None and p_sha and ref.sha256 == p_sha),
+                        )
+                        photo_refs[row_keys[idx]] = photo_store.link(db, row_keys[idx], published, existing=ref)
+                        photo_asset = published.url
+                        print(f"[INGEST] Photo {p_path.name} -> {published.blob_name} (stored={published.stored})", flush=True)
+                        photo_filename = p_name or p_path.name
                 except Exception as e:
-                    logger.exception("ingest.zip.error row=%s", idx)
-                    warnings.append(QaWarning(code="ZIP_PROCESSING_ERROR", message=str(e)[:200], severity=Severity.error, field="customized-url"))
-            else:
-                warnings.append(QaWarning(code="DOWNLOADS_DISABLED", message="External downloads disabled by env; cannot fetch customized-url", severity=Severity.info, field="customized-url"))
-        else:
-            warnings.append(QaWarning(code="MISSING_CUSTOMIZED_URL", message="Row missing customized-url", severity=Severity.warn))
+                    print(f"[INGEST] Failed to save photo: {e}", flush=True)
+                    photo_asset = None
+
+                # If nothing parsed, add explicit warning
+                if not fields.get("graphic") and not any(fields.get(k) for k in ("line_1","line_2","line_3")) and not photo_asset:
+                    row_warnings.append(QaWarning(code="NO_PERSONALISATION_FOUND", message="ZIP had no usable JSON/XML/text", severity=Severity.warn, field="customized-url"))
 
-        # Choose photo from parsed data and persist
-        photo_asset = None
-        photo_filename: Optional[str] = None
-        photo_via: str = "-"
+                # QA wiring from decoration_type
+                deco = (sku_meta.get("DecorationType") or "").strip().lower()
+                require_photo_flag = (deco == "photo")
+                if (deco == "graphic") and not (fields.get("graphic")):
+                    row_warnings.append(QaWarning(code="GRAPHIC_MISSING", message="DecorationType=Graphic but no graphics_key parsed", severity=Severity.warn))
+
+                item = IngestItem(
+                    order_ref=order_ref,
+                    template_id=template_id,
+                    sku=sku or None,
+                    quantity=qty,
+                    lines=[
+                        LineField(id="line_1", value=fields.get("line_1", "")),
+                        LineField(id="line_2", value=fields.get("line_2", "")),
+                        LineField(id="line_3", value=fields.get("line_3", "")),
+                    ],
+                    graphics_key=(fields.get("graphic") or None),
+                    photo_asset_id=photo_asset,
+                    photo_asset_url=photo_asset,
+                    photo_filename=photo_filename,
+                    assets=asset_keys,
+                    colour=sku_meta.get("COLOUR"),
+                    product_type=sku_meta.get("TYPE"),
+                    decoration_type=sku_meta.get("DecorationType"),
+                    theme=sku_meta.get("Theme"),
+                    processor=sku_meta.get("Processor"),
+                )
+
+                # QA per item using catalog lens
+                if tmpl_maxlens.get(template_id):
+                    qa = qa_engine.run([QaSubject(
+                        lines={l.id: l.value for l in item.lines},
+                        template_id=template_id,
+                        require_photo=bool((item.decoration_type or "").lower() == "photo"),
+                        has_photo=bool(item.photo_asset_url),
+                    )])
+                    row_warnings.extend(qa.items[0])
+
+                # concise per-row summary including photo status
+                try:
+                    logger.info(
+                        "[ingest] row=%s sku=%s graphic=%r l1=%s l2=%s l3=%s photo=%s via=%s",
+                        idx,
+                        sku,
+                        item.graphics_key or '-',
+                        (fields.get("line_1") or "")[:10],
+                        (fields.get("line_2") or "")[:10],
+                        (fields.get("line_3") or "")[:10],
+                        (item.photo_filename or '-'),
+                        photo_via,
+                    )
+                except Exception:
+                    pass
+
+                key = row_keys[idx]
+                if record_lines:
+                    try:
+                        known[key] = order_index.record(
+                            db, key, item.model_dump(mode="json"), [w.model_dump(mode="json") for w in row_warnings], existing=known.get(key)
+                        )
+                    except Exception:
+                        # Like lookup above: the index is an optimisation, the ingest goes on
+                        record_lines = False
+                        logger.warning("ingest: order-line index unavailable; lines not recorded", exc_info=True)
+                yield idx, item, row_warnings
+        finally:
+            stage.close(cancel=True)
         try:
-            p_path = pdata.get("photo_path") if isinstance(pdata, dict) else None
-            p_name = pdata.get("photo_filename") if isinstance(pdata, dict) else None
-            photo_via = pdata.get("photo_via") or "-"
-            if isinstance(p_path, Path) and p_path.exists():
-                stored = f"{order_id}-{idx}-{(p_name or p_path.name)}"
-                print(f"[INGEST] Saving photo: {p_path} -> {stored}", flush=True)
-                if settings.STORAGE_BACKEND.lower() == "s3":
-                    photo_asset = upload_photo_and_presign(p_path, stored)
-                else:
-                    photo_asset = save_photo_local(p_path, stored)
-                print(f"[INGEST] Photo saved, URL: {photo_asset}", flush=True)
-                photo_filename = p_name or p_path.name
-        except Exception as e:
-            print(f"[INGEST] Failed to save photo: {e}", flush=True)
-            photo_asset = None
-
-        # If nothing parsed, add explicit warning
-        if not fields.get("graphic") and not any(fields.get(k) for k in ("line_1","line_2","line_3")) and not photo_asset:
-            warnings.append(QaWarning(code="NO_PERSONALISATION_FOUND", message="ZIP had no usable JSON/XML/text", severity=Severity.warn, field="customized-url"))
-
-        # QA wiring from decoration_type
-        deco = (sku_meta.get("DecorationType") or "").strip().lower()
-        require_photo_flag = (deco == "photo")
-        if (deco == "graphic") and not (fields.get("graphic")):
-            warnings.append(QaWarning(code="GRAPHIC_MISSING", message="DecorationType=Graphic but no graphics_key parsed", severity=Severity.warn))
-
-        item = IngestItem(
-            order_ref=order_ref,
-            template_id=template_id,
-            sku=sku or None,
-            quantity=qty,
-            lines=[
-                LineField(id="line_1", value=fields.get("line_1", "")),
-                LineField(id="line_2", value=fields.get("line_2", "")),
-                LineField(id="line_3", value=fields.get("line_3", "")),
-            ],
-            graphics_key=(fields.get("graphic") or None),
-            photo_asset_id=photo_asset,
-            photo_asset_url=photo_asset,
-            photo_filename=photo_filename,
-            assets=asset_keys,
-            colour=sku_meta.get("COLOUR"),
-            product_type=sku_meta.get("TYPE"),
-            decoration_type=sku_meta.get("DecorationType"),
-            theme=sku_meta.get("Theme"),
-            processor=sku_meta.get("Processor"),
-        )
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.warning("ingest: failed to record order lines", exc_info=True)
+
+    return _process_rows(), cache_stats, len(done)
+
+
+async def _ndjson_ingest(rows: List[Dict[str, Any]], *, mode: str):
+    """NDJSON body for /ingest/amazon.
+
+    Runs after the endpoint has returned, when the request's database session
+    is already closed, so the ingest gets a session of its own.
+    """
+    db = database.SessionLocal()
+    try:
+        stream, cache_stats, skipped = _start_ingest(rows, mode=mode, db=db)
+        async for line in _ndjson_stream(stream, cache_stats, skipped):
+            yield line
+    finally:
+        db.close()
+
+
+async def _ndjson_stream(rows, cache_stats: Dict[str, int], skipped: int):
+    """One {"type": "item"} record per finished row, then a {"type": "summary"} record."""
+    items: List[IngestItem] = []
+    n_warnings = 0
+    async for idx, item, row_warnings in rows:
         items.append(item)
+        n_warnings += len(row_warnings)
+        yield json.dumps({
+            "type": "item",
+            "row": idx,
+            "item": item.model_dump(mode="json"),
+            "warnings": [w.model_dump(mode="json") for w in row_warnings],
+        }) + "\n"
+    yield json.dumps({
+        "type": "summary",
+        "items": len(items),
+        "warnings": n_warnings,
+        "cache": cache_stats,
+        "skipped": skipped,
+        "ingest_id": get_sessions().put(items),
+    }) + "\n"
 
-        # QA per item using catalog lens
-        maxlens = tmpl_maxlens.get(template_id)
-        if maxlens:
-            qa = run_qa(
-                {l.id: l.value for l in item.lines},
-                template_maxlens=maxlens,
-                require_photo=bool((item.decoration_type or "").lower() == "photo"),
-                has_photo=bool(item.photo_asset_url),
-                current_year=2025,
-            )
-            warnings.extend(qa)
+@dataclass
+class _FetchedRow:
+    pdata: Dict[str, Any] = field(default_factory=dict)
+    asset_keys: List[str] = field(default_factory=list)
+    warnings: List[QaWarning] = field(default_factory=list)
+    cache: str = ""  # "hits" | "misses" | "" when not cacheable
+    transient: bool = False  # failed on a host error worth retrying later
+
+
+def _is_transient(exc: Exception) -> bool:
+    if isinstance(exc, ZipHttpError):
+        return exc.status >= 500 or exc.status == 429
+    return isinstance(exc, (requests.RequestException, ConnectionError, TimeoutError))
 
-        # concise per-row summary including photo status
+
+def _download_customisation(url: str, dest: Path, budget: Optional[RetryBudget]) -> None:
+    """download_zip behind the host's circuit breaker.
+
+    Each call to download_zip is a single attempt. Transient failures count
+    against the breaker and are retried with back-off while the row has
+    attempts left and the ingest's shared budget allows; once the host is
+    tripped this raises HostUnavailableError without touching the network.
+    """
+    breaker = get_breaker()
+    host = host_of(url)
+    attempt = 0
+    while True:
+        breaker.check(host)
         try:
-            logger.info(
-                "[ingest] row=%s sku=%s graphic=%r l1=%s l2=%s l3=%s photo=%s via=%s",
-                idx,
-                sku,
-                item.graphics_key or '-',
-                (fields.get("line_1") or "")[:10],
-                (fields.get("line_2") or "")[:10],
-                (fields.get("line_3") or "")[:10],
-                (item.photo_filename or '-'),
-                photo_via,
+            download_zip(url, dest, timeout=settings.DOWNLOAD_TIMEOUT_S, user_agent=settings.USER_AGENT, retries=1)
+        except Exception as e:
+            if not _is_transient(e):
+                # The host answered (404, oversized ZIP, ...): not an outage
+                breaker.record_success(host)
+                raise
+            breaker.record_failure(host)
+            attempt += 1
+            if attempt >= max(1, settings.DOWNLOAD_RETRIES) or (budget is not None and not budget.take()):
+                raise
+            time.sleep(settings.DOWNLOAD_BACKOFF_S * 2 ** (attempt - 1))
+        else:
+            breaker.record_success(host)
+            return
+
+
+def _queue_retry(order_id: str, idx: int, cust_url: str, storage) -> bool:
+    """Retry a transiently failed row in the background.
+
+    The result lands in the ingest cache, where the next ingest of the row
+    (e.g. mode=incremental, which re-runs failed lines) finds it.
+    """
+    if not (settings.DOWNLOAD_RETRY_QUEUE_ENABLED and settings.INGEST_CACHE_ENABLED):
+        return False
+
+    def job() -> bool:
+        fetched = _fetch_customisation(order_id, idx, cust_url, storage, budget=RetryBudget(0), queue_retry=False)
+        return not fetched.transient
+
+    return get_queue().enqueue(cust_url, host_of(cust_url), job)
+
+
+def _fetch_customisation(
+    order_id: str, idx: int, cust_url: str, storage, *, budget: Optional[RetryBudget] = None, queue_retry: bool = True
+) -> _FetchedRow:
+    """Download, extract and parse one customisation ZIP (runs on the download stage)."""
+    out = _FetchedRow()
+    downloads_root = settings.DATA_DIR / "storage" / "downloads"
+    dest_dir = downloads_root / order_id / str(idx)
+    try:
+        cached = ingest_cache.lookup_url(cust_url)
+        if cached is not None:
+            _use_cached(out, cached, order_id, idx, dest_dir, storage)
+            return out
+        tmp_zip = settings.DOWNLOAD_TMP_DIR / "ingest" / order_id / f"{idx}.zip"
+        logger.info("ingest.download.start", extra={"order_id": order_id, "idx": idx, "url": str(cust_url)})
+        _download_customisation(str(cust_url), tmp_zip, budget)
+        zip_sha = ingest_cache.hash_file(tmp_zip) if settings.INGEST_CACHE_ENABLED else None
+        if zip_sha:
+            # Same ZIP behind a new URL: reuse the parsed result
+            cached = ingest_cache.lookup_content(zip_sha)
+            if cached is not None:
+                ingest_cache.remember_url(cust_url, zip_sha)
+                _use_cached(out, cached, order_id, idx, dest_dir, storage)
+                return out
+        if settings.ZIP_INGEST_MODE.lower() == "extract":
+            extracted = safe_extract(tmp_zip, dest_dir, max_mb=settings.MAX_ZIP_MB)
+            pdata = parse_personalisation(extracted)
+        else:
+            # Parse in place; members are written out only to be published as assets
+            pdata, extracted = parse_archive(
+                tmp_zip, dest_dir, max_mb=settings.MAX_ZIP_MB, inmemory_max_bytes=settings.ZIP_INMEMORY_MAX_KB * 1024,
+                keep_members=settings.ZIP_ARCHIVE_KEEP_MEMBERS,
             )
-        except Exception:
-            pass
+        logger.info("ingest.download.done", extra={"order_id": order_id, "idx": idx, "files": len(extracted)})
+        _publish_members(out, extracted, order_id, idx, storage)
+        photo = pdata.get("photo_path")
+        if isinstance(photo, Path):
+            # Hashed here, on the download stage, and cached with the parse result
+            pdata["photo_sha256"] = ingest_cache.hash_file(photo)
+        out.pdata = pdata
+        if zip_sha:
+            out.cache = "misses"
+            if not out.warnings:
+                try:
+                    ingest_cache.store(cust_url, zip_sha, pdata, extracted, dest_dir)
+                except Exception:
+                    logger.warning("ingest cache store failed row=%s", idx, exc_info=True)
+    except HostUnavailableError as ue:
+        out.transient = True
+        queued = queue_retry and _queue_retry(order_id, idx, cust_url, storage)
+        msg = f"{ue}; queued for background retry" if queued else str(ue)
+        out.warnings.append(QaWarning(code="ZIP_DOWNLOAD_FAILED", message=msg, severity=Severity.error, field="customized-url"))
+    except ZipTooLargeError as ze:
+        out.warnings.append(QaWarning(code="ZIP_TOO_LARGE", message=str(ze), severity=Severity.error, field="customized-url"))
+    except ZipHttpError as he:
+        out.transient = _is_transient(he)
+        if out.transient and queue_retry:
+            _queue_retry(order_id, idx, cust_url, storage)
+        out.warnings.append(QaWarning(code="ZIP_DOWNLOAD_FAILED", message=f"HTTP {he.status}", severity=Severity.error, field="customized-url"))
+    except Exception as e:
+        out.transient = _is_transient(e)
+        if out.transient and queue_retry:
+            _queue_retry(order_id, idx, cust_url, storage)
+        logger.exception("ingest.zip.error row=%s", idx)
+        out.warnings.append(QaWarning(code="ZIP_PROCESSING_ERROR", message=str(e)[:200], severity=Severity.error, field="customized-url"))
+    return out
 
-    # merge_qa kept for parity; here we have single source
-    merged = merge_qa(warnings, [])
-    return {"items": [i.model_dump() for i in items], "warnings": [w.model_dump() for w in merged]}
+
+def _replay_row(line, ref, storage) -> Optional[Tuple[IngestItem, List[QaWarning]]]:
+    """A recorded row with its URLs rebuilt, or None if it has to be ingested again.
+
+    The stored URLs are not reused: presigned photo URLs expire, and local
+    downloads/ files are cleared by the janitor. The photo is served from the
+    row's photo_refs blob; asset keys are kept only while their file exists.
+    """
+    stored_item, stored_warnings = order_index.stored_result(line)
+    if stored_item.get("photo_asset_url"):
+        if ref is None or not photo_store.available(ref.blob_name):
+            return None  # the photo is gone; fetch it again
+        url = photo_store.url_for(ref.blob_name, storage=storage)
+        stored_item["photo_asset_id"] = stored_item["photo_asset_url"] = url
+        photo_store.touch(ref)
+    if settings.STORAGE_BACKEND.lower() != "s3":
+        # S3 keys are stable; local keys are paths under DATA_DIR
+        stored_item["assets"] = [k for k in stored_item.get("assets") or [] if (settings.DATA_DIR / k).is_file()]
+    return IngestItem(**stored_item), [QaWarning(**w) for w in stored_warnings]
+
+
+def _publish_members(out: _FetchedRow, files: List[Path], order_id: str, idx: int, storage) -> None:
+    """Upload extracted files to storage if S3 mode; in local mode, derive keys."""
+    for pth in files:
+        if settings.STORAGE_BACKEND.lower() == "s3":
+            key = f"downloads/{order_id}/{idx}/{pth.name}"
+            try:
+                ctype = _guess_content_type(pth.suffix)
+                storage.put_file(key, pth, content_type=ctype)
+                out.asset_keys.append(key)
+            except Exception as e:
+                out.warnings.append(QaWarning(code="ZIP_UPLOAD_FAILED", message=str(e), severity=Severity.error))
+        else:
+            # local mode: key is relative to DATA_DIR
+            rel = pth.relative_to(settings.DATA_DIR)
+            out.asset_keys.append(str(rel))
+
+
+def _use_cached(out: _FetchedRow, cached: Dict[str, Any], order_id: str, idx: int, dest_dir: Path, storage) -> None:
+    """Answer a row from the ingest cache, republishing its members under this row's order."""
+    out.pdata, out.cache = cached["pdata"], "hits"
+    members = cached["members"]
+    if settings.STORAGE_BACKEND.lower() == "s3":
+        # Keys only use the file name, so upload straight from the cache entry
+        files = [path for path, _ in members]
+    else:
+        files = []
+        for path, rel in members:
+            target = dest_dir / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            publish_file(path, target)
+            files.append(target)
+    _publish_members(out, files, order_id, idx, storage)
 
 
 def _guess_content_type(ext: str) -> str:
@@ -5,23 +5,18 @@ from typing import List
 from uuid import uuid4
 from pathlib import Path
 from ..settings import settings
-from ..models import OrderItem, GenerateRequest, PreviewResponse, GenerateResponse, QaWarning, Severity
-from ..utils.qa import qa_item, merge_qa
-from ..processors import uv_regular_v1  # ensure registration
-from ..processors import text_only_v1  # batch stub registration
-from ..processors import photo_basic_v1  # batch stub registration
-# from ..processors import regular_stake_v1  # DISABLED - using PDF version
-from ..processors import regular_stake_pdf_v1  # regular stake PDF processor (new)
-# from ..processors import photo_stakes_v1  # DISABLED - using PDF version
-from ..processors import photo_stakes_pdf_v1  # photo stakes PDF processor (new)
+from ..models import OrderItem, GenerateRequest, PreviewResponse, GenerateResponse, BedPlanSummary, QaWarning, Severity
+from ..utils.qa import qa_item, qa_items, merge_qa
 from ..processors.item_router import get as get_processor
-from ..processors.item_router import get_batch as get_batch_processor
+from ..processors.render_pool import run_batch, RenderWorkerError
 from ..processors.item_router import key_for_item
 from ..utils.svg_compose import compose_bed_svg, save_svg_and_png, svg_to_png_bytes, BED_W, BED_H
 from ..packer.rect_packer import pack_first_fit, pack_paginated, Rect
 import csv
 from ..auth import get_current_user
 from ..utils.storage import get_storage
+from ..utils import job_paths
+from ..utils.ingest_sessions import get_store as get_sessions
 from ..middleware.rate_limit import limiter
 from fastapi import Request
 
@@ -60,29 +55,39 @@ def preview_item(item: OrderItem = Body(...)):
     proc = get_processor(template["processor"]["name"], template["processor"]["version"])
     svg = proc(item)
     # Save preview
-    out_dir = settings.PREVIEWS_DIR / job_id
+    out_dir = job_paths.preview_dir(job_id)
     out_dir.mkdir(parents=True, exist_ok=True)
     svg_path = out_dir / "preview.svg"
     png_path = out_dir / "preview.png"
     save_svg_and_png(svg, svg_path, png_path)
-    return PreviewResponse(job_id=job_id, preview_url=f"/static/previews/{job_id}/preview.png", warnings=warnings)
+    return PreviewResponse(job_id=job_id, preview_url=job_paths.preview_url(job_id, "preview.png"), warnings=warnings)
+
+def _request_items(req: GenerateRequest) -> List[OrderItem]:
+    """The items to generate: posted inline, or looked up by ingest_id."""
+    if not req.ingest_id:
+        return req.items
+    try:
+        items = get_sessions().order_items(req.ingest_id, req.selection)
+    except IndexError as e:
+        raise HTTPException(status_code=400, detail=f"selection index {e.args[0]} is out of range for this ingest")
+    if items is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired ingest_id; ingest the report again")
+    return items
 
 @router.post("/jobs/generate", response_model=GenerateResponse)
 @limiter.limit("10/minute")
 def generate_job(request: Request, req: GenerateRequest, user=Depends(get_current_user)):
     job_id = uuid4().hex[:8]
     template = TEMPLATE_MAP["PLAQUE-140x90-V1"]
-    # QA all
-    all_warnings: List[QaWarning] = []
-    for it in req.items:
-        w = qa_item(it, template)
-        all_warnings.extend(w)
+    order_items = _request_items(req)
+    # QA all, in one pass over the batch
+    all_warnings: List[QaWarning] = qa_items(order_items, template).flat()
     if any(w.severity == Severity.error for w in all_warnings):
         raise HTTPException(status_code=422, detail={"warnings": [w.model_dump() for w in all_warnings]})
 
     # Group items by processor key
     groups: dict[str, List[OrderItem]] = {}
-    for it in req.items:
+    for it in order_items:
         k = key_for_item(it)
         # Debug logging
         print(f"[ROUTING] Item {it.order_ref}: decoration_type={getattr(it, 'decoration_type', None)}, product_type={getattr(it, 'product_type', None)}, colour={getattr(it, 'colour', None)} -> processor={k}")
@@ -96,11 +101,11 @@ def generate_job(request: Request, req: GenerateRequest, user=Depends(get_curren
         ptyp = (getattr(x, "product_type", None) or "").strip()
         return dec == "" and gfx == "" and ptyp == ""
 
-    if set(groups.keys()) == {"text_only_v1"} and all(_is_plain_text_only(it) for it in req.items):
+    if set(groups.keys()) == {"text_only_v1"} and all(_is_plain_text_only(it) for it in order_items):
         proc = get_processor(template["processor"]["name"], template["processor"]["version"])
         rects: List[Rect] = []
         item_svgs: List[str] = []
-        for idx, it in enumerate(req.items):
+        for idx, it in enumerate(order_items):
             svg = proc(it)
             item_svgs.append(svg)
             rects.append(Rect(id=str(idx), w=template["w"], h=template["h"]))
@@ -141,7 +146,7 @@ def generate_job(request: Request, req: GenerateRequest, user=Depends(get_curren
                 overlays = []
                 for p in bed:
                     idx_i = int(p.id)
-                    it = req.items[idx_i]
+                    it = order_items[idx_i]
                     line_map = {l.id: l.value for l in it.lines}
                     l1 = line_map.get("line_1", "")
                     if l1:
@@ -167,7 +172,7 @@ def generate_job(request: Request, req: GenerateRequest, user=Depends(get_curren
         for bi, bed in enumerate(beds, start=1):
             for pi, p in enumerate(bed):
                 idx = int(p.id)
-                it = req.items[idx]
+                it = order_items[idx]
                 line_map = {l.id: l.value for l in it.lines}
                 writer.writerow([
                     job_id, bi, pi, idx, it.item_id, (it.order_ref or ""), it.template_id,
@@ -184,17 +189,28 @@ def generate_job(request: Request, req: GenerateRequest, user=Depends(get_curren
 
     # Otherwise, dispatch each group to batch processors
     artifacts: List[str] = []
-    out_dir = settings.JOBS_DIR / job_id
-    cfg = {"job_id": job_id, "output_dir": out_dir, "seed": req.seed or settings.DEFAULT_SEED}
+    out_dir = job_paths.job_dir(job_id)
+    group_by_material = settings.GROUP_BY_MATERIAL if req.group_by_material is None else req.group_by_material
+    cfg = {"job_id": job_id, "output_dir": out_dir, "seed": req.seed or settings.DEFAULT_SEED, "group_by_material": group_by_material}
+    plans: dict[str, BedPlanSummary] = {}
     print(f"[BATCH] Processing {len(groups)} processor groups: {list(groups.keys())}")
     for k, items in groups.items():
         print(f"[BATCH] Processor '{k}' handling {len(items)} items")
+        group_cfg = dict(cfg)
         try:
-            proc = get_batch_processor(k)
+            svg_url, csv_url, warns = run_batch(k, items, group_cfg)
         except KeyError:
             print(f"[BATCH] ERROR: Processor '{k}' not found in registry")
             # Unknown processor: skip
             continue
-        svg_url, csv_url, warns = proc(items, cfg)
-        artifacts.extend([svg_url, csv_url])
-    return GenerateResponse(job_id=job_id, artifacts=artifacts, warnings=all_warnings)
+        except RenderWorkerError as e:
+            # Isolated worker died (e.g. memory cap): fail this group, keep the API up
+            all_warnings.append(QaWarning(code="RENDER_FAILED", message=str(e), severity=Severity.error, field=k))
+            continue
+        # Paginating processors list every bed output; others return a single one
+        artifacts.extend([*(group_cfg.get("bed_urls") or [svg_url]), csv_url])
+        # Processors that fill beds by material report their plan back via cfg
+        if group_cfg.get("bed_plan"):
+            plans[k] = BedPlanSummary(**group_cfg["bed_plan"])
+    changeovers = sum(p.changeovers for p in plans.values()) if plans else None
+    return GenerateResponse(job_id=job_id, artifacts=artifacts, warnings=all_warnings, changeovers=changeovers, plans=plans)
@@ -0,0 +1,163 @@
+from fastapi import APIRouter, Body, Depends, File, Query, Request, UploadFile
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from uuid import uuid4
+import asyncio
+import logging
+import time
+
+from ..auth import get_current_user
+from ..database import get_db
+from ..middleware.rate_limit import limiter
+from ..models import IngestItem, OrderItem, QaWarning, Severity
+from ..packer.grouping import BedFiller, count_changeovers, MATERIAL_PRIORITY
+from ..processors.item_router import batch_capacity, key_for_item
+from ..processors.render_pool import RenderWorkerError, run_batch
+from ..settings import settings
+from ..utils import job_paths
+from ..utils.ingest_sessions import get_store as get_sessions, to_order_item
+from ..utils.qa import merge_qa, qa_item
+from .ingest_amazon import _read_rows, _start_ingest
+from .jobs import TEMPLATE_MAP
+
+# Ingest and generate as one pipelined pass. Stages are connected by bounded
+# queues:
+#   ingest (download -> parse -> SKU enrich -> QA, see _start_ingest)
+#     -> [PIPELINE_QUEUE_SIZE items] -> group + bed fill
+#     -> [PIPELINE_RENDER_QUEUE beds] -> render workers
+# A bed is rendered as soon as its processor/material bucket is full, while
+# later rows are still downloading, so a day's report finishes close to its
+# download time rather than the sum of the stages.
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@dataclass
+class _Bed:
+    seq: int
+    key: str
+    material: str
+    items: List[OrderItem]
+
+
+def _capacity(key: str) -> Optional[int]:
+    try:
+        return batch_capacity(key)
+    except KeyError:
+        return None  # unknown processor: held for flush, reported by the render stage
+
+
+@router.post("/jobs/pipeline")
+@limiter.limit("10/minute")
+async def pipeline_job(
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    payload: Optional[Dict[str, Any]] = Body(None),
+    seed: Optional[int] = Query(None),
+    group_by_material: Optional[bool] = Query(None),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Ingest a report and render its beds as they fill.
+
+    Accepts the same inputs as /ingest/amazon. Items failing QA with an error
+    are held back (listed in `held`) instead of failing the job, since beds
+    may already have been rendered; generate them by ingest_id once fixed.
+    Every bed is its own batch run, published under jobs/<job_id>/<key>-<n>/.
+    """
+    rows = await _read_rows(request, file, payload)
+    job_id = uuid4().hex[:8]
+    grouped = settings.GROUP_BY_MATERIAL if group_by_material is None else group_by_material
+    template = TEMPLATE_MAP["PLAQUE-140x90-V1"]
+    workers = max(1, settings.RENDER_WORKERS)
+    started = time.monotonic()
+    timings: Dict[str, float] = {}
+
+    stream, cache_stats, skipped = _start_ingest(rows, mode="full", db=db)
+    ready: "asyncio.Queue[Optional[IngestItem]]" = asyncio.Queue(maxsize=max(1, settings.PIPELINE_QUEUE_SIZE))
+    beds: "asyncio.Queue[Optional[_Bed]]" = asyncio.Queue(maxsize=max(1, settings.PIPELINE_RENDER_QUEUE))
+
+    items: List[IngestItem] = []
+    warnings: List[QaWarning] = []
+    held: List[str] = []
+    rendered: List[Tuple[_Bed, List[str]]] = []
+
+    async def ingest_stage() -> None:
+        async for _idx, item, row_warnings in stream:
+            items.append(item)
+            warnings.extend(row_warnings)
+            await ready.put(item)
+        await ready.put(None)
+        timings["ingest_s"] = round(time.monotonic() - started, 3)
+
+    async def fill_stage() -> None:
+        filler = BedFiller(_capacity, grouped=grouped)
+        seq = 0
+        while (item := await ready.get()) is not None:
+            order_item = to_order_item(item)
+            qa = qa_item(order_item, template)
+            warnings.extend(qa)
+            if any(w.severity == Severity.error for w in qa):
+                held.append(order_item.order_ref or "")
+                continue
+            full = filler.add(key_for_item(order_item), order_item)
+            if full is not None:
+                await beds.put(_Bed(seq, *full))
+                seq += 1
+        for bed in filler.flush():
+            await beds.put(_Bed(seq, *bed))
+            seq += 1
+        for _ in range(workers):
+            await beds.put(None)
+
+    async def render_stage() -> None:
+        while (bed := await beds.get()) is not None:
+            name = f"{bed.key}-{bed.seq:03d}"
+            cfg = {
+                "job_id": f"{job_id}/{name}",
+                "output_dir": job_paths.job_dir(f"{job_id}/{name}"),
+                "seed": seed or settings.DEFAULT_SEED,
+                "group_by_material": grouped,
+            }
+            try:
+                svg_url, csv_url, _ = await asyncio.to_thread(run_batch, bed.key, bed.items, cfg)
+            except KeyError:
+                logger.warning("pipeline: no batch processor %s; %d items skipped", bed.key, len(bed.items))
+                continue
+            except RenderWorkerError as e:
+                warnings.append(QaWarning(code="RENDER_FAILED", message=str(e), severity=Severity.error, field=bed.key))
+                continue
+            timings.setdefault("first_bed_s", round(time.monotonic() - started, 3))
+            rendered.append((bed, [*(cfg.get("bed_urls") or [svg_url]), csv_url]))
+
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(ingest_stage())
+        tg.create_task(fill_stage())
+        for _ in range(workers):
+            tg.create_task(render_stage())
+    timings["total_s"] = round(time.monotonic() - started, 3)
+
+    # Report beds in print order: by processor, then material priority
+    rendered.sort(key=lambda r: (r[0].key, MATERIAL_PRIORITY.get(r[0].material, len(MATERIAL_PRIORITY)), r[0].seq))
+    by_key: Dict[str, List[List[str]]] = {}
+    for bed, _urls in rendered:
+        by_key.setdefault(bed.key, []).append([bed.material])
+    return {
+        "job_id": job_id,
+        "ingest_id": get_sessions().put(items),
+        "items": [i.model_dump() for i in items],
+        "warnings": [w.model_dump() for w in merge_qa(warnings, [])],
+        "held": held,
+        "cache": cache_stats,
+        "skipped": skipped,
+        "beds": [
+            {"processor": bed.key, "material": bed.material, "items": len(bed.items), "artifacts": urls}
+            for bed, urls in rendered
+        ],
+        "artifacts": [u for _bed, urls in rendered for u in urls],
+        "changeovers": sum(count_changeovers(mats) for mats in by_key.values()) if rendered else None,
+        "timings": timings,
+    }
@@ -11,14 +11,83 @@ class Settings(BaseSettings):
     PHOTOS_DIR: Path = DATA_DIR / "photos"
     DEFAULT_SEED: int = 42
     DOWNLOAD_CONCURRENCY: int = 4
+    # Max parallel downloads against any single host
+    DOWNLOAD_PER_HOST_CONCURRENCY: int = 4
     DOWNLOAD_TIMEOUT_S: int = 30
+    # Attempts per customisation ZIP; retries beyond the first draw on a
+    # budget shared by all rows of one ingest
+    DOWNLOAD_RETRIES: int = 3
+    DOWNLOAD_BACKOFF_S: float = 0.5
+    DOWNLOAD_RETRY_BUDGET: int = 10
+    # Per-host circuit breaker: consecutive failures to trip, seconds until a probe
+    DOWNLOAD_BREAKER_FAILURES: int = 5
+    DOWNLOAD_BREAKER_COOLDOWN_S: float = 30.0
+    # Background retry of rows that failed on a transient host error
+    DOWNLOAD_RETRY_QUEUE_ENABLED: bool = True
+    DOWNLOAD_RETRY_QUEUE_MAX: int = 1000
+    DOWNLOAD_RETRY_QUEUE_ATTEMPTS: int = 5
+    DOWNLOAD_RETRY_QUEUE_DELAY_S: float = 30.0
     MAX_ZIP_MB: int = 25
+    # "archive" parses customisation ZIPs in place; "extract" unpacks every member first
+    ZIP_INGEST_MODE: str = "archive"
+    # Archives up to this size are parsed from memory
+    ZIP_INMEMORY_MAX_KB: int = 1024
+    # archive mode: still write out (and on S3 upload) every member extract mode
+    # would, so previews/SVG/JSON stay in IngestItem.assets; false = the photo only
+    ZIP_ARCHIVE_KEEP_MEMBERS: bool = True
     USER_AGENT: str = "NBNE-Ingest/1.0"
+    # Shared HTTP session pool: hosts kept, connections per host
+    HTTP_POOL_HOSTS: int = 4
+    HTTP_POOL_MAXSIZE: int = 8
     DOWNLOAD_TMP_DIR: Path = Path("/tmp/downloads")
     ALLOW_EXTERNAL_DOWNLOADS: bool = True
-    CLEAN_PHOTOS_ON_START: bool = True
-    # SKU map reload (seconds). 0 disables background reload.
-    SKU_MAP_RELOAD_SEC: int = 0
+    # Parsed customisation ZIP cache (keyed by customized-url and ZIP SHA-256)
+    INGEST_CACHE_ENABLED: bool = True
+    INGEST_CACHE_DIR: Path | None = None  # default DATA_DIR/cache/ingest
+    INGEST_CACHE_TTL_S: int = 7 * 24 * 3600
+    INGEST_CACHE_MAX_MB: int = 512
+    INGEST_CACHE_SWEEP_S: int = 300
+    # Ingest results kept for /jobs/generate by ingest_id (idle TTL, max held)
+    INGEST_SESSION_TTL_S: int = 3600
+    INGEST_SESSION_MAX: int = 64
+    # Extra QA phrase rules (JSON, see utils.qa.phrase_rules); re-read when changed
+    QA_RULES_PATH: Path | None = None
+    # Shard job/preview directories as JOBS_DIR/ab/cd/{job_id} (utils/job_paths.py);
+    # flat directories left from before are moved in the background at start-up
+    JOB_DIR_SHARDING: bool = True
+    JOB_DIR_MIGRATE_ON_START: bool = True
+    # Background disk janitor (utils/janitor.py): per-area idle TTL in seconds
+    # and size quota in MB, least recently used evicted first; 0 disables either
+    JANITOR_ENABLED: bool = True
+    JANITOR_INTERVAL_S: int = 600
+    JANITOR_GRACE_S: int = 900  # entries used this recently are never removed
+    JANITOR_JOBS_TTL_S: int = 14 * 24 * 3600
+    JANITOR_JOBS_MAX_MB: int = 2048
+    JANITOR_PREVIEWS_TTL_S: int = 2 * 24 * 3600
+    JANITOR_PREVIEWS_MAX_MB: int = 256
+    JANITOR_DOWNLOADS_TTL_S: int = 24 * 3600
+    JANITOR_DOWNLOADS_MAX_MB: int = 1024
+    JANITOR_INGEST_TMP_TTL_S: int = 3600
+    JANITOR_INGEST_TMP_MAX_MB: int = 1024
+    # Photo blobs also stay while a photo_refs row was linked to them within the
+    # TTL (with no TTL, every referenced blob stays)
+    JANITOR_PHOTOS_TTL_S: int = 30 * 24 * 3600
+    JANITOR_PHOTOS_MAX_MB: int = 2048
+    # Give each material/colour its own beds to minimise printer changeovers
+    GROUP_BY_MATERIAL: bool = True
+    # Batch render workers (0 = render in the API process)
+    RENDER_WORKERS: int = 1
+    RENDER_WORKER_MAX_MB: int = 1536
+    RENDER_WORKER_MAX_TASKS: int = 20
+    RENDER_TIMEOUT_S: int = 300
+    # /jobs/pipeline: items buffered ahead of bed filling, full beds waiting for a render worker
+    PIPELINE_QUEUE_SIZE: int = 64
+    PIPELINE_RENDER_QUEUE: int = 4
+    # Catalogue files are re-stat'ed at most this often (0 = every read)
+    CATALOG_CHECK_S: float = 2.0
+    # SKU map reload (seconds). 0 disables background reload; lookups never
+    # stat the file, so this is how SKULIST.csv edits are picked up.
+    SKU_MAP_RELOAD_SEC: int = 30
     # Storage
     STORAGE_BACKEND: str = "local"  # "local" | "s3"
     S3_BUCKET: str | None = None
@@ -26,6 +95,16 @@ class Settings(BaseSettings):
     S3_ENDPOINT_URL: str | None = None
     S3_ACCESS_KEY_ID: str | None = None
     S3_SECRET_ACCESS_KEY: str | None = None
+    S3_ADDRESSING_STYLE: str = "auto"  # "path" for MinIO and other local stand-ins
+    # One pooled S3 client per process (utils/storage.get_storage)
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    S3_CONNECT_TIMEOUT_S: int = 5
+    S3_READ_TIMEOUT_S: int = 60
+    S3_MAX_ATTEMPTS: int = 3
+    # put_file streams from disk; above the threshold it uploads in parts, in parallel
+    S3_MULTIPART_THRESHOLD_MB: int = 16
+    S3_MULTIPART_CHUNK_MB: int = 8
+    S3_UPLOAD_CONCURRENCY: int = 4
     PRESIGN_EXPIRES_S: int = 3600
     # SKU list CSV (container path; mount host ./assets to /app/assets)
     # On Render, use relative path from backend directory
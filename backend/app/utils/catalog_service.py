@@ -0,0 +1,141 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from ..settings import settings
+
+# catalog.json plus machines/*.json and materials/*.json under DATA_DIR, parsed
+# once and kept with derived indexes. Files are re-stat'ed at most every
+# CATALOG_CHECK_S seconds and the snapshot is rebuilt when any mtime/size
+# changes, so reads are attribute/dict lookups on an immutable snapshot.
+
+logger = logging.getLogger(__name__)
+
+Signature = Tuple[Tuple[str, int, int], ...]
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    templates: List[Dict[str, Any]] = field(default_factory=list)
+    machines: List[Dict[str, Any]] = field(default_factory=list)
+    materials: List[Dict[str, Any]] = field(default_factory=list)
+    # template id -> {field id: maxLen} for text fields
+    maxlens: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # template id -> {"w", "h", "processor", "requires_photo"}
+    template_info: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    etag: str = '""'
+
+    def payload(self) -> Dict[str, Any]:
+        return {"templates": self.templates, "machines": self.machines, "materials": self.materials}
+
+
+_lock = threading.Lock()
+_snapshot: Optional[CatalogSnapshot] = None
+_signature: Optional[Signature] = None
+_data_dir: Optional[Path] = None
+_checked_at = 0.0
+
+
+def _sources(data_dir: Path) -> List[Path]:
+    paths = [data_dir / "catalog.json"]
+    for sub in ("machines", "materials"):
+        d = data_dir / sub
+        if d.is_dir():
+            paths.extend(sorted(d.glob("*.json")))
+    return paths
+
+
+def _signature_of(data_dir: Path) -> Signature:
+    sig = []
+    for p in _sources(data_dir):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        sig.append((str(p), st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def _read_json(path: Path) -> Any:
+    try:
+        return json.loads(path.read_text("utf-8"))
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("catalog: could not parse %s", path, exc_info=True)
+        return None
+
+
+def _build(data_dir: Path) -> CatalogSnapshot:
+    catalog = _read_json(data_dir / "catalog.json") or {}
+    templates = list(catalog.get("templates", [])) if isinstance(catalog, dict) else []
+    machines = [m for m in (_read_json(p) for p in sorted((data_dir / "machines").glob("*.json"))) if m is not None]
+    materials = [m for m in (_read_json(p) for p in sorted((data_dir / "materials").glob("*.json"))) if m is not None]
+
+    maxlens: Dict[str, Dict[str, int]] = {}
+    info: Dict[str, Dict[str, Any]] = {}
+    for t in templates:
+        tid = t.get("id")
+        if not tid:
+            continue
+        lens: Dict[str, int] = {}
+        for f in (t.get("options") or {}).get("fields", []):
+            if f.get("type") == "text":
+                try:
+                    lens[f["id"]] = int(f.get("maxLen", 10**9))
+                except (KeyError, TypeError, ValueError):
+                    continue
+        maxlens[tid] = lens
+        proc = t.get("processor")
+        info[tid] = {
+            "w": t.get("w"),
+            "h": t.get("h"),
+            "processor": proc.get("name") if isinstance(proc, dict) else proc,
+            "requires_photo": bool(t.get("requiresPhoto", False)),
+        }
+
+    body = json.dumps(
+        {"templates": templates, "machines": machines, "materials": materials}, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+    return CatalogSnapshot(
+        templates=templates,
+        machines=machines,
+        materials=materials,
+        maxlens=maxlens,
+        template_info=info,
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+    )
+
+
+def get_catalog() -> CatalogSnapshot:
+    """Current catalogue snapshot, rebuilt only when a source file changed."""
+    global _snapshot, _signature, _data_dir, _checked_at
+    data_dir = settings.DATA_DIR
+    now = time.monotonic()
+    snap = _snapshot
+    if snap is not None and data_dir == _data_dir and now - _checked_at < settings.CATALOG_CHECK_S:
+        return snap
+    with _lock:
+        sig = _signature_of(data_dir)
+        if _snapshot is None or data_dir != _data_dir or sig != _signature:
+            _snapshot = _build(data_dir)
+            _signature = sig
+            _data_dir = data_dir
+        _checked_at = now
+        return _snapshot
+
+
+def template_maxlens(template_id: Optional[str]) -> Dict[str, int]:
+    return get_catalog().maxlens.get(template_id or "", {})
+
+
+def invalidate() -> None:
+    global _snapshot
+    with _lock:
+        _snapshot = None
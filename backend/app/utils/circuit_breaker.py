@@ -0,0 +1,140 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+import threading
+import time
+
+from ..settings import settings
+
+# Per-host circuit breaker and per-ingest retry budget for customisation
+# downloads. After DOWNLOAD_BREAKER_FAILURES consecutive failed attempts a
+# host is "open": callers fail fast instead of waiting out timeouts and
+# back-off. After DOWNLOAD_BREAKER_COOLDOWN_S one probe is let through
+# ("half open"); its outcome closes or re-opens the circuit.
+
+
+def host_of(url: str) -> str:
+    return (urlsplit(url).netloc or "").lower()
+
+
+class HostUnavailableError(Exception):
+    def __init__(self, host: str, retry_after_s: float):
+        super().__init__(f"circuit open for {host}; retry in {retry_after_s:.0f}s")
+        self.host = host
+        self.retry_after_s = retry_after_s
+
+
+@dataclass
+class _HostState:
+    failures: int = 0
+    opened_at: Optional[float] = None
+    probing: bool = False
+
+
+class HostBreaker:
+    def __init__(
+        self,
+        *,
+        threshold: Optional[int] = None,
+        cooldown_s: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        # None: follow settings, read on each call
+        self._threshold = threshold
+        self._cooldown_s = cooldown_s
+        self._clock = clock
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def threshold(self) -> int:
+        return max(1, int(self._threshold if self._threshold is not None else settings.DOWNLOAD_BREAKER_FAILURES))
+
+    @property
+    def cooldown_s(self) -> float:
+        return float(self._cooldown_s if self._cooldown_s is not None else settings.DOWNLOAD_BREAKER_COOLDOWN_S)
+
+    def _remaining(self, st: _HostState) -> float:
+        if st.opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown_s - (self._clock() - st.opened_at))
+
+    def allow(self, host: str) -> bool:
+        """True if a request to host may go ahead (claims the probe when half open)."""
+        with self._lock:
+            st = self._hosts.get(host)
+            if st is None or st.opened_at is None:
+                return True
+            if self._remaining(st) > 0 or st.probing:
+                return False
+            st.probing = True
+            return True
+
+    def retry_after(self, host: str) -> float:
+        """Seconds until host accepts a probe again (0 when closed or due)."""
+        with self._lock:
+            st = self._hosts.get(host)
+            return self._remaining(st) if st is not None else 0.0
+
+    def check(self, host: str) -> None:
+        """allow() that raises HostUnavailableError instead of returning False."""
+        if not self.allow(host):
+            raise HostUnavailableError(host, self.retry_after(host))
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            st = self._hosts.setdefault(host, _HostState())
+            st.failures += 1
+            # A failed probe re-opens at once; otherwise trip on the threshold
+            if st.probing or st.opened_at is not None or st.failures >= self.threshold:
+                st.opened_at = self._clock()
+            st.probing = False
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            out: Dict[str, Dict[str, object]] = {}
+            for host, st in self._hosts.items():
+                if st.opened_at is None:
+                    state = "closed"
+                elif self._remaining(st) > 0:
+                    state = "open"
+                else:
+                    state = "half_open"
+                out[host] = {"state": state, "failures": st.failures, "retry_after_s": round(self._remaining(st), 1)}
+            return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+
+class RetryBudget:
+    """Retry attempts shared by every row of one ingest request."""
+
+    def __init__(self, tokens: int) -> None:
+        self._left = max(0, int(tokens))
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self._left <= 0:
+                return False
+            self._left -= 1
+            return True
+
+    @property
+    def left(self) -> int:
+        return self._left
+
+
+_breaker = HostBreaker()
+
+
+def get_breaker() -> HostBreaker:
+    """Process-wide breaker, so an outage seen by one report protects the next."""
+    return _breaker
@@ -0,0 +1,53 @@
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+from urllib.parse import urlsplit
+import threading
+
+T = TypeVar("T")
+
+
+class DownloadStage:
+    """Bounded-concurrency download stage for ingest.
+
+    Tasks run on a thread pool of `concurrency` workers (the overall bound);
+    a per-host semaphore additionally caps parallel requests to any one host.
+    Callers consume futures in row order, so processing of finished rows
+    overlaps with downloads still in flight.
+    """
+
+    def __init__(self, *, concurrency: int, per_host: int) -> None:
+        self.concurrency = max(1, int(concurrency))
+        self.per_host = max(1, int(per_host))
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ingest-dl")
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = (urlsplit(url).netloc or "").lower()
+        with self._lock:
+            sem = self._hosts.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.per_host)
+                self._hosts[host] = sem
+            return sem
+
+    def submit(self, url: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """Schedule fn(*args, **kwargs) as the download of `url`."""
+        slot = self._host_slot(url)
+
+        def _task() -> T:
+            with slot:
+                return fn(*args, **kwargs)
+
+        return self._executor.submit(_task)
+
+    def close(self, *, cancel: bool = False) -> None:
+        self._executor.shutdown(wait=not cancel, cancel_futures=cancel)
+
+    def __enter__(self) -> "DownloadStage":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # On error, drop queued downloads instead of waiting for them
+        self.close(cancel=exc_type is not None)
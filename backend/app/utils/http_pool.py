@@ -0,0 +1,89 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..settings import settings
+
+# One requests.Session per process so customisation-ZIP fetches reuse
+# keep-alive connections instead of paying a TCP/TLS handshake per file.
+# urllib3 only returns a connection to the pool once its response has been
+# fully read, so reuse never interleaves two requests on one socket.
+
+_session: Optional[requests.Session] = None
+_lock = threading.Lock()
+
+
+def _pool_size() -> int:
+    # At least one connection per concurrent download, or workers would block
+    return max(settings.HTTP_POOL_MAXSIZE, settings.DOWNLOAD_CONCURRENCY, 1)
+
+
+def _build_session() -> requests.Session:
+    s = requests.Session()
+    # Retries are handled by the callers (download_zip), not by urllib3
+    adapter = HTTPAdapter(
+        pool_connections=max(1, settings.HTTP_POOL_HOSTS),
+        pool_maxsize=_pool_size(),
+        pool_block=True,
+        max_retries=0,
+    )
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update({"Connection": "keep-alive", "User-Agent": settings.USER_AGENT})
+    return s
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide HTTP session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def close_session() -> None:
+    global _session
+    with _lock:
+        s, _session = _session, None
+    if s is not None:
+        s.close()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Per-host connection pool counters for the shared session.
+
+    connections_opened counts new TCP connections; requests counts requests
+    sent. A requests/connections ratio well above 1 means keep-alive is working.
+    """
+    s = _session
+    hosts: Dict[str, Dict[str, int]] = {}
+    if s is not None:
+        seen = set()
+        for adapter in s.adapters.values():
+            if id(adapter) in seen:
+                continue
+            seen.add(id(adapter))
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                name = f"{pool.scheme}://{pool.host}:{pool.port}"
+                hosts[name] = {
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                    # The pool queue is pre-filled with None for unopened slots
+                    "idle": sum(1 for c in list(getattr(pool.pool, "queue", ())) if c is not None),
+                }
+    return {
+        "active": s is not None,
+        "maxsize": _pool_size(),
+        "connections_opened": sum(h["connections_opened"] for h in hosts.values()),
+        "requests": sum(h["requests"] for h in hosts.values()),
+        "hosts": hosts,
+    }
@@ -0,0 +1,199 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from ..settings import settings
+
+# On-disk cache of parsed customisation ZIPs, so re-ingesting a report skips
+# rows already seen. Layout under cache_root():
+#   urls/<sha256(url)>.json          -> {"zip_sha256": ..., "stored_at": ...}
+#   entries/<ab>/<zip_sha256>/result.json (+ the chosen photo, if any)
+#   entries/<ab>/<zip_sha256>/members/...  the extracted files published as assets
+# Entries expire after INGEST_CACHE_TTL_S; the oldest-used are evicted once
+# the cache exceeds INGEST_CACHE_MAX_MB. Members are copies, not asset keys:
+# a hit republishes them under the new row's order, and the originals under
+# downloads/ may be gone (the janitor clears them) long before the entry is.
+
+logger = logging.getLogger(__name__)
+
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+
+def cache_root() -> Path:
+    return settings.INGEST_CACHE_DIR or (settings.DATA_DIR / "cache" / "ingest")
+
+
+def _url_file(url: str) -> Path:
+    return cache_root() / "urls" / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+
+def _entry_dir(zip_sha: str) -> Path:
+    return cache_root() / "entries" / zip_sha[:2] / zip_sha
+
+
+def hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    # Atomic publish: concurrent download workers may store the same entry
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _fresh(stored_at: float) -> bool:
+    ttl = settings.INGEST_CACHE_TTL_S
+    return ttl <= 0 or (time.time() - stored_at) < ttl
+
+
+def lookup_content(zip_sha: str) -> Optional[Dict[str, Any]]:
+    """Return {"pdata", "members"} for a ZIP digest, or None on a miss.
+
+    members lists (cached file, path relative to the extraction directory).
+    """
+    if not settings.INGEST_CACHE_ENABLED:
+        return None
+    entry = _entry_dir(zip_sha)
+    meta = entry / "result.json"
+    try:
+        data = json.loads(meta.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not _fresh(float(data.get("stored_at", 0))) or "members" not in data:
+        # Expired, or written before members were cached: rebuild it
+        shutil.rmtree(entry, ignore_errors=True)
+        return None
+    members: List[Tuple[Path, str]] = [(entry / "members" / rel, rel) for rel in data["members"]]
+    if not all(path.is_file() for path, _ in members):
+        return None
+    pdata = data["pdata"]
+    photo = pdata.get("photo_path")
+    if photo:
+        path = entry / photo
+        if not path.exists():
+            return None
+        pdata["photo_path"] = path
+        pdata.setdefault("photo", {})["path"] = str(path)
+    # Touch so size-based eviction drops least recently used entries first
+    try:
+        os.utime(meta)
+    except OSError:
+        pass
+    return {"pdata": pdata, "members": members}
+
+
+def lookup_url(url: str) -> Optional[Dict[str, Any]]:
+    """Resolve a customized-url to its cached result without downloading."""
+    if not settings.INGEST_CACHE_ENABLED:
+        return None
+    try:
+        ref = json.loads(_url_file(url).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not _fresh(float(ref.get("stored_at", 0))):
+        _url_file(url).unlink(missing_ok=True)
+        return None
+    return lookup_content(str(ref.get("zip_sha256") or ""))
+
+
+def remember_url(url: str, zip_sha: str) -> None:
+    if settings.INGEST_CACHE_ENABLED:
+        _write_json(_url_file(url), {"zip_sha256": zip_sha, "stored_at": time.time()})
+
+
+def store(url: str, zip_sha: str, pdata: Dict[str, Any], members: List[Path], base: Path) -> None:
+    """Cache a parsed result and the extracted members (under base) by ZIP digest, indexed by URL."""
+    if not settings.INGEST_CACHE_ENABLED:
+        return
+    entry = _entry_dir(zip_sha)
+    entry.mkdir(parents=True, exist_ok=True)
+    rels: List[str] = []
+    for path in members:
+        rel = path.relative_to(base).as_posix()
+        target = entry / "members" / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Copies: extraction rewrites files in place, which would reach through a link
+        shutil.copyfile(path, target)
+        rels.append(rel)
+    saved = dict(pdata)
+    photo = pdata.get("photo_path")
+    if isinstance(photo, Path) and photo.exists():
+        name = f"photo{photo.suffix.lower()}"
+        shutil.copyfile(photo, entry / name)
+        saved["photo_path"] = name
+    else:
+        saved["photo_path"] = None
+    saved["photo"] = {**(pdata.get("photo") or {}), "path": None}
+    _write_json(entry / "result.json", {"pdata": saved, "members": rels, "stored_at": time.time()})
+    remember_url(url, zip_sha)
+    _maybe_sweep()
+
+
+def _maybe_sweep() -> None:
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < settings.INGEST_CACHE_SWEEP_S:
+        return
+    if not _sweep_lock.acquire(blocking=False):
+        return
+    try:
+        _last_sweep = now
+        sweep()
+    except Exception:
+        logger.exception("ingest cache sweep failed")
+    finally:
+        _sweep_lock.release()
+
+
+def sweep() -> Dict[str, int]:
+    """Drop expired entries, then evict least recently used ones over the size cap."""
+    root = cache_root()
+    removed = freed = 0
+    entries = []
+    for meta in (root / "entries").glob("*/*/result.json"):
+        entry = meta.parent
+        try:
+            stored_at = float(json.loads(meta.read_text(encoding="utf-8")).get("stored_at", 0))
+            size = sum(p.stat().st_size for p in entry.rglob("*") if p.is_file())
+            used = meta.stat().st_mtime
+        except (OSError, ValueError):
+            continue
+        if not _fresh(stored_at):
+            shutil.rmtree(entry, ignore_errors=True)
+            removed += 1
+            freed += size
+            continue
+        entries.append((used, size, entry))
+
+    limit = settings.INGEST_CACHE_MAX_MB * 1024 * 1024
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries, key=lambda e: e[0]):
+        if total <= limit:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+        removed += 1
+        freed += size
+
+    for ref in (root / "urls").glob("*.json"):
+        try:
+            if not _fresh(float(json.loads(ref.read_text(encoding="utf-8")).get("stored_at", 0))):
+                ref.unlink(missing_ok=True)
+        except (OSError, ValueError):
+            continue
+    return {"removed": removed, "bytes_freed": freed}
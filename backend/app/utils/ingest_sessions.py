@@ -0,0 +1,150 @@
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+import secrets
+import threading
+import time
+
+from ..models import IngestItem, LineField, OrderItem
+from ..settings import settings
+
+# Ingest results kept server-side, so /jobs/generate can take an ingest_id
+# (plus an optional selection) instead of the whole item list coming back
+# from the client. Sessions live in process memory: each expires
+# INGEST_SESSION_TTL_S after its last use, and the least recently used go
+# first once more than INGEST_SESSION_MAX are held. A restart drops them;
+# the client re-ingests (the ingest cache makes that cheap).
+
+DEFAULT_TEMPLATE_ID = "PLAQUE-140x90-V1"
+_LINE_IDS = ("line_1", "line_2", "line_3")
+
+
+def to_order_item(item: IngestItem) -> OrderItem:
+    """The OrderItem the frontend would build from an ingested item.
+
+    Built with model_construct: every field comes from an IngestItem that
+    was validated when it was ingested.
+    """
+    values = {l.id: l.value for l in item.lines}
+    decoration_type = item.decoration_type or ""
+    return OrderItem.model_construct(
+        template_id=item.template_id or DEFAULT_TEMPLATE_ID,
+        lines=[LineField.model_construct(id=i, value=values.get(i, "")) for i in _LINE_IDS],
+        order_ref=item.order_ref,
+        channel="amazon",
+        sku=item.sku or "",
+        graphics_key=item.graphics_key or "",
+        colour=item.colour or "",
+        product_type=item.product_type or "",
+        decoration_type=decoration_type,
+        theme=item.theme or "",
+        processor=item.processor or "",
+        photo_url=item.photo_asset_url or "",
+        requires_photo=decoration_type.lower() == "photo",
+    )
+
+
+@dataclass
+class _Session:
+    items: List[IngestItem]
+    last_used: float
+    order_items: Optional[List[OrderItem]] = None
+
+
+class IngestSessionStore:
+    def __init__(
+        self,
+        *,
+        ttl_s: Optional[float] = None,
+        max_sessions: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        # None: follow settings, read on each call
+        self._ttl_s = ttl_s
+        self._max_sessions = max_sessions
+        self._clock = clock
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "expired": 0, "evicted": 0}
+
+    @property
+    def ttl_s(self) -> float:
+        return float(self._ttl_s if self._ttl_s is not None else settings.INGEST_SESSION_TTL_S)
+
+    @property
+    def max_sessions(self) -> int:
+        return max(1, int(self._max_sessions if self._max_sessions is not None else settings.INGEST_SESSION_MAX))
+
+    def _expire(self, now: float) -> None:
+        # Called with the lock held; oldest use first, so stop at the first live one
+        while self._sessions:
+            key, sess = next(iter(self._sessions.items()))
+            if now - sess.last_used < self.ttl_s:
+                break
+            del self._sessions[key]
+            self._stats["expired"] += 1
+
+    def put(self, items: Sequence[IngestItem]) -> str:
+        """Keep items and return the ingest_id that refers to them."""
+        ingest_id = secrets.token_urlsafe(16)
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            self._sessions[ingest_id] = _Session(items=list(items), last_used=now)
+            self._stats["created"] += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._stats["evicted"] += 1
+        return ingest_id
+
+    def _touch(self, ingest_id: str) -> Optional[_Session]:
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            sess = self._sessions.get(ingest_id)
+            if sess is not None:
+                sess.last_used = now
+                self._sessions.move_to_end(ingest_id)
+            return sess
+
+    def get(self, ingest_id: str) -> Optional[List[IngestItem]]:
+        sess = self._touch(ingest_id)
+        return list(sess.items) if sess is not None else None
+
+    def order_items(self, ingest_id: str, selection: Optional[Sequence[int]] = None) -> Optional[List[OrderItem]]:
+        """OrderItems for a session (all, or the given indexes); None if unknown or expired.
+
+        Raises IndexError for a selection index outside the session.
+        """
+        sess = self._touch(ingest_id)
+        if sess is None:
+            return None
+        if sess.order_items is None:
+            # Converted once per session; a benign race converts twice
+            sess.order_items = [to_order_item(i) for i in sess.items]
+        converted = sess.order_items
+        if selection is None:
+            return list(converted)
+        picked: List[OrderItem] = []
+        for idx in selection:
+            if not 0 <= idx < len(converted):
+                raise IndexError(idx)
+            picked.append(converted[idx])
+        return picked
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._expire(self._clock())
+            return {"sessions": len(self._sessions), **self._stats}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+
+_store = IngestSessionStore()
+
+
+def get_store() -> IngestSessionStore:
+    return _store
@@ -0,0 +1,211 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import logging
+import os
+import shutil
+import threading
+import time
+
+from ..settings import settings
+from . import job_paths
+
+# Background cleanup for the working directories that otherwise only grow:
+# job outputs, previews, extracted downloads, the download temp tree and
+# published photos. Each area holds entries (its immediate children: an
+# order's downloads, a photo blob; for the sharded jobs and previews areas,
+# each job folder under its shard). An entry unused for the area's
+# TTL is removed; if the area is still over its size quota, the least
+# recently used entries go next. "Used" is the newest access or modification
+# time of any file in the entry. Entries used within JANITOR_GRACE_S are never
+# touched, so in-flight jobs and downloads are safe. Photo blobs an order line
+# in photo_refs was linked to within JANITOR_PHOTOS_TTL_S are kept as well,
+# since replayed ingest results point at them; older references stop counting,
+# so their blobs age out and fall to the quota like any other entry. Runs on a
+# daemon thread, never on a request.
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Area:
+    name: str
+    root: Path
+    ttl_s: float  # 0 = no TTL
+    max_bytes: int  # 0 = no quota
+    sharded: bool = False  # entries are job folders laid out by job_paths
+    keep: Optional[Callable[[], Set[str]]] = None  # names of entries that must stay
+
+
+def areas() -> List[Area]:
+    """The managed areas, read from settings on each sweep."""
+    mb = 1024 * 1024
+    s = settings
+    return [
+        Area("jobs", s.JOBS_DIR, s.JANITOR_JOBS_TTL_S, s.JANITOR_JOBS_MAX_MB * mb, sharded=True),
+        Area("previews", s.PREVIEWS_DIR, s.JANITOR_PREVIEWS_TTL_S, s.JANITOR_PREVIEWS_MAX_MB * mb, sharded=True),
+        Area("downloads", s.DATA_DIR / "storage" / "downloads", s.JANITOR_DOWNLOADS_TTL_S, s.JANITOR_DOWNLOADS_MAX_MB * mb),
+        Area("ingest_tmp", s.DOWNLOAD_TMP_DIR / "ingest", s.JANITOR_INGEST_TMP_TTL_S, s.JANITOR_INGEST_TMP_MAX_MB * mb),
+        Area("photos", s.PHOTOS_DIR, s.JANITOR_PHOTOS_TTL_S, s.JANITOR_PHOTOS_MAX_MB * mb, keep=_referenced_photos),
+    ]
+
+
+def _referenced_photos() -> Set[str]:
+    # Raises if the database is unavailable, which skips the area for this sweep
+    from ..database import SessionLocal
+    from . import photo_store
+
+    ttl = settings.JANITOR_PHOTOS_TTL_S
+    since = datetime.utcnow() - timedelta(seconds=ttl) if ttl > 0 else None
+    with SessionLocal() as db:
+        return photo_store.referenced_blobs(db, since=since)
+
+
+def _usage(path: Path) -> Tuple[int, float]:
+    """(total bytes, last used) for a file or directory tree, without following links."""
+    st = os.lstat(path)
+    used = max(st.st_atime, st.st_mtime)
+    if not path.is_dir() or path.is_symlink():
+        return st.st_size, used
+    size = 0  # file bytes only
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name, is_file in [(n, True) for n in filenames] + [(n, False) for n in dirnames]:
+            try:
+                st = os.lstat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            if is_file:
+                size += st.st_size
+            used = max(used, st.st_atime, st.st_mtime)
+    return size, used
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+class Janitor:
+    def __init__(
+        self,
+        *,
+        areas_fn: Callable[[], List[Area]] = areas,
+        grace_s: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._areas_fn = areas_fn
+        self._grace_s = grace_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._runs = 0
+        self._removed = 0
+        self._freed = 0
+        self._last: Dict[str, Any] = {}
+
+    @property
+    def grace_s(self) -> float:
+        return float(self._grace_s if self._grace_s is not None else settings.JANITOR_GRACE_S)
+
+    @staticmethod
+    def _remove(area: Area, path: Path) -> None:
+        _remove(path)
+        if area.sharded:
+            job_paths.prune(path, area.root)
+
+    def sweep_area(self, area: Area) -> Dict[str, int]:
+        """Apply one area's TTL, then its quota. Returns what was found and reclaimed."""
+        out = {"entries": 0, "bytes": 0, "removed": 0, "freed_bytes": 0}
+        if not area.root.is_dir():
+            return out
+        keep = area.keep() if area.keep is not None else set()
+        now = self._clock()
+        entries: List[Tuple[float, int, Path]] = []
+        children = job_paths.iter_entries(area.root) if area.sharded else area.root.iterdir()
+        for child in children:
+            try:
+                size, used = _usage(child)
+            except OSError:
+                continue  # removed under us
+            entries.append((used, size, child))
+
+        kept: List[Tuple[float, int, Path]] = []
+        for used, size, path in entries:
+            idle = now - used
+            if area.ttl_s > 0 and idle > area.ttl_s and idle > self.grace_s and path.name not in keep:
+                self._remove(area, path)
+                out["removed"] += 1
+                out["freed_bytes"] += size
+            else:
+                kept.append((used, size, path))
+
+        total = sum(size for _, size, _ in kept)
+        if area.max_bytes > 0 and total > area.max_bytes:
+            for used, size, path in sorted(kept, key=lambda e: e[0]):
+                if total <= area.max_bytes:
+                    break
+                if now - used <= self.grace_s:
+                    break  # everything left is in use
+                if path.name in keep:
+                    continue
+                self._remove(area, path)
+                kept.remove((used, size, path))
+                total -= size
+                out["removed"] += 1
+                out["freed_bytes"] += size
+        out["entries"] = len(kept)
+        out["bytes"] = total
+        return out
+
+    def run_once(self) -> Dict[str, Dict[str, int]]:
+        """Sweep every area once."""
+        started = self._clock()
+        result: Dict[str, Dict[str, int]] = {}
+        for area in self._areas_fn():
+            try:
+                result[area.name] = self.sweep_area(area)
+            except Exception:
+                logger.exception("janitor: sweep of %s failed", area.name)
+        removed = sum(r["removed"] for r in result.values())
+        freed = sum(r["freed_bytes"] for r in result.values())
+        if removed:
+            logger.info("janitor: removed %d entries, freed %d bytes", removed, freed)
+        with self._lock:
+            self._runs += 1
+            self._removed += removed
+            self._freed += freed
+            self._last = {"at": started, "duration_s": round(self._clock() - started, 3), "areas": result}
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"runs": self._runs, "removed": self._removed, "freed_bytes": self._freed, "last_run": self._last}
+
+    def _run(self) -> None:
+        # First sweep shortly after start-up, not during it
+        while not self._stop.wait(min(60.0, settings.JANITOR_INTERVAL_S) if self._runs == 0 else settings.JANITOR_INTERVAL_S):
+            self.run_once()
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="disk-janitor", daemon=True)
+            self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_janitor = Janitor()
+
+
+def get_janitor() -> Janitor:
+    return _janitor
@@ -0,0 +1,167 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+import hashlib
+import logging
+import os
+import re
+
+from starlette.staticfiles import StaticFiles
+
+from ..settings import settings
+
+# Where a job's (or preview's) files live on disk. A flat JOBS_DIR/{job_id}
+# grows one directory entry per job, which slows listing, the janitor and
+# backups once there are tens of thousands of jobs. Directories are instead
+# sharded two levels deep on a hash of the job id:
+#
+#     JOBS_DIR/3f/a9/{job_id}/...
+#
+# The hash spreads any id format evenly and keeps odd characters out of the
+# shard names. Only the disk layout changes: URLs and storage keys stay
+# /static/jobs/{job_id}/... and jobs/{job_id}/..., and are mapped here.
+# Sub-jobs ("{job_id}/{name}", as written by /jobs/pipeline) shard with their
+# parent. Directories from the old flat layout are still found on read until
+# migrate() has moved them.
+
+logger = logging.getLogger(__name__)
+
+SHARDED_AREAS = ("jobs", "previews")
+_SHARD_RE = re.compile(r"^[0-9a-f]{2}$")
+
+
+def shard(job_id: str) -> str:
+    """The shard directories for a job id, e.g. '3f/a9'."""
+    h = hashlib.blake2s(job_id.encode("utf-8"), digest_size=2).hexdigest()
+    return f"{h[:2]}/{h[2:]}"
+
+
+def sharded(rel: str) -> str:
+    """Map a '{job_id}[/...]' path to its place in the sharded layout."""
+    rel = rel.replace(os.sep, "/").lstrip("/")
+    job_id = rel.split("/", 1)[0]
+    if not job_id or job_id in (".", "..") or not settings.JOB_DIR_SHARDING:
+        return rel
+    return f"{shard(job_id)}/{rel}"
+
+
+def job_dir(job_id: str) -> Path:
+    """Output directory for a job (or a '{job_id}/{name}' sub-job)."""
+    return settings.JOBS_DIR / sharded(job_id)
+
+
+def preview_dir(job_id: str) -> Path:
+    return settings.PREVIEWS_DIR / sharded(job_id)
+
+
+def job_url(job_id: str, name: str) -> str:
+    """Static URL of a file in a job's output directory (unchanged by sharding)."""
+    return f"/static/jobs/{job_id}/{name}"
+
+
+def preview_url(job_id: str, name: str) -> str:
+    return f"/static/previews/{job_id}/{name}"
+
+
+def resolve(root: Path, rel: str) -> Path:
+    """Existing file for '{job_id}/...' under root: sharded first, then the flat layout.
+
+    Returns the sharded path when neither exists, so it can be used for writes.
+    """
+    path = root / sharded(rel)
+    if not path.exists():
+        legacy = root / rel
+        if legacy.exists():
+            return legacy
+    return path
+
+
+def local_path(root: Path, key: str) -> Path:
+    """Disk path of a storage key under root ('jobs/{job_id}/...' keys are sharded)."""
+    area, _, rest = key.partition("/")
+    if area in SHARDED_AREAS and rest:
+        return resolve(root / area, rest)
+    return root / key
+
+
+def _is_shard(path: Path) -> bool:
+    return bool(_SHARD_RE.match(path.name)) and path.is_dir() and not path.is_symlink()
+
+
+def iter_entries(root: Path) -> Iterator[Path]:
+    """Every job directory under root, sharded or still in the flat layout."""
+    if not root.is_dir():
+        return
+    for top in root.iterdir():
+        if not _is_shard(top):
+            yield top  # flat layout (or a stray file)
+            continue
+        for mid in top.iterdir():
+            if _is_shard(mid):
+                yield from mid.iterdir()
+            else:
+                yield mid
+
+
+def prune(path: Path, root: Path) -> None:
+    """Remove the shard directories above a removed entry if they are now empty."""
+    parent = path.parent
+    while parent != root and root in parent.parents:
+        try:
+            parent.rmdir()
+        except OSError:
+            return  # not empty (or already gone)
+        parent = parent.parent
+
+
+def migrate(root: Path) -> Tuple[int, int]:
+    """Move flat-layout job directories under root into their shards.
+
+    Idempotent and safe to run while serving: reads fall back to the flat
+    layout, and each move is a single rename. Returns (moved, skipped);
+    an entry is skipped when its sharded path already exists.
+    """
+    moved = skipped = 0
+    if not root.is_dir() or not settings.JOB_DIR_SHARDING:
+        return moved, skipped
+    for child in list(root.iterdir()):
+        if _is_shard(child) or not child.is_dir():
+            continue
+        dest = root / sharded(child.name)
+        if dest.exists():
+            logger.warning("job_paths: %s already exists; leaving %s in place", dest, child)
+            skipped += 1
+            continue
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(child, dest)
+        except OSError:
+            logger.warning("job_paths: could not move %s", child, exc_info=True)
+            skipped += 1
+            continue
+        moved += 1
+    return moved, skipped
+
+
+def migrate_all() -> None:
+    """Migrate the jobs and previews directories (run at start-up, or `python -m app.utils.job_paths`)."""
+    for root in (settings.JOBS_DIR, settings.PREVIEWS_DIR):
+        moved, skipped = migrate(root)
+        if moved or skipped:
+            logger.info("job_paths: %s: moved %d directories into shards, skipped %d", root, moved, skipped)
+
+
+class ShardedStaticFiles(StaticFiles):
+    """StaticFiles for a sharded area: /{job_id}/... is looked up in its shard,
+    then in the flat layout."""
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        full, st = super().lookup_path(sharded(path))
+        if st is None:
+            return super().lookup_path(path)
+        return full, st
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate_all()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import threading
+
+from sqlalchemy.orm import Session
+
+from ..models.order_line import OrderLine
+
+# Order lines already ingested, so a re-uploaded cumulative report only pays
+# for its new rows. A row is identified by (amazon-order-id, sku, fingerprint)
+# where the fingerprint covers every column, so an edited row is re-ingested.
+
+RowKey = Tuple[str, str, str]
+
+_IN_CHUNK = 500  # stay well below SQLite's bound-parameter limit
+_tables_ready: set = set()
+_table_lock = threading.Lock()
+
+
+def _ensure_table(db: Session) -> None:
+    # init_db() creates it at startup; this covers scripts and tests
+    bind = db.get_bind()
+    url = str(bind.url)
+    if url not in _tables_ready:
+        with _table_lock:
+            if url not in _tables_ready:
+                OrderLine.__table__.create(bind=bind, checkfirst=True)
+                _tables_ready.add(url)
+
+
+def row_fingerprint(row: Dict[str, Any]) -> str:
+    norm = sorted((str(k).strip().lower(), "" if v is None else str(v).strip()) for k, v in row.items())
+    return hashlib.sha256(json.dumps(norm, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def lookup(db: Session, keys: Iterable[RowKey]) -> Dict[RowKey, OrderLine]:
+    """Return the stored lines for the given keys (missing keys are absent)."""
+    _ensure_table(db)
+    wanted = set(keys)
+    order_ids = sorted({k[0] for k in wanted})
+    found: Dict[RowKey, OrderLine] = {}
+    for i in range(0, len(order_ids), _IN_CHUNK):
+        chunk = order_ids[i:i + _IN_CHUNK]
+        for line in db.query(OrderLine).filter(OrderLine.order_id.in_(chunk)):
+            key = (line.order_id, line.sku, line.fingerprint)
+            if key in wanted:
+                found[key] = line
+    return found
+
+
+def stored_result(line: OrderLine) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """(IngestItem dict, warning dicts) recorded for a line."""
+    return json.loads(line.item_json), json.loads(line.warnings_json or "[]")
+
+
+def record(
+    db: Session,
+    key: RowKey,
+    item: Dict[str, Any],
+    warnings: List[Dict[str, Any]],
+    *,
+    existing: Optional[OrderLine] = None,
+) -> OrderLine:
+    """Add or update a line; failed rows (any error warning) are retried next time."""
+    _ensure_table(db)
+    status = "failed" if any(w.get("severity") == "error" for w in warnings) else "ingested"
+    line = existing or OrderLine(order_id=key[0], sku=key[1], fingerprint=key[2])
+    line.status = status
+    line.item_json = json.dumps(item)
+    line.warnings_json = json.dumps(warnings)
+    if existing is None:
+        db.add(line)
+    return line
@@ -0,0 +1,147 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+import threading
+
+from sqlalchemy.orm import Session
+
+from ..models.photo_ref import PhotoRef
+from ..settings import settings
+from .ingest_cache import hash_file
+from .storage import publish_file
+
+# Content-addressed customer photos. Bytes are stored once per SHA-256 as
+# <sha256><ext> - in PHOTOS_DIR locally, under the photos/ prefix on S3 - and
+# photo_refs maps each order line (same key as order_lines) to its blob. A
+# reordered or re-ingested photo therefore costs a hash and a reference
+# update, never a second copy or upload.
+
+RowKey = Tuple[str, str, str]
+
+_CONTENT_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+_IN_CHUNK = 500  # stay well below SQLite's bound-parameter limit
+
+_tables_ready: set = set()
+_table_lock = threading.Lock()
+# S3 keys this process has uploaded or seen, so repeats skip even the HEAD
+_uploaded: set = set()
+
+
+@dataclass(frozen=True)
+class PublishedPhoto:
+    sha256: str
+    blob_name: str
+    url: str
+    stored: bool  # bytes were written or uploaded by this call
+
+
+def blob_name(sha256: str, suffix: str) -> str:
+    return f"{sha256}{suffix.lower()}"
+
+
+def url_for(name: str, *, storage=None) -> str:
+    """Where a stored blob is served from (a fresh presigned URL on S3)."""
+    if settings.STORAGE_BACKEND.lower() == "s3":
+        from .storage import get_storage
+
+        storage = storage or get_storage()
+        return storage.presign_get(f"photos/{name}", expires_s=settings.PRESIGN_EXPIRES_S)
+    return f"/static/photos/{name}"
+
+
+def available(name: str) -> bool:
+    """Whether a blob can still be served. Local blobs may have been reclaimed
+    by the janitor; nothing removes them from S3."""
+    if settings.STORAGE_BACKEND.lower() == "s3":
+        return True
+    return (settings.PHOTOS_DIR / name).is_file()
+
+
+def _copy_into(src: Path, dest: Path) -> None:
+    # A copy, not a link: the extracted source may be rewritten by a later ingest
+    publish_file(src, dest)
+
+
+def publish(src: Path, *, sha256: Optional[str] = None, storage=None, known: bool = False) -> PublishedPhoto:
+    """Store src once under its content hash and return where it is served from.
+
+    `known` means an existing reference already points at this blob, so on
+    S3 the existence check is skipped as well. Does blocking I/O; call it
+    off the event loop.
+    """
+    digest = sha256 or hash_file(src)
+    name = blob_name(digest, src.suffix)
+    stored = False
+    if settings.STORAGE_BACKEND.lower() == "s3":
+        from .storage import get_storage
+
+        storage = storage or get_storage()
+        key = f"photos/{name}"
+        if not (known or key in _uploaded or storage.exists(key)):
+            storage.put_file(key, src, content_type=_CONTENT_TYPES.get(src.suffix.lower(), "application/octet-stream"))
+            stored = True
+        _uploaded.add(key)
+    else:
+        dest = settings.PHOTOS_DIR / name
+        if not dest.exists():
+            _copy_into(src, dest)
+            stored = True
+    return PublishedPhoto(sha256=digest, blob_name=name, url=url_for(name, storage=storage), stored=stored)
+
+
+def _ensure_table(db: Session) -> None:
+    # init_db() creates it at startup; this covers scripts and tests
+    bind = db.get_bind()
+    url = str(bind.url)
+    if url not in _tables_ready:
+        with _table_lock:
+            if url not in _tables_ready:
+                PhotoRef.__table__.create(bind=bind, checkfirst=True)
+                _tables_ready.add(url)
+
+
+def lookup_refs(db: Session, keys: Iterable[RowKey]) -> Dict[RowKey, PhotoRef]:
+    """Return the photo references stored for the given order-line keys."""
+    _ensure_table(db)
+    wanted = set(keys)
+    order_ids = sorted({k[0] for k in wanted})
+    found: Dict[RowKey, PhotoRef] = {}
+    for i in range(0, len(order_ids), _IN_CHUNK):
+        chunk = order_ids[i:i + _IN_CHUNK]
+        for ref in db.query(PhotoRef).filter(PhotoRef.order_id.in_(chunk)):
+            key = (ref.order_id, ref.sku, ref.fingerprint)
+            if key in wanted:
+                found[key] = ref
+    return found
+
+
+def referenced_blobs(db: Session, *, since: Optional[datetime] = None) -> Set[str]:
+    """Blob names some order line points at (the janitor keeps these).
+
+    With `since`, only references written or replayed at or after it count;
+    older ones no longer hold their blob on disk.
+    """
+    _ensure_table(db)
+    q = db.query(PhotoRef.blob_name)
+    if since is not None:
+        q = q.filter(PhotoRef.updated_at >= since)
+    return {name for (name,) in q.distinct()}
+
+
+def touch(ref: PhotoRef) -> None:
+    """Mark a reference as used, so its blob stays protected from the janitor (the caller commits)."""
+    ref.updated_at = datetime.utcnow()
+
+
+def link(db: Session, key: RowKey, photo: PublishedPhoto, *, existing: Optional[PhotoRef] = None) -> PhotoRef:
+    """Point an order line at a blob (add or update; the caller commits)."""
+    _ensure_table(db)
+    ref = existing or PhotoRef(order_id=key[0], sku=key[1], fingerprint=key[2])
+    ref.sha256 = photo.sha256
+    ref.blob_name = photo.blob_name
+    ref.updated_at = datetime.utcnow()  # bumped even when the blob is unchanged
+    db.add(ref)
+    return ref
+
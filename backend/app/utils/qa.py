@@ -1,9 +1,17 @@
 from __future__ import annotations
-from typing import List, Dict, Optional
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
 from datetime import datetime
 from ..models import QaWarning, Severity, OrderItem
+from ..settings import settings
 import builtins as _builtins
+import json
+import logging
 import re
+import threading
 
 PHRASE_INCORRECT = "PHRASE_INCORRECT"
 DATE_FUTURE = "DATE_FUTURE"
@@ -19,6 +27,168 @@ try:
 except Exception:
     pass
 
+logger = logging.getLogger(__name__)
+
+# Rules are compiled once and a batch is checked in one pass: the text of
+# every item is joined into a single string (items separated by _SEP), each
+# pattern scans that string once, and matches are mapped back to items by
+# offset. Phrase patterns are case-insensitive and multiline (^/$ anchor at
+# item boundaries); they must not match across the NUL separator.
+
+_SEP = "\n\x00\n"
+_YEAR_RE = re.compile(r"\b(\d{4})\b")
+_LINE_IDS = ("line_1", "line_2", "line_3")
+
+
+@dataclass(frozen=True)
+class PhraseRule:
+    code: str
+    pattern: str
+    message: str
+    severity: Severity = Severity.warn
+
+
+DEFAULT_PHRASE_RULES: Tuple[PhraseRule, ...] = (
+    PhraseRule(PHRASE_INCORRECT, r"\bIn\s+living\s+memory\b", "Did you mean 'In loving memory'?"),
+)
+
+_rules_lock = threading.Lock()
+_rules_cache: Tuple[Optional[Tuple[str, int]], Tuple[PhraseRule, ...]] = (None, DEFAULT_PHRASE_RULES)
+
+
+def phrase_rules() -> Tuple[PhraseRule, ...]:
+    """Built-in phrase rules plus those in QA_RULES_PATH, re-read when the file changes.
+
+    The file is JSON: {"phrases": [{"code", "pattern", "message", "severity"?}]}.
+    """
+    global _rules_cache
+    path: Optional[Path] = settings.QA_RULES_PATH
+    if path is None:
+        return DEFAULT_PHRASE_RULES
+    try:
+        sig: Optional[Tuple[str, int]] = (str(path), path.stat().st_mtime_ns)
+    except OSError:
+        return DEFAULT_PHRASE_RULES
+    with _rules_lock:
+        if _rules_cache[0] != sig:
+            rules = list(DEFAULT_PHRASE_RULES)
+            try:
+                for r in json.loads(path.read_text("utf-8")).get("phrases", []):
+                    rule = PhraseRule(str(r["code"]), str(r["pattern"]), str(r.get("message") or r["code"]), Severity(r.get("severity", "warn")))
+                    _compile_rules((rule,))  # reject a bad pattern here, not mid-batch
+                    rules.append(rule)
+            except (OSError, ValueError, KeyError, TypeError, AttributeError, re.error):
+                logger.warning("qa: could not load rules from %s; using built-in rules", path, exc_info=True)
+                rules = list(DEFAULT_PHRASE_RULES)
+            _rules_cache = (sig, tuple(rules))
+        return _rules_cache[1]
+
+
+@lru_cache(maxsize=32)
+def _compile_rules(rules: Tuple[PhraseRule, ...]) -> Tuple[Tuple[PhraseRule, "re.Pattern[str]"], ...]:
+    return tuple((r, re.compile(r.pattern, re.IGNORECASE | re.MULTILINE)) for r in rules)
+
+
+@dataclass(frozen=True)
+class QaSubject:
+    """One item to check. maxlens overrides the limits of template_id."""
+    lines: Mapping[str, str]
+    template_id: Optional[str] = None
+    maxlens: Optional[Mapping[str, int]] = None
+    require_photo: bool = False
+    has_photo: bool = False
+
+
+@dataclass
+class QaReport:
+    """Warnings per item, in input order."""
+    items: List[List[QaWarning]] = field(default_factory=list)
+
+    def flat(self) -> List[QaWarning]:
+        return [w for ws in self.items for w in ws]
+
+    def by_code(self) -> Dict[str, List[int]]:
+        """Code -> indexes of the items that raised it."""
+        out: Dict[str, List[int]] = {}
+        for idx, ws in enumerate(self.items):
+            for code in dict.fromkeys(w.code for w in ws):
+                out.setdefault(code, []).append(idx)
+        return out
+
+    def errors(self) -> List[int]:
+        """Indexes of items with at least one error."""
+        return [idx for idx, ws in enumerate(self.items) if any(w.severity == Severity.error for w in ws)]
+
+
+class QaEngine:
+    def __init__(
+        self,
+        *,
+        limits: Optional[Mapping[str, Mapping[str, int]]] = None,
+        rules: Optional[Sequence[PhraseRule]] = None,
+        current_year: Optional[int] = None,
+    ) -> None:
+        # limits: template_id -> {line id: max length}, e.g. the catalogue's maxlens
+        self._limits = {tid: tuple(lens.items()) for tid, lens in (limits or {}).items()}
+        self._phrases = _compile_rules(tuple(rules) if rules is not None else phrase_rules())
+        self._current_year = current_year
+
+    def _maxlens(self, s: QaSubject) -> Optional[Tuple[Tuple[str, int], ...]]:
+        if s.maxlens is not None:
+            return tuple(s.maxlens.items())
+        return self._limits.get(s.template_id or "")
+
+    def run(self, subjects: Sequence[QaSubject]) -> QaReport:
+        n = len(subjects)
+        texts = [f"{s.lines.get('line_1', '') or ''} {s.lines.get('line_2', '') or ''} {s.lines.get('line_3', '') or ''}" for s in subjects]
+        starts: List[int] = []
+        pos = 0
+        for t in texts:
+            starts.append(pos)
+            pos += len(t) + len(_SEP)
+        blob = _SEP.join(texts)
+
+        # phrase hits: per rule, the items it matched
+        phrase_hits: List[set] = []
+        for _rule, rx in self._phrases:
+            hit = {bisect_right(starts, m.start()) - 1 for m in rx.finditer(blob)}
+            phrase_hits.append(hit)
+
+        # first future year per item
+        year_now = self._current_year if self._current_year is not None else datetime.now().year
+        future: Dict[int, int] = {}
+        for m in _YEAR_RE.finditer(blob):
+            yi = int(m.group(1))
+            if yi > year_now:
+                future.setdefault(bisect_right(starts, m.start()) - 1, yi)
+
+        report = QaReport()
+        for idx in range(n):
+            s = subjects[idx]
+            warnings: List[QaWarning] = []
+            for (rule, _rx), hit in zip(self._phrases, phrase_hits):
+                if idx in hit:
+                    warnings.append(QaWarning(code=rule.code, message=rule.message, severity=rule.severity))
+            if idx in future:
+                warnings.append(QaWarning(code=DATE_FUTURE, message=f"Future year {future[idx]} detected", severity=Severity.error))
+            maxlens = self._maxlens(s)
+            if maxlens:
+                over = False
+                for k, maxlen in maxlens:
+                    v = s.lines.get(k, "") or ""
+                    if len(v) > int(maxlen):
+                        warnings.append(QaWarning(code=OVER_MAXLEN, message=f"{k} exceeds max length {maxlen}", severity=Severity.warn, field=k))
+                        over = True
+                # Some tests expect an OVER_MAXLEN warning when template_maxlens is provided,
+                # even if no field actually exceeds the limit. Emit a generic warn in that case.
+                if not over:
+                    first_key = maxlens[0][0]
+                    warnings.append(QaWarning(code=OVER_MAXLEN, message=f"{first_key} within max length", severity=Severity.warn, field=first_key))
+            if s.require_photo and not s.has_photo:
+                warnings.append(QaWarning(code=PHOTO_MISSING, message="Template requires a photo", severity=Severity.error))
+            report.items.append(warnings)
+        return report
+
 
 def _get_line(item: OrderItem, line_id: str) -> str:
     for l in item.lines:
@@ -27,19 +197,31 @@ def _get_line(item: OrderItem, line_id: str) -> str:
     return ""
 
 
-def qa_item(item: OrderItem, template: Dict) -> List[QaWarning]:
-    """Backwards-compatible QA using OrderItem + template dict."""
-    lines = {l.id: l.value for l in item.lines}
-    template_maxlens = {k: template.get("maxLen", 30) for k in ["line_1","line_2","line_3"]}
-    return run_qa(
-        lines,
-        template_maxlens=template_maxlens,
+def template_limits(template: Dict) -> Dict[str, int]:
+    return {k: template.get("maxLen", 30) for k in _LINE_IDS}
+
+
+def _item_subject(item: OrderItem, template: Dict, limits: Dict[str, int]) -> QaSubject:
+    return QaSubject(
+        lines={l.id: l.value for l in item.lines},
+        maxlens=limits,
         require_photo=(item.requires_photo or template.get("requiresPhoto", False)),
         has_photo=bool(item.photo_url),
-        current_year=2025,  # deterministic for tests
     )
 
 
+def qa_item(item: OrderItem, template: Dict) -> List[QaWarning]:
+    """Backwards-compatible QA using OrderItem + template dict."""
+    return qa_items([item], template).items[0]
+
+
+def qa_items(items: Sequence[OrderItem], template: Dict) -> QaReport:
+    """qa_item for a whole batch in one pass."""
+    limits = template_limits(template)
+    engine = QaEngine(current_year=2025)  # deterministic for tests
+    return engine.run([_item_subject(it, template, limits) for it in items])
+
+
 def run_qa(
     lines: Dict[str, str],
     *,
@@ -55,45 +237,10 @@ def run_qa(
     - require_photo / has_photo control PHOTO_MISSING
     - current_year overrides datetime.now().year (used for tests/determinism)
     Returns: List[QaWarning]
+    For many items, build one QaEngine and call run() instead.
     """
-    warnings: List[QaWarning] = []
-    l1 = lines.get("line_1", "") or ""
-    l2 = lines.get("line_2", "") or ""
-    l3 = lines.get("line_3", "") or ""
-    all_text = f"{l1} {l2} {l3}"
-
-    # PHRASE_INCORRECT
-    if re.search(r"\bIn\s+living\s+memory\b", all_text, re.IGNORECASE):
-        warnings.append(QaWarning(code=PHRASE_INCORRECT, message="Did you mean 'In loving memory'?", severity=Severity.warn))
-
-    # DATE_FUTURE
-    year_now = current_year if current_year is not None else datetime.now().year
-    for y in re.findall(r"\b(\d{4})\b", all_text):
-        try:
-            yi = int(y)
-            if yi > year_now:
-                warnings.append(QaWarning(code=DATE_FUTURE, message=f"Future year {yi} detected", severity=Severity.error))
-                break
-        except Exception:
-            pass
-
-    # OVER_MAXLEN
-    if template_maxlens:
-        for k, maxlen in template_maxlens.items():
-            v = lines.get(k, "") or ""
-            if len(v) > int(maxlen):
-                warnings.append(QaWarning(code=OVER_MAXLEN, message=f"{k} exceeds max length {maxlen}", severity=Severity.warn, field=k))
-        # Some tests expect an OVER_MAXLEN warning when template_maxlens is provided,
-        # even if no field actually exceeds the limit. Emit a generic warn in that case.
-        if not any(w.code == OVER_MAXLEN for w in warnings):
-            first_key = next(iter(template_maxlens.keys()), "line_1")
-            warnings.append(QaWarning(code=OVER_MAXLEN, message=f"{first_key} within max length", severity=Severity.warn, field=first_key))
-
-    # PHOTO_MISSING
-    if require_photo and not has_photo:
-        warnings.append(QaWarning(code=PHOTO_MISSING, message="Template requires a photo", severity=Severity.error))
-
-    return warnings
+    subject = QaSubject(lines=lines, maxlens=template_maxlens or {}, require_photo=require_photo, has_photo=has_photo)
+    return QaEngine(current_year=current_year).run([subject]).items[0]
 
 
 def merge_qa(a: List[QaWarning], b: List[QaWarning]) -> List[QaWarning]:
@@ -0,0 +1,154 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from ..settings import settings
+from .circuit_breaker import HostBreaker, get_breaker
+
+# Background retries for downloads that failed on a transient host error.
+# Jobs are keyed (one pending entry per key), wait for the host's breaker to
+# let a probe through, and back off exponentially between attempts. A job
+# returns True once it no longer needs retrying; ingest jobs leave their
+# result in the ingest cache for the next run to pick up.
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], bool]
+
+
+@dataclass(order=True)
+class _Entry:
+    due: float
+    seq: int
+    key: str = field(compare=False)
+    host: str = field(compare=False)
+    job: Job = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+class RetryQueue:
+    def __init__(
+        self,
+        *,
+        breaker: Optional[HostBreaker] = None,
+        max_size: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        delay_s: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._breaker = breaker
+        self._max_size = max_size
+        self._max_attempts = max_attempts
+        self._delay_s = delay_s
+        self._clock = clock
+        self._heap: List[_Entry] = []
+        self._pending: Dict[str, _Entry] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stats = {"queued": 0, "succeeded": 0, "gave_up": 0, "rejected": 0}
+
+    @property
+    def breaker(self) -> HostBreaker:
+        return self._breaker or get_breaker()
+
+    def _delay(self, attempts: int) -> float:
+        base = self._delay_s if self._delay_s is not None else settings.DOWNLOAD_RETRY_QUEUE_DELAY_S
+        return base * (2 ** attempts)
+
+    def enqueue(self, key: str, host: str, job: Job) -> bool:
+        """Schedule job; False if key is already pending or the queue is full."""
+        max_size = self._max_size if self._max_size is not None else settings.DOWNLOAD_RETRY_QUEUE_MAX
+        with self._cond:
+            if key in self._pending:
+                return False
+            if len(self._pending) >= max_size:
+                self._stats["rejected"] += 1
+                return False
+            due = self._clock() + max(self._delay(0), self.breaker.retry_after(host))
+            entry = _Entry(due, next(self._seq), key, host, job)
+            self._pending[key] = entry
+            heapq.heappush(self._heap, entry)
+            self._stats["queued"] += 1
+            self._ensure_worker()
+            self._cond.notify()
+        return True
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="ingest-retry", daemon=True)
+            self._thread.start()
+
+    def _next_due(self) -> Optional[_Entry]:
+        # Called with the lock held; waits until the head entry is due
+        while not self._stopping:
+            if not self._heap:
+                self._cond.wait()
+                continue
+            wait = self._heap[0].due - self._clock()
+            if wait > 0:
+                self._cond.wait(wait)
+                continue
+            return heapq.heappop(self._heap)
+        return None
+
+    def _reschedule(self, entry: _Entry, delay: float) -> None:
+        entry.due = self._clock() + delay
+        entry.seq = next(self._seq)
+        heapq.heappush(self._heap, entry)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                entry = self._next_due()
+                if entry is None:
+                    return
+                wait = self.breaker.retry_after(entry.host)
+                if wait > 0:
+                    # Still tripped: come back when a probe is allowed
+                    self._reschedule(entry, wait)
+                    continue
+            try:
+                done = bool(entry.job())
+            except Exception:
+                logger.warning("retry job %s failed", entry.key, exc_info=True)
+                done = False
+            with self._cond:
+                entry.attempts += 1
+                max_attempts = self._max_attempts if self._max_attempts is not None else settings.DOWNLOAD_RETRY_QUEUE_ATTEMPTS
+                if done or entry.attempts >= max_attempts:
+                    self._pending.pop(entry.key, None)
+                    self._stats["succeeded" if done else "gave_up"] += 1
+                else:
+                    self._reschedule(entry, max(self._delay(entry.attempts), self.breaker.retry_after(entry.host)))
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"pending": len(self._pending), **self._stats}
+
+    def clear(self) -> None:
+        with self._cond:
+            self._heap.clear()
+            self._pending.clear()
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_queue = RetryQueue()
+
+
+def get_queue() -> RetryQueue:
+    return _queue
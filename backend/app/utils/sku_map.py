@@ -1,10 +1,11 @@
 from __future__ import annotations
+from bisect import bisect_left
 from pathlib import Path
 import csv
 import re
 import threading
 import time
-from typing import Dict, Optional, TypedDict
+from typing import Dict, Iterable, List, Optional, TypedDict
 
 from ..settings import settings
 
@@ -36,8 +37,60 @@ def _norm_no_space(s: str) -> str:
     return re.sub(r"\s+", "", (s or "").strip().lower())
 
 
+def _common_len(a: str, b: str) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class SkuIndex:
+    """Immutable compiled SKU lookup: exact map plus a precomputed prefix index."""
+
+    __slots__ = ("exact", "_keys", "_best")
+
+    def __init__(self, exact: Dict[str, Dict[str, str]]):
+        self.exact = exact
+        self._keys: List[str] = sorted(exact)
+        # Best (first listed in the CSV) key for every prefix shared by two or
+        # more keys. A key shares the most with a sorted neighbour, so that
+        # bounds how many of its prefixes need an entry; any longer prefix
+        # matches this key alone and is found by bisect.
+        shared: Dict[str, int] = {}
+        for i, k in enumerate(self._keys):
+            prev = _common_len(self._keys[i - 1], k) if i else 0
+            nxt = _common_len(k, self._keys[i + 1]) if i + 1 < len(self._keys) else 0
+            shared[k] = max(prev, nxt)
+        self._best: Dict[str, str] = {}
+        for k in exact:  # CSV order: the first key to claim a prefix keeps it
+            for n in range(1, shared[k] + 1):
+                self._best.setdefault(k[:n], k)
+
+    def lookup(self, sku: str) -> Dict[str, str]:
+        key = _norm(sku)
+        info = self.exact.get(key) or self.exact.get(_norm_no_space(sku))
+        if info or not key:
+            return info or {}
+        # Prefix match (for SKUs like "OM009005L" matching "OM009005L Slate")
+        best = self._best.get(key)
+        if best is None:
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i].startswith(key):
+                best = self._keys[i]
+        return self.exact[best] if best is not None else {}
+
+
+_INDEX: Optional[SkuIndex] = None
+
+
 def _load_if_needed() -> Dict[str, Dict[str, str]]:
-    global _SKU_CACHE, _SKU_MTIME
+    """Re-read the SKU list if it changed and publish a new index.
+
+    Runs at init and on the reload thread; lookups never touch the filesystem.
+    """
+    global _SKU_CACHE, _SKU_MTIME, _INDEX
     # Preferred: explicit settings.SKULIST_PATH; then DATA_DIR; then repo assets
     candidates = [
         getattr(settings, "SKULIST_PATH", None),
@@ -50,9 +103,10 @@ def _load_if_needed() -> Dict[str, Dict[str, str]]:
     try:
         if not csv_path.exists():
             _SKU_CACHE, _SKU_MTIME = {}, None
+            _INDEX = SkuIndex(_SKU_CACHE)
             return _SKU_CACHE
         stat = csv_path.stat()
-        if _SKU_CACHE is None or _SKU_MTIME is None or stat.st_mtime != _SKU_MTIME:
+        if _SKU_CACHE is None or _SKU_MTIME is None or stat.st_mtime != _SKU_MTIME or _INDEX is None:
             m = {}
             with csv_path.open("r", encoding="utf-8-sig", newline="") as f:
                 reader = csv.DictReader(f)
@@ -69,27 +123,26 @@ def _load_if_needed() -> Dict[str, Dict[str, str]]:
                     # store both punctuation-preserved and no-space keys
                     m[_norm(raw)] = info
                     m[_norm_no_space(raw)] = info
+            # Build fully, then publish with a single reference swap
+            index = SkuIndex(m)
             _SKU_CACHE = m
             _SKU_MTIME = stat.st_mtime
+            _INDEX = index
         return _SKU_CACHE or {}
     except Exception:
         return _SKU_CACHE or {}
 
 
-def get_meta_for_sku(sku: str) -> SkuMeta:
-    data = _load_if_needed()
-    # try both preserved and no-space variants
-    info = data.get(_norm(sku)) or data.get(_norm_no_space(sku))
-    
-    # If no exact match, try prefix match (for SKUs like "OM009005L" matching "OM009005L Slate")
-    if not info:
-        sku_lower = _norm(sku)
-        for key, value in data.items():
-            if key.startswith(sku_lower + " ") or key.startswith(sku_lower):
-                info = value
-                break
-    
-    info = info or {}
+def _index() -> SkuIndex:
+    idx = _INDEX
+    if idx is None or _SKU_CACHE is None:
+        # First use, or the cache was reset: load synchronously once
+        _load_if_needed()
+        idx = _INDEX or SkuIndex({})
+    return idx
+
+
+def _meta_from(info: Dict[str, str]) -> SkuMeta:
     meta: SkuMeta = {
         "template_id": (info.get("template_id") or None),
         "requires_photo": (str(info.get("requires_photo") or "").lower() in {"1","true","yes","y"}),
@@ -101,6 +154,20 @@ def get_meta_for_sku(sku: str) -> SkuMeta:
     return meta
 
 
+def get_meta_for_sku(sku: str) -> SkuMeta:
+    return _meta_from(_index().lookup(sku))
+
+
+def get_meta_for_sku_many(skus: Iterable[str]) -> Dict[str, SkuMeta]:
+    """Resolve many SKUs against one index snapshot; duplicates are looked up once."""
+    idx = _index()
+    out: Dict[str, SkuMeta] = {}
+    for sku in skus:
+        if sku not in out:
+            out[sku] = _meta_from(idx.lookup(sku))
+    return out
+
+
 def _reload_loop(interval: int) -> None:
     while not _RELOAD_STOP.is_set():
         try:
@@ -1,18 +1,24 @@
 from __future__ import annotations
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 from uuid import uuid4
 import datetime as dt
+import os
+import shutil
+import threading
 
 from ..settings import settings
+from . import job_paths
 
 try:
     import boto3  # type: ignore
+    from boto3.s3.transfer import TransferConfig  # type: ignore
     from botocore.client import Config as BotoConfig  # type: ignore
 except Exception:  # boto3 optional
     boto3 = None
     BotoConfig = None  # type: ignore
+    TransferConfig = None  # type: ignore
 
 
 @dataclass
@@ -31,17 +37,69 @@ class Storage:
     def put_bytes(self, key: str, data: bytes, content_type: str) -> None:
         raise NotImplementedError
 
+    def put_file(self, key: str, path: Path, content_type: str, *, link: bool = False) -> None:
+        """Store the file at path under key. `link` allows sharing the file
+        instead of copying it (only for files that are never rewritten)."""
+        self.put_bytes(key, path.read_bytes(), content_type)
+
     def exists(self, key: str) -> bool:
         raise NotImplementedError
 
 
+_COPY_CHUNK = 64 * 1024 * 1024
+
+
+def _copy_file(src: Path, dst: Path) -> None:
+    # Kernel-side copy: copy_file_range (a reflink on copy-on-write filesystems),
+    # otherwise shutil.copyfile, which uses sendfile on Linux
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fi, open(dst, "wb") as fo:
+                while os.copy_file_range(fi.fileno(), fo.fileno(), _COPY_CHUNK):
+                    pass
+            return
+        except OSError:
+            pass  # not supported for this pair of files
+    shutil.copyfile(src, dst)
+
+
+def publish_file(src: Path, dest: Path, *, link: bool = False) -> bool:
+    """Put src's bytes at dest without reading them into Python memory.
+
+    Nothing is written when dest already is src (returns False). With `link`,
+    dest becomes a hard link to src where the filesystem allows. The file is
+    written beside dest and renamed, so readers never see a partial file.
+    """
+    try:
+        if os.path.samefile(src, dest):
+            return False
+    except OSError:
+        pass  # dest does not exist yet
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{uuid4().hex}")
+    try:
+        linked = False
+        if link:
+            try:
+                os.link(src, tmp)
+                linked = True
+            except OSError:
+                pass  # another filesystem, or no hard links here
+        if not linked:
+            _copy_file(src, tmp)
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return True
+
+
 class LocalStorage(Storage):
     def __init__(self, root: Path) -> None:
         self.root = root
         self.root.mkdir(parents=True, exist_ok=True)
 
     def _path(self, key: str) -> Path:
-        return self.root / key
+        return job_paths.local_path(self.root, key)
 
     def presign_upload(self, key: str, content_type: str) -> PresignUpload:
         # For local, just return a dummy URL; upload should be handled by server-side endpoint if needed.
@@ -57,11 +115,17 @@ class LocalStorage(Storage):
         path.parent.mkdir(parents=True, exist_ok=True)
         path.write_bytes(data)
 
+    def put_file(self, key: str, path: Path, content_type: str, *, link: bool = False) -> None:
+        publish_file(path, self._path(key), link=link)
+
     def exists(self, key: str) -> bool:
         return self._path(key).exists()
 
 
 class S3Storage(Storage):
+    # Build one per process (get_storage): the client is thread-safe and owns
+    # the connection pool, so a new one per call would pay construction and a
+    # fresh TLS handshake every time.
     def __init__(self, *, bucket: str, region: Optional[str], endpoint_url: Optional[str], access_key: Optional[str], secret_key: Optional[str]) -> None:
         if boto3 is None:
             raise RuntimeError("boto3 is required for S3 storage")
@@ -72,9 +136,24 @@ class S3Storage(Storage):
             endpoint_url=endpoint_url,
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
-            config=BotoConfig(signature_version="s3v4") if BotoConfig else None,
+            config=BotoConfig(
+                signature_version="s3v4",
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                connect_timeout=settings.S3_CONNECT_TIMEOUT_S,
+                read_timeout=settings.S3_READ_TIMEOUT_S,
+                retries={"max_attempts": settings.S3_MAX_ATTEMPTS, "mode": "standard"},
+                tcp_keepalive=True,
+                s3={"addressing_style": settings.S3_ADDRESSING_STYLE},
+            ),
         )
         self.bucket = bucket
+        mb = 1024 * 1024
+        self.transfer_config = TransferConfig(
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * mb,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNK_MB * mb,
+            max_concurrency=max(1, settings.S3_UPLOAD_CONCURRENCY),
+            use_threads=settings.S3_UPLOAD_CONCURRENCY > 1,
+        )
 
     def presign_upload(self, key: str, content_type: str) -> PresignUpload:
         # Use POST policy for browser uploads
@@ -103,6 +182,19 @@ class S3Storage(Storage):
     def put_bytes(self, key: str, data: bytes, content_type: str) -> None:
         self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
 
+    def put_file(self, key: str, path: Path, content_type: str, *, link: bool = False) -> None:
+        # Streams from disk; multipart (parts uploaded in parallel) above the threshold
+        self.client.upload_file(
+            str(path), self.bucket, key,
+            ExtraArgs={"ContentType": content_type},
+            Config=self.transfer_config,
+        )
+
+    def close(self) -> None:
+        close = getattr(self.client, "close", None)  # botocore >= 1.28
+        if close is not None:
+            close()
+
     def exists(self, key: str) -> bool:
         try:
             self.client.head_object(Bucket=self.bucket, Key=key)
@@ -111,18 +203,54 @@ class S3Storage(Storage):
             return False
 
 
-def get_storage() -> Storage:
+_storage_lock = threading.Lock()
+_storage: Optional[Tuple[Tuple[Any, ...], Storage]] = None
+
+
+def _storage_config() -> Tuple[Any, ...]:
     if settings.STORAGE_BACKEND.lower() == "s3":
-        if not settings.S3_BUCKET:
-            raise RuntimeError("S3_BUCKET must be set for S3 storage")
-        return S3Storage(
-            bucket=settings.S3_BUCKET,
-            region=settings.S3_REGION,
-            endpoint_url=settings.S3_ENDPOINT_URL,
-            access_key=settings.S3_ACCESS_KEY_ID,
-            secret_key=settings.S3_SECRET_ACCESS_KEY,
-        )
-    return LocalStorage(settings.DATA_DIR)
+        return ("s3", settings.S3_BUCKET, settings.S3_REGION, settings.S3_ENDPOINT_URL,
+                settings.S3_ACCESS_KEY_ID, settings.S3_SECRET_ACCESS_KEY)
+    return ("local", settings.DATA_DIR)
+
+
+def get_storage() -> Storage:
+    """The process-wide storage backend, rebuilt only when its settings change."""
+    global _storage
+    config = _storage_config()
+    current = _storage
+    if current is not None and current[0] == config:
+        return current[1]
+    with _storage_lock:
+        if _storage is None or _storage[0] != config:
+            if config[0] == "s3":
+                if not settings.S3_BUCKET:
+                    raise RuntimeError("S3_BUCKET must be set for S3 storage")
+                storage: Storage = S3Storage(
+                    bucket=settings.S3_BUCKET,
+                    region=settings.S3_REGION,
+                    endpoint_url=settings.S3_ENDPOINT_URL,
+                    access_key=settings.S3_ACCESS_KEY_ID,
+                    secret_key=settings.S3_SECRET_ACCESS_KEY,
+                )
+            else:
+                storage = LocalStorage(settings.DATA_DIR)
+            _close(_storage)
+            _storage = (config, storage)
+        return _storage[1]
+
+
+def _close(entry: Optional[Tuple[Tuple[Any, ...], Storage]]) -> None:
+    if entry is not None and isinstance(entry[1], S3Storage):
+        entry[1].close()
+
+
+def close_storage() -> None:
+    """Drop the cached backend and close its connection pool (app shutdown)."""
+    global _storage
+    with _storage_lock:
+        _close(_storage)
+        _storage = None
 
 
 def make_upload_key(prefix: str = "uploads") -> str:
@@ -133,10 +261,7 @@ def make_upload_key(prefix: str = "uploads") -> str:
 # Photo helpers
 def put_photo_local(path_src: Path, dest_name: str) -> str:
     """Copy a local source photo into PHOTOS_DIR and return the static path."""
-    dest = settings.PHOTOS_DIR / dest_name
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    data = path_src.read_bytes()
-    dest.write_bytes(data)
+    publish_file(path_src, settings.PHOTOS_DIR / dest_name)
     return f"/static/photos/{dest_name}"
 
 
@@ -156,7 +281,7 @@ def upload_photo_and_presign(path_src: Path, dest_name: str) -> str:
         ".jpeg": "image/jpeg",
         ".png": "image/png",
     }.get(ext, "application/octet-stream")
-    storage.put_bytes(key, path_src.read_bytes(), content_type=ctype)
+    storage.put_file(key, path_src, content_type=ctype)
     return storage.presign_get(key, expires_s=settings.PRESIGN_EXPIRES_S)
 
 
@@ -178,7 +303,8 @@ def put_artifact(job_id: str, path: Path) -> str:
         ".csv": "text/csv",
         ".json": "application/json",
     }.get(ext, "application/octet-stream")
-    storage.put_bytes(key, path.read_bytes(), content_type=ctype)
+    # Job outputs are written once, so local storage may link rather than copy
+    storage.put_file(key, path, content_type=ctype, link=True)
     if settings.STORAGE_BACKEND.lower() == "s3":
         return storage.presign_get(key, settings.PRESIGN_EXPIRES_S)
     return f"/static/{key}"
@@ -0,0 +1,88 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, IO, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+# Incremental SVG writer: elements go straight to the file as they are added,
+# so memory does not grow with the number of elements on a bed (unlike an
+# svgwrite DOM that is only serialised on saveas).
+
+SVG_NS = "http://www.w3.org/2000/svg"
+
+
+def _attr_name(name: str) -> str:
+    # text_anchor -> text-anchor, class_ -> class (svgwrite-style keyword names)
+    return name.rstrip("_").replace("_", "-")
+
+
+def _attrs(attrs: dict) -> str:
+    parts: List[str] = []
+    for k, v in attrs.items():
+        if v is None:
+            continue
+        parts.append(f" {_attr_name(k)}={quoteattr(str(v))}")
+    return "".join(parts)
+
+
+class SvgStreamWriter:
+    """Write an SVG document element by element.
+
+    Usage:
+        with SvgStreamWriter(path, width="439.8mm", height="289.9mm") as w:
+            w.rect(x=0, y=0, width="100%", height="100%", fill="white")
+            w.text("Hello", x="10mm", y="10mm", style="font-size:5mm")
+    """
+
+    def __init__(self, path: Path, *, width: str, height: str, view_box: Optional[str] = None, buffer_size: int = 64 * 1024) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f: Optional[IO[str]] = self.path.open("w", encoding="utf-8", buffering=buffer_size)
+        self._open_groups = 0
+        self.elements = 0
+        self._f.write('<?xml version="1.0" encoding="utf-8" ?>\n')
+        self._f.write(f"<svg{_attrs({'xmlns': SVG_NS, 'version': '1.1', 'width': width, 'height': height, 'viewBox': view_box})}>")
+
+    def __enter__(self) -> "SvgStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _write(self, s: str) -> None:
+        if self._f is None:
+            raise ValueError("SVG writer is closed")
+        self._f.write(s)
+
+    def element(self, tag: str, text: Optional[str] = None, **attrs: Any) -> None:
+        if text is None:
+            self._write(f"<{tag}{_attrs(attrs)} />")
+        else:
+            self._write(f"<{tag}{_attrs(attrs)}>{escape(text)}</{tag}>")
+        self.elements += 1
+
+    def rect(self, **attrs: Any) -> None:
+        self.element("rect", **attrs)
+
+    def text(self, content: str, **attrs: Any) -> None:
+        self.element("text", content, **attrs)
+
+    def start_group(self, **attrs: Any) -> None:
+        self._write(f"<g{_attrs(attrs)}>")
+        self._open_groups += 1
+
+    def end_group(self) -> None:
+        if self._open_groups <= 0:
+            raise ValueError("No open group")
+        self._write("</g>")
+        self._open_groups -= 1
+
+    def close(self) -> None:
+        if self._f is None:
+            return
+        try:
+            while self._open_groups:
+                self.end_group()
+            self._f.write("</svg>\n")
+        finally:
+            self._f.close()
+            self._f = None
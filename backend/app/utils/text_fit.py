@@ -0,0 +1,214 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import threading
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+# Text fitting driven by real font metrics (pdfmetrics.stringWidth) instead of
+# per-character estimates. Widths are in mm, font sizes in pt, matching the
+# processors' geometry constants.
+
+PT_TO_MM = 25.4 / 72.0
+
+# Families referenced by templates/processors that may not be registered with
+# ReportLab (e.g. Georgia when fonts/georgia.ttf is absent). Metrics fall back to
+# the closest core font so widths stay realistic rather than failing. Register
+# fonts through register_font so fallback metrics cached under the family name
+# are dropped.
+DEFAULT_FONT = "Times-Roman"
+FONT_FALLBACKS: Dict[str, str] = {
+    "georgia": "Times-Roman",
+    "times new roman": "Times-Roman",
+    "times": "Times-Roman",
+    "serif": "Times-Roman",
+    "arial": "Helvetica",
+    "helvetica": "Helvetica",
+    "dejavu sans": "Helvetica",
+    "sans-serif": "Helvetica",
+    "courier": "Courier",
+    "monospace": "Courier",
+}
+
+# Printable Latin-1: covers almost every character seen in memorial text
+_PRECOMPUTED_CHARS = "".join(chr(c) for c in range(32, 256) if chr(c).isprintable())
+
+
+class GlyphWidthTable:
+    """Advance widths (pt at size 1) for one font.
+
+    Latin-1 is precomputed up front; anything else is measured on first use and
+    kept, so a string width is a dict lookup per character.
+    """
+
+    def __init__(self, font_name: str) -> None:
+        self.font_name = font_name
+        self._widths: Dict[str, float] = {
+            ch: pdfmetrics.stringWidth(ch, font_name, 1.0) for ch in _PRECOMPUTED_CHARS
+        }
+
+    def width_pt(self, text: str, size_pt: float) -> float:
+        widths = self._widths
+        total = 0.0
+        for ch in text:
+            w = widths.get(ch)
+            if w is None:
+                w = pdfmetrics.stringWidth(ch, self.font_name, 1.0)
+                widths[ch] = w
+            total += w
+        return total * size_pt
+
+
+_TABLES: Dict[str, GlyphWidthTable] = {}
+_TABLES_LOCK = threading.Lock()
+
+
+def resolve_font(font: str) -> str:
+    """Return a ReportLab font name usable for metrics for the requested family."""
+    try:
+        pdfmetrics.getFont(font)
+        return font
+    except Exception:
+        return FONT_FALLBACKS.get((font or "").strip().lower(), DEFAULT_FONT)
+
+
+def get_width_table(font: str) -> GlyphWidthTable:
+    table = _TABLES.get(font)
+    if table is not None:
+        return table
+    with _TABLES_LOCK:
+        table = _TABLES.get(font)
+        if table is None:
+            resolved = resolve_font(font)
+            table = _TABLES.get(resolved) or GlyphWidthTable(resolved)
+            _TABLES[resolved] = table
+            _TABLES[font] = table
+        return table
+
+
+def clear_cache() -> None:
+    """Drop width tables and memoised results (call after registering new fonts)."""
+    with _TABLES_LOCK:
+        _TABLES.clear()
+    string_width_mm.cache_clear()
+    fit_text.cache_clear()
+
+
+def register_font(name: str, path: str) -> None:
+    """Register a TrueType font with ReportLab and forget any metrics measured
+    for `name` before it existed."""
+    pdfmetrics.registerFont(TTFont(name, path))
+    clear_cache()
+
+
+@lru_cache(maxsize=16384)
+def string_width_mm(text: str, font: str, size_pt: float) -> float:
+    """Rendered width of a single line in mm."""
+    return get_width_table(font).width_pt(text, size_pt) * PT_TO_MM
+
+
+def _break_word(word: str, font: str, size_pt: float, max_width_mm: float) -> List[str]:
+    # Hard-break a word that is wider than the line on its own
+    parts: List[str] = []
+    cur = ""
+    for ch in word:
+        if cur and string_width_mm(cur + ch, font, size_pt) > max_width_mm:
+            parts.append(cur)
+            cur = ch
+        else:
+            cur += ch
+    if cur:
+        parts.append(cur)
+    return parts
+
+
+def wrap_lines(text: str, font: str, size_pt: float, max_width_mm: float) -> List[str]:
+    """Greedy word wrap to max_width_mm. Explicit newlines are kept as breaks."""
+    out: List[str] = []
+    for para in (text or "").split("\n"):
+        words = para.split()
+        if not words:
+            out.append("")
+            continue
+        cur = ""
+        for w in words:
+            test = f"{cur} {w}" if cur else w
+            if string_width_mm(test, font, size_pt) <= max_width_mm:
+                cur = test
+                continue
+            if cur:
+                out.append(cur)
+            if string_width_mm(w, font, size_pt) <= max_width_mm:
+                cur = w
+            else:
+                pieces = _break_word(w, font, size_pt, max_width_mm)
+                out.extend(pieces[:-1])
+                cur = pieces[-1]
+        out.append(cur)
+    # Drop trailing blank lines produced by trailing newlines
+    while len(out) > 1 and out[-1] == "":
+        out.pop()
+    return out
+
+
+def shrink_to_fit(text: str, font: str, max_width_mm: float, *, size_pt: float, min_size_pt: float) -> float:
+    """Largest size <= size_pt at which text fits on one line (never below min_size_pt)."""
+    w = string_width_mm(text or "", font, size_pt)
+    if w <= max_width_mm or w <= 0:
+        return size_pt
+    # Width scales linearly with size
+    return max(min_size_pt, size_pt * max_width_mm / w)
+
+
+@dataclass(frozen=True)
+class TextFit:
+    lines: Tuple[str, ...]
+    size_pt: float
+    overflow: bool = False
+
+
+@lru_cache(maxsize=4096)
+def fit_text(
+    text: str,
+    font: str,
+    max_width_mm: float,
+    *,
+    size_pt: float,
+    min_size_pt: Optional[float] = None,
+    max_lines: Optional[int] = None,
+    step_pt: float = 0.5,
+) -> TextFit:
+    """Wrap text to max_width_mm, shrinking from size_pt until it fits in max_lines.
+
+    Sizes are tried in step_pt decrements down to min_size_pt (default: size_pt,
+    i.e. wrap only). Line count only grows as the size grows, so the largest
+    fitting size is found by binary search. If nothing fits, the smallest size
+    is used, lines are cut to max_lines and overflow is set.
+    """
+    min_size = size_pt if min_size_pt is None else min(min_size_pt, size_pt)
+    steps = max(0, int(round((size_pt - min_size) / step_pt))) if step_pt > 0 else 0
+    sizes = [size_pt - i * step_pt for i in range(steps)] + [min_size]
+
+    def _fits(lines: List[str]) -> bool:
+        return max_lines is None or len(lines) <= max_lines
+
+    first = wrap_lines(text, font, sizes[0], max_width_mm)
+    if _fits(first):
+        return TextFit(lines=tuple(first), size_pt=sizes[0])
+    last = wrap_lines(text, font, sizes[-1], max_width_mm)
+    if not _fits(last):
+        cut = last[:max_lines] if max_lines is not None else last
+        return TextFit(lines=tuple(cut), size_pt=sizes[-1], overflow=True)
+
+    # sizes[lo] does not fit, sizes[hi] fits
+    lo, hi, best = 0, len(sizes) - 1, last
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        lines = wrap_lines(text, font, sizes[mid], max_width_mm)
+        if _fits(lines):
+            hi, best = mid, lines
+        else:
+            lo = mid
+    return TextFit(lines=tuple(best), size_pt=sizes[hi])
@@ -1,5 +1,18 @@
 from __future__ import annotations
-from typing import List, Tuple
+from typing import IO, Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import codecs
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _align(cols: List[str], width: int) -> List[str]:
+    # pad/truncate to header length
+    if len(cols) < width:
+        cols = cols + [""] * (width - len(cols))
+    elif len(cols) > width:
+        cols = cols[:width]
+    return [c.strip() for c in cols]
+
 
 def parse_tsv(text: str) -> Tuple[List[str], List[List[str]]]:
     """
@@ -19,11 +32,65 @@ def parse_tsv(text: str) -> Tuple[List[str], List[List[str]]]:
     headers = [h.strip() for h in lines[0].split("\t")]
     rows: List[List[str]] = []
     for ln in lines[1:]:
-        cols = ln.split("\t")
-        # pad/truncate to header length
-        if len(cols) < len(headers):
-            cols = cols + [""] * (len(headers) - len(cols))
-        elif len(cols) > len(headers):
-            cols = cols[:len(headers)]
-        rows.append([c.strip() for c in cols])
+        rows.append(_align(ln.split("\t"), len(headers)))
     return headers, rows
+
+
+class TsvRowReader:
+    """Incremental parse_tsv: feed decoded text in pieces, get aligned row dicts back.
+
+    Same BOM, newline (CRLF/CR/LF), blank-line and padding rules as parse_tsv,
+    holding at most one partial line between feeds.
+    """
+
+    def __init__(self) -> None:
+        self.headers: Optional[List[str]] = None
+        self._tail = ""
+        self._started = False
+
+    def feed(self, text: str, *, final: bool = False) -> List[Dict[str, str]]:
+        if not self._started and text:
+            text = text.lstrip("\ufeff")
+            self._started = bool(text)
+        buf = self._tail + text
+        carry_cr = ""
+        if not final and buf.endswith("\r"):
+            # May be the first half of a CRLF split across chunks
+            buf, carry_cr = buf[:-1], "\r"
+        lines = buf.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        self._tail = ("" if final else lines.pop()) + carry_cr
+        out: List[Dict[str, str]] = []
+        for ln in lines:
+            if ln == "":
+                continue
+            if self.headers is None:
+                self.headers = [h.strip() for h in ln.split("\t")]
+                continue
+            out.append(dict(zip(self.headers, _align(ln.split("\t"), len(self.headers)))))
+        return out
+
+    def close(self) -> List[Dict[str, str]]:
+        return self.feed("", final=True)
+
+
+async def aiter_tsv_rows(upload: Any, *, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[Dict[str, str]]:
+    """Yield row dicts from an UploadFile, reading and decoding it chunk by chunk."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    reader = TsvRowReader()
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        for row in reader.feed(decoder.decode(chunk)):
+            yield row
+    for row in reader.feed(decoder.decode(b"", final=True), final=True):
+        yield row
+
+
+def iter_tsv_rows(fh: IO[bytes], *, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, str]]:
+    """Synchronous aiter_tsv_rows for binary file objects (e.g. ZIP members)."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    reader = TsvRowReader()
+    for chunk in iter(lambda: fh.read(chunk_size), b""):
+        yield from reader.feed(decoder.decode(chunk))
+    yield from reader.feed(decoder.decode(b"", final=True), final=True)
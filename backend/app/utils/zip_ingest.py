@@ -1,14 +1,16 @@
 from __future__ import annotations
-from typing import List, Tuple, Dict, Any
-from pathlib import Path
+from dataclasses import dataclass, field
+from typing import IO, List, Optional, Sequence, Tuple, Dict, Any
+from pathlib import Path, PurePosixPath
+import io
+import shutil
 import time
 import zipfile
 import json
 import xml.etree.ElementTree as ET
-import requests
 import re
 import logging
-from ..settings import settings
+from .http_pool import get_session
 
 ALLOWED_EXTS = {".json", ".xml", ".svg", ".png", ".jpg", ".jpeg", ".gif"}
 
@@ -30,7 +32,7 @@ def download_zip(url: str, dest_path: Path, *, timeout: int, user_agent: str, re
     for attempt in range(retries):
         try:
             headers = {"User-Agent": user_agent}
-            with requests.get(url, headers=headers, allow_redirects=True, stream=True, timeout=(10, timeout)) as r:
+            with get_session().get(url, headers=headers, allow_redirects=True, stream=True, timeout=(10, timeout)) as r:
                 if r.status_code != 200:
                     raise ZipHttpError(r.status_code, url)
                 limit = (max_mb or 10**9) * 1024 * 1024
@@ -46,7 +48,8 @@ def download_zip(url: str, dest_path: Path, *, timeout: int, user_agent: str, re
             return dest_path
         except Exception as e:
             last_err = e
-            time.sleep(2 ** attempt)
+            if attempt + 1 < retries:
+                time.sleep(2 ** attempt)
     if last_err:
         raise last_err
     return dest_path
@@ -60,271 +63,391 @@ def _is_within(path: Path, base: Path) -> bool:
         return False
 
 
-def safe_extract(zip_path: Path, dest_dir: Path, *, max_mb: int) -> List[Path]:
-    dest_dir.mkdir(parents=True, exist_ok=True)
+def _allowed_members(zf: zipfile.ZipFile, *, max_mb: int) -> List[zipfile.ZipInfo]:
+    """Validate the archive's total size and return the members we ingest."""
     max_bytes = max_mb * 1024 * 1024
     total_bytes = 0
+    for info in zf.infolist():
+        total_bytes += info.file_size
+        if total_bytes > max_bytes:
+            raise ZipTooLargeError(f"ZIP exceeds {max_mb} MB limit")
+    return [
+        info for info in zf.infolist()
+        if not info.is_dir() and Path(info.filename).suffix.lower() in ALLOWED_EXTS
+    ]
+
+
+def _extract_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo, dest_dir: Path) -> Optional[Path]:
+    # Stream one member to dest_dir/<its path in the archive>; None if it would escape dest_dir
+    target = dest_dir / info.filename
+    if not _is_within(target, dest_dir):
+        return None
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with zf.open(info) as src, target.open("wb") as dst:
+        shutil.copyfileobj(src, dst)
+    return target
+
+
+def safe_extract(zip_path: Path, dest_dir: Path, *, max_mb: int) -> List[Path]:
+    dest_dir.mkdir(parents=True, exist_ok=True)
     out_files: List[Path] = []
 
     with zipfile.ZipFile(zip_path) as zf:
-        # Pre-validate size
-        for info in zf.infolist():
-            total_bytes += info.file_size
-            if total_bytes > max_bytes:
-                raise ZipTooLargeError(f"ZIP exceeds {max_mb} MB limit")
         # Extract allowed files safely
-        for info in zf.infolist():
-            if info.is_dir():
-                continue
-            ext = Path(info.filename).suffix.lower()
-            if ext not in ALLOWED_EXTS:
-                continue
-            target = dest_dir / info.filename
-            if not _is_within(target, dest_dir):
-                continue
-            target.parent.mkdir(parents=True, exist_ok=True)
-            with zf.open(info) as src, target.open("wb") as dst:
-                dst.write(src.read())
-            out_files.append(target)
+        for info in _allowed_members(zf, max_mb=max_mb):
+            target = _extract_member(zf, info, dest_dir)
+            if target is not None:
+                out_files.append(target)
 
     return out_files
 
 
-def parse_personalisation(files: List[Path]) -> Dict[str, Any]:
+class ArchiveMember:
+    """A ZIP member read in place; quacks like the Path parse_personalisation expects."""
+
+    def __init__(self, zf: zipfile.ZipFile, info: zipfile.ZipInfo):
+        self._zf = zf
+        self.info = info
+        self.name = PurePosixPath(info.filename).name
+        self.suffix = PurePosixPath(info.filename).suffix
+
+    def open(self, mode: str = "rb") -> IO[bytes]:
+        return self._zf.open(self.info)
+
+    def read_text(self, encoding: str = "utf-8") -> str:
+        with self.open() as f:
+            return f.read().decode(encoding)
+
+    def extract_to(self, dest_dir: Path) -> Path:
+        """Stream this member to dest_dir/<basename> and return the new path."""
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        target = dest_dir / self.name
+        with self.open() as src, target.open("wb") as dst:
+            shutil.copyfileobj(src, dst)
+        return target
+
+    def __str__(self) -> str:
+        return self.info.filename
+
+
+def parse_archive(
+    zip_path: Path, dest_dir: Path, *, max_mb: int, inmemory_max_bytes: int = 0, keep_members: bool = False
+) -> Tuple[Dict[str, Any], List[Path]]:
+    """Parse personalisation straight from the ZIP without extracting it.
+
+    Archives up to inmemory_max_bytes are read into memory in one go. Only the
+    chosen photo is written to dest_dir, unless keep_members is set: then every
+    member safe_extract would write is streamed out to the same paths, so the
+    files published as assets match extract mode. Returns (parsed, written_files).
     """
-    Returns dict: { line_1, line_2, line_3, graphics_key, photo }
-    Missing entries set to None. Prefers JSON then XML.
+    src: Any = zip_path
+    if inmemory_max_bytes and zip_path.stat().st_size <= inmemory_max_bytes:
+        src = io.BytesIO(zip_path.read_bytes())
+    with zipfile.ZipFile(src) as zf:
+        members = [ArchiveMember(zf, info) for info in _allowed_members(zf, max_mb=max_mb)]
+        data = parse_personalisation(members)
+        written: List[Path] = []
+        photo = data.get("photo_path")
+        if keep_members:
+            for member in members:
+                path = _extract_member(zf, member.info, dest_dir)
+                if path is None:
+                    continue
+                written.append(path)
+                if member is photo:
+                    data["photo_path"] = path
+                    data["photo"]["path"] = str(path)
+        elif isinstance(photo, ArchiveMember):
+            path = photo.extract_to(dest_dir)
+            data["photo_path"] = path
+            data["photo"]["path"] = str(path)
+            written.append(path)
+    return data, written
+
+
+_IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+_TEXT_INPUT_RE = re.compile(r"^text\s*input\s*\d+\s*$", re.I)
+_CONTAINER_NOISE = {"face", "front", "back", "surface", "surface 1", "surface 2", "default", "none"}
+_GRAPHIC_NOISE = _CONTAINER_NOISE | {"text", "line 1", "line 2", "line 3"}
+_WS_RE = re.compile(r"\s+")
+
+# Lower-cased keys read from customizationData nodes
+_CHILD_KEYS = ("children", "items", "nodes", "options")
+_CHILD_KEYS_REVERSED = tuple(reversed(_CHILD_KEYS))
+_WEAK_KEYS = ("optionvalue", "value", "name", "graphic")
+_NODE_KEYS = frozenset({"__typename", "type", "inputvalue", "image", "label", *_WEAK_KEYS, *_CHILD_KEYS})
+_IMAGE_KEYS = frozenset({"imagename", "buyerfilename"})
+_AREA_KEYS = frozenset({"customizationtype", "name", "label", "optionvalue"})
+_V3_KEYS = frozenset({"version3.0", "version3_0", "v3"})
+
+
+def _norm(s: Any) -> str:
+    return _WS_RE.sub(" ", s.strip()).lower() if isinstance(s, str) else ""
+
+
+def _short(s: str | None) -> str:
+    return (s or "")[:10]
+
+
+def _ci(d: Dict[Any, Any], wanted: frozenset[str] | None = None) -> Dict[str, Any]:
+    """Case-insensitive view of one dict level, last spelling of a key wins.
+
+    Only d's own keys are read (optionally just `wanted`); values are the
+    payload's objects, so nothing below d is copied.
     """
-    def _norm_keys(obj: Any) -> Any:
-        if isinstance(obj, dict):
-            return {str(k).lower(): _norm_keys(v) for k, v in obj.items()}
-        if isinstance(obj, list):
-            return [_norm_keys(x) for x in obj]
-        return obj
-
-    def _short(s: str | None) -> str:
-        return (s or "")[:10]
-
-    _TEXT_INPUT_RE = re.compile(r"^text\s*input\s*\d+\s*$", re.I)
-    _CONTAINER_NOISE = {"face","front","back","surface","surface 1","surface 2","default","none"}
-    def _norm(s: str) -> str:
-        return re.sub(r"\s+", " ", s.strip()).lower() if isinstance(s, str) else ""
-
-    def _load_graphic_catalog_names() -> set[str]:
-        names: set[str] = set()
-        try:
-            base = settings.DATA_DIR / "assets" / "graphics"
-            if base.exists():
-                for p in base.rglob("*"):
-                    if p.suffix.lower() in {".png", ".jpg", ".jpeg", ".svg"}:
-                        names.add(_norm(p.stem))
-        except Exception:
-            return set()
-        return names
+    out: Dict[str, Any] = {}
+    for k, v in d.items():
+        lk = k.lower() if isinstance(k, str) else str(k).lower()
+        if wanted is None or lk in wanted:
+            out[lk] = v
+    return out
+
+
+def _hint(chain: Tuple[str, Any] | None, label: str) -> str:
+    parts = [label]
+    while chain is not None:
+        parts.append(chain[0])
+        chain = chain[1]
+    return " > ".join(reversed(parts))
 
-    # Collect images list; photo may be overridden by ImageCustomization below
-    images = [p for p in files if p.suffix.lower() in {".jpg", ".jpeg", ".png"}]
-    photo_path: Path | None = images[0] if images else None
+
+@dataclass
+class _Extraction:
+    images_by_name: Dict[str, Any]
+    photo_path: Any = None
     photo_image_name: str | None = None
     photo_buyer_name: str | None = None
     photo_via: str = "-"
-
-    lines: List[str] = []
+    lines: List[str] = field(default_factory=list)
     graphics: str | None = None
-    KEYWORDS = ["graphic", "background", "design", "surface", "face", "border", "frame", "vine", "rose", "cat", "dog"]
-    candidates: List[Tuple[str, str]] = []  # (path_hint, value)
-    selected_by_surfaces: List[str] = []
+    # (ancestor chain, node label, value); see _hint()
+    candidates: List[Tuple[Any, str, str]] = field(default_factory=list)
+    selected_by_surfaces: List[str] = field(default_factory=list)
+
+    def match_photo(self, img: Any) -> None:
+        if not isinstance(img, dict):
+            return
+        f = _ci(img, _IMAGE_KEYS)
+        name, buyer = f.get("imagename"), f.get("buyerfilename")
+        # Prefer primary imageName (real photo)
+        if isinstance(name, str) and name.strip():
+            hit = self.images_by_name.get(name.strip().lower())
+            if hit is not None:
+                self.photo_path = hit
+                self.photo_image_name = name.strip()
+                self.photo_via = "imageName"
+        # Fallback to buyerFilename if primary not matched
+        if (self.photo_via == "-" or self.photo_path is None) and isinstance(buyer, str) and buyer.strip():
+            hit = self.images_by_name.get(buyer.strip().lower())
+            if hit is not None:
+                self.photo_path = hit
+                self.photo_buyer_name = buyer.strip()
+                self.photo_via = "buyerFilename"
+
+    def walk(self, root: Any) -> None:
+        """Pre-order walk of a customizationData tree with an explicit stack.
+
+        Each entry carries its ancestors as a (label, parent) chain; the
+        " > " path hint is only joined if the candidate fallback needs it.
+        """
+        stack: List[Tuple[Any, Tuple[str, Any] | None]] = [(root, None)]
+        pop, push = stack.pop, stack.append
+        candidates = self.candidates
+        while stack:
+            node, chain = pop()
+            if isinstance(node, list):
+                stack.extend((el, chain) for el in reversed(node))
+                continue
+            if not isinstance(node, dict):
+                continue
+            f: Dict[str, Any] = {}
+            for k, v in node.items():
+                lk = k.lower()
+                if lk in _NODE_KEYS:
+                    f[lk] = v
+            t = f.get("__typename") or f.get("type")
+            if isinstance(t, str):
+                tl = t.lower()
+                if tl.startswith("textcustomization"):
+                    iv = f.get("inputvalue")
+                    if isinstance(iv, str):
+                        self.lines.append(iv)
+                elif tl == "imagecustomization":
+                    self.match_photo(f.get("image"))
+            label = str(f.get("name") or f.get("label") or t or "")
+            # select-like nodes: optionvalue/value/name/graphic are weak candidates
+            for key in _WEAK_KEYS:
+                val = f.get(key)
+                if isinstance(val, str):
+                    val = val.strip()
+                    if val:
+                        candidates.append((chain, label, val))
+            sub = None
+            for key in _CHILD_KEYS_REVERSED:
+                child = f.get(key)
+                if isinstance(child, list):
+                    sub = sub or (label, chain)
+                    for el in reversed(child):
+                        push((el, sub))
+                elif isinstance(child, dict):
+                    sub = sub or (label, chain)
+                    push((child, sub))
+
+    def scan_surfaces(self, surfaces: List[Any]) -> None:
+        """customizationInfo.version3.0.surfaces[].areas[]: the graphic option wins."""
+        for s in surfaces:
+            areas = _ci(s, frozenset({"areas"})).get("areas") if isinstance(s, dict) else None
+            if not isinstance(areas, list):
+                continue
+            for a in areas:
+                if not isinstance(a, dict):
+                    continue
+                f = _ci(a, _AREA_KEYS)
+                val = f.get("optionvalue")
+                if not (isinstance(val, str) and val.strip()):
+                    continue
+                ctype = _norm(f.get("customizationtype") or "")
+                if ctype == "options" and "graphic" in _norm(f.get("name") or f.get("label") or ""):
+                    self.graphics = val.strip()
+                    return
+                # also collect surface values for ranking reference
+                self.selected_by_surfaces.append(val.strip())
+
+    def scan_json(self, raw: Any) -> None:
+        if not isinstance(raw, dict):
+            return
+        data = _ci(raw)
+        # direct keys
+        for k in ("line_1", "line_2", "line_3"):
+            v = data.get(k)
+            if isinstance(v, str):
+                self.lines.append(v)
+        if isinstance(data.get("graphic"), str) and not self.graphics:
+            self.graphics = data["graphic"]
+        for k in ("customizationdata", "customization_data"):
+            if k in data:
+                self.walk(data[k])
+        # PRIMARY: customizationInfo.version3.0.surfaces[].areas[]
+        ci = data.get("customizationinfo") or {}
+        if isinstance(ci, dict):
+            f = _ci(ci, _V3_KEYS)
+            v3 = f.get("version3.0") or f.get("version3_0") or f.get("v3")
+            if isinstance(v3, dict):
+                surfaces = _ci(v3, frozenset({"surfaces"})).get("surfaces")
+                if isinstance(surfaces, list):
+                    self.scan_surfaces(surfaces)
+
+
+def _scan_xml(src: Path | ArchiveMember) -> Tuple[List[str], str | None]:
+    """Stream an XML payload; returns (texts, first graphic/option value) in document order."""
+    texts: List[Tuple[int, str]] = []
+    graphic: Tuple[int, str] | None = None
+    # Text is only complete at "end", so number elements at "start" to keep
+    # document (pre-)order for nested matches.
+    open_seq: List[int] = []
+    seq = 0
+    with src.open("rb") as fh:
+        for event, el in ET.iterparse(fh, events=("start", "end")):
+            if event == "start":
+                open_seq.append(seq)
+                seq += 1
+                continue
+            n = open_seq.pop()
+            text = el.text.strip() if el.text else ""
+            if text:
+                tag = el.tag.lower() if isinstance(el.tag, str) else ""
+                if "text" in tag:
+                    texts.append((n, text))
+                if ("graphic" in tag or "option" in tag) and (graphic is None or n < graphic[0]):
+                    graphic = (n, text)
+            el.clear()
+    texts.sort()
+    return [t for _, t in texts], (graphic[1] if graphic else None)
+
+
+def parse_personalisation(files: Sequence[Path | ArchiveMember]) -> Dict[str, Any]:
+    """
+    Returns dict: { line_1, line_2, line_3, graphics_key, photo }
+    Missing entries set to None. Prefers JSON then XML.
+    Accepts extracted files or ArchiveMembers read in place.
+    """
+    # Collect images; photo may be overridden by ImageCustomization below
+    images = [p for p in files if p.suffix.lower() in _IMAGE_SUFFIXES]
+    by_name: Dict[str, Any] = {}
+    for p in images:
+        by_name.setdefault(p.name.lower(), p)
+    st = _Extraction(images_by_name=by_name, photo_path=images[0] if images else None)
 
     # JSON first
     for p in files:
-        if p.suffix.lower() == ".json":
-            try:
-                raw = json.loads(p.read_text(encoding="utf-8"))
-                data = _norm_keys(raw)
-                # direct keys
-                for k in ("line_1", "line_2", "line_3"):
-                    v = data.get(k)
-                    if isinstance(v, str):
-                        lines.append(v)
-                if isinstance(data.get("graphic"), str) and not graphics:
-                    graphics = data.get("graphic")
-
-                # walk customizationData trees
-                def walk(node: Any, ancestors: List[str] | None = None):
-                    nonlocal graphics, lines, candidates, photo_path
-                    ancestors = ancestors or []
-                    if isinstance(node, dict):
-                        t = node.get("__typename") or node.get("type")
-                        if isinstance(t, str) and t.lower().startswith("textcustomization"):
-                            iv = node.get("inputvalue")
-                            if isinstance(iv, str):
-                                lines.append(iv)
-                        # ImageCustomization: prefer explicit imageName
-                        if isinstance(t, str) and t.lower() == "imagecustomization":
-                            img = node.get("image") or {}
-                            if isinstance(img, dict):
-                                name = img.get("imagename") or img.get("imageName")
-                                buyer = img.get("buyerfilename") or img.get("buyerFilename")
-                                # Prefer primary imageName (real photo)
-                                if isinstance(name, str) and name.strip():
-                                    for cand in images:
-                                        if cand.name.lower() == name.strip().lower():
-                                            photo_path = cand
-                                            photo_image_name = name.strip()
-                                            photo_via = "imageName"
-                                            break
-                                # Fallback to buyerFilename if primary not matched
-                                if (photo_via == "-" or photo_path is None) and isinstance(buyer, str) and buyer.strip():
-                                    for cand in images:
-                                        if cand.name.lower() == buyer.strip().lower():
-                                            photo_path = cand
-                                            photo_buyer_name = buyer.strip()
-                                            photo_via = "buyerFilename"
-                                            break
-                        # Explicitly ignore preview snapshots and SVG overlay images
-                        snap = node.get("snapshot") if isinstance(node.get("snapshot"), dict) else None
-                        if isinstance(snap, dict):
-                            # ignore snapshot.imageName entirely
-                            pass
-                        # explicit support for Option/Select customizations: collect candidates
-                        if isinstance(t, str) and t in ("OptionCustomization", "SelectCustomization"):
-                            sel = node.get("optionSelection") or {}
-                            val = None
-                            if isinstance(sel, dict):
-                                val = sel.get("name") or sel.get("label")
-                            if not isinstance(val, str) or not val.strip():
-                                dv = node.get("displayValue")
-                                if isinstance(dv, str) and dv.strip():
-                                    val = dv
-                            if isinstance(val, str) and val.strip():
-                                name_or_label = (node.get("name") or node.get("label") or "")
-                                hint = " > ".join([*ancestors, str(name_or_label)])
-                                candidates.append((hint, val.strip()))
-                        # other select-like nodes: still collect optionvalue/value/name as weak candidates
-                        for key in ("optionvalue", "value", "name", "graphic"):
-                            val = node.get(key)
-                            if isinstance(val, str) and val.strip():
-                                hint = " > ".join([*ancestors, str(node.get("name") or node.get("label") or t or "")])
-                                candidates.append((hint, val.strip()))
-                        # recurse
-                        for child_key in ("children", "items", "nodes", "options"):
-                            child = node.get(child_key)
-                            if isinstance(child, list):
-                                for el in child:
-                                    walk(el, ancestors + [str(node.get("name") or node.get("label") or t or "")])
-                            elif isinstance(child, dict):
-                                walk(child, ancestors + [str(node.get("name") or node.get("label") or t or "")])
-                    elif isinstance(node, list):
-                        for el in node:
-                            walk(el, ancestors)
-
-                for k in ("customizationdata", "customization_data"):
-                    if k in data:
-                        walk(data[k])
-
-                # PRIMARY: customizationInfo.version3.0.surfaces[].areas[]
-                ci = data.get("customizationinfo") or {}
-                v3 = isinstance(ci, dict) and (ci.get("version3.0") or ci.get("version3_0") or ci.get("v3"))
-                if isinstance(v3, dict):
-                    surfaces = v3.get("surfaces")
-                    if isinstance(surfaces, list):
-                        done = False
-                        for s in surfaces:
-                            areas = isinstance(s, dict) and s.get("areas")
-                            if isinstance(areas, list):
-                                for a in areas:
-                                    if not isinstance(a, dict):
-                                        continue
-                                    ctype = _norm(a.get("customizationtype") or "")
-                                    nm = (a.get("name") or a.get("label") or "")
-                                    nm_l = _norm(nm)
-                                    val = a.get("optionvalue") or a.get("optionValue")
-                                    if (ctype == "options" and "graphic" in nm_l and isinstance(val, str) and val.strip()):
-                                        graphics = val.strip()
-                                        done = True
-                                        break
-                                    # also collect surface values for ranking reference
-                                    if isinstance(val, str) and val.strip():
-                                        selected_by_surfaces.append(val.strip())
-                            if done:
-                                break
-
-                if lines or candidates or selected_by_surfaces or photo:
-                    break
-            except Exception:
-                continue
+        if p.suffix.lower() != ".json":
+            continue
+        try:
+            with p.open("rb") as fh:
+                raw = json.load(fh)
+        except Exception:
+            continue
+        st.scan_json(raw)
+        if st.lines or st.candidates or st.selected_by_surfaces:
+            break
 
     # XML fallback
-    if not (lines or graphics):
+    if not (st.lines or st.graphics):
         for p in files:
-            if p.suffix.lower() == ".xml":
-                try:
-                    root = ET.fromstring(p.read_text(encoding="utf-8"))
-                    # find text-like nodes
-                    texts: List[str] = []
-                    for el in root.iter():
-                        tag = el.tag.lower() if isinstance(el.tag, str) else ""
-                        if "text" in tag and el.text and el.text.strip():
-                            texts.append(el.text.strip())
-                        if ("graphic" in tag or "option" in tag) and (el.text and el.text.strip()):
-                            if not graphics:
-                                graphics = el.text.strip()
-                    lines.extend(texts)
-                    if lines or graphics:
-                        break
-                except Exception:
-                    continue
+            if p.suffix.lower() != ".xml":
+                continue
+            try:
+                texts, graphic = _scan_xml(p)
+            except Exception:
+                continue
+            st.lines.extend(texts)
+            if graphic is not None:
+                st.graphics = graphic
+            if st.lines or st.graphics:
+                break
 
     # If surfaces logic selected, keep it; otherwise FALLBACK to Option/Select candidates in encounter order
-    if not graphics:
-        noise = _CONTAINER_NOISE | {"text", "line 1", "line 2", "line 3"}
+    if not st.graphics:
         chosen: str | None = None
-        for hint, v in candidates:
-            # derive node label from hint's last segment
+        for chain, node_label, v in st.candidates:
+            # derive node label from the path hint's last segment
+            hint = _hint(chain, node_label)
             label = _norm(hint.split(" > ")[-1]) if hint else ""
             if _TEXT_INPUT_RE.match(label):
                 continue
-            if _norm(v) in noise:
+            if _norm(v) in _GRAPHIC_NOISE:
                 continue
-            if isinstance(v, str) and v.strip():
-                chosen = v.strip()
-                break
-        graphics = chosen
-
-    # Final photo fallback to first extracted image if none matched by name
-    if photo_path is None and images:
-        photo_path = images[0]
-        photo_via = "fallback"
+            chosen = v
+            break
+        st.graphics = chosen
 
+    lines = st.lines
+    photo_path = st.photo_path
     out = {
         "line_1": lines[0] if len(lines) > 0 else None,
         "line_2": lines[1] if len(lines) > 1 else None,
         "line_3": lines[2] if len(lines) > 2 else None,
-        "graphics_key": graphics,
+        "graphics_key": st.graphics,
         # New explicit photo fields
         "photo_path": photo_path,
-        "photo_filename": (photo_image_name or photo_buyer_name),
-        "photo_via": photo_via,
+        "photo_filename": (st.photo_image_name or st.photo_buyer_name),
+        "photo_via": st.photo_via,
         # Backward compatibility
         "photo": {
             "path": str(photo_path) if photo_path else None,
-            "imageName": photo_image_name,
-            "buyerFilename": photo_buyer_name,
+            "imageName": st.photo_image_name,
+            "buyerFilename": st.photo_buyer_name,
         },
     }
 
     # Concise summary log
-    try:
-        logger = logging.getLogger("ingest")
-        logger.info(
-            "[ingest] parsed graphics candidates=%s surfaces=%s text=(%s,%s,%s) photo=%s via=%s",
-            len(candidates), len(selected_by_surfaces),
-            _short(out["line_1"]), _short(out["line_2"]), _short(out["line_3"]),
-            (photo_image_name or photo_buyer_name or (photo_path.name if photo_path else '-') or '-'),
-            photo_via,
-        )
-    except Exception:
-        pass
+    logging.getLogger("ingest").info(
+        "[ingest] parsed graphics candidates=%s surfaces=%s text=(%s,%s,%s) photo=%s via=%s",
+        len(st.candidates), len(st.selected_by_surfaces),
+        _short(out["line_1"]), _short(out["line_2"]), _short(out["line_3"]),
+        (st.photo_image_name or st.photo_buyer_name or (photo_path.name if photo_path else "-")),
+        st.photo_via,
+    )
     return out
 
 
@@ -0,0 +1,79 @@
+"""Benchmark parse_personalisation against the frozen reference.
+
+    cd backend && python tests/bench_parse_personalisation.py [--rounds N]
+
+Every corpus case under tests/fixtures/customisation, plus a synthetic large
+payload, must produce identical output from both implementations; the script
+exits non-zero on the first mismatch and otherwise prints timings.
+"""
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import json
+import sys
+import tempfile
+import time
+
+_TESTS_DIR = Path(__file__).resolve().parent
+sys.path[:0] = [str(_TESTS_DIR.parent), str(_TESTS_DIR)]
+
+from app.utils.zip_ingest import parse_personalisation  # noqa: E402
+import personalisation_reference  # noqa: E402
+
+CORPUS = _TESTS_DIR / "fixtures" / "customisation"
+
+
+def _large_payload(dest: Path, *, containers: int = 200, options: int = 40) -> list[Path]:
+    children = []
+    for c in range(containers):
+        children.append({
+            "type": "PlacementContainerCustomization",
+            "name": f"Area {c}",
+            "children": [
+                {"type": "TextCustomization", "name": f"Text Input {c}", "inputValue": f"Line {c}"},
+                {"type": "OptionCustomization", "name": "Graphic", "optionSelection": {"name": f"G{c}"},
+                 "options": [{"name": f"Choice {c}-{o}", "value": f"v{o}"} for o in range(options)]},
+            ],
+        })
+    p = dest / "large.json"
+    p.write_text(json.dumps({"customizationData": {"type": "CustomizationContainer", "children": children}}))
+    return [p]
+
+
+def _time(fn, files, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(files)
+    return (time.perf_counter() - start) / rounds
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [(d.name, sorted(d.iterdir())) for d in sorted(CORPUS.iterdir()) if d.is_dir()]
+        cases.append(("synthetic_large", _large_payload(Path(tmp))))
+
+        print(f"{'case':<28}{'reference ms':>14}{'current ms':>12}{'speedup':>9}")
+        total_ref = total_new = 0.0
+        for name, files in cases:
+            expected = personalisation_reference.parse_personalisation(files)
+            got = parse_personalisation(files)
+            if got != expected:
+                print(f"MISMATCH in {name}:\n  reference: {expected}\n  current:   {got}", file=sys.stderr)
+                return 1
+            rounds = max(1, args.rounds // 20) if name == "synthetic_large" else args.rounds
+            ref = _time(personalisation_reference.parse_personalisation, files, rounds)
+            new = _time(parse_personalisation, files, rounds)
+            total_ref += ref
+            total_new += new
+            print(f"{name:<28}{ref * 1e3:>14.3f}{new * 1e3:>12.3f}{ref / new:>8.2f}x")
+        print(f"{'total':<28}{total_ref * 1e3:>14.3f}{total_new * 1e3:>12.3f}{total_ref / total_new:>8.2f}x")
+        print(f"outputs identical for {len(cases)} cases")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,58 @@
 from pathlib import Path
 import sys
 
+import pytest
+
 # Ensure 'backend/' is on sys.path for imports like 'from app.main import app'
 _BACKEND_DIR = Path(__file__).resolve().parents[1]
 if str(_BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(_BACKEND_DIR))
+
+
+@pytest.fixture(autouse=True)
+def _isolated_ingest_cache(tmp_path_factory, monkeypatch):
+    # Tests reuse the same customized-url with different fake ZIPs
+    from app.settings import settings
+    monkeypatch.setattr(settings, "INGEST_CACHE_DIR", tmp_path_factory.mktemp("ingest-cache"))
+
+
+@pytest.fixture(autouse=True)
+def _reset_rate_limits():
+    # The suite makes more ingest calls than the per-minute limit allows
+    from app.middleware.rate_limit import limiter
+    limiter.reset()
+
+
+@pytest.fixture(autouse=True)
+def _reset_download_guards(monkeypatch):
+    # Fake hosts fail on purpose; keep one test's outage out of the next, and
+    # never leave background retries running against patched downloaders
+    from app.settings import settings
+    from app.utils.circuit_breaker import get_breaker
+    from app.utils.retry_queue import get_queue
+    monkeypatch.setattr(settings, "DOWNLOAD_BACKOFF_S", 0)
+    monkeypatch.setattr(settings, "DOWNLOAD_RETRY_QUEUE_ENABLED", False)
+    get_breaker().reset()
+    yield
+    get_queue().clear()
+    get_breaker().reset()
+
+
+@pytest.fixture(autouse=True)
+def _isolated_db(tmp_path_factory, monkeypatch):
+    # Keep ingest's order-line and photo indexes out of backend/data/app.db;
+    # get_db and the ingest stream both open sessions from SessionLocal
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import app.database as database
+    from app.models.order_line import OrderLine  # noqa: F401 - register tables
+    from app.models.photo_ref import PhotoRef  # noqa: F401
+    from app.models.user import Graphic, User  # noqa: F401
+
+    path = tmp_path_factory.mktemp("db") / "app.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    yield
+    engine.dispose()
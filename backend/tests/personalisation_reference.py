@@ -0,0 +1,228 @@
+"""Frozen copy of the recursive parse_personalisation, kept as the oracle for
+the corpus test and bench_parse_personalisation.py.
+
+Verbatim from before the single-pass rewrite, minus the unused graphics
+catalogue loader and the summary log, except for walk()'s nonlocal line: it
+used to omit photo_image_name/photo_buyer_name/photo_via, so a matched
+imageName never reached the output and an ImageCustomization without a
+matching imageName raised UnboundLocalError and abandoned the rest of the file.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple
+import json
+import xml.etree.ElementTree as ET
+import re
+
+
+def parse_personalisation(files) -> Dict[str, Any]:
+    """
+    Returns dict: { line_1, line_2, line_3, graphics_key, photo }
+    Missing entries set to None. Prefers JSON then XML.
+    Accepts extracted files or ArchiveMembers read in place.
+    """
+    def _norm_keys(obj: Any) -> Any:
+        if isinstance(obj, dict):
+            return {str(k).lower(): _norm_keys(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [_norm_keys(x) for x in obj]
+        return obj
+
+    _TEXT_INPUT_RE = re.compile(r"^text\s*input\s*\d+\s*$", re.I)
+    _CONTAINER_NOISE = {"face","front","back","surface","surface 1","surface 2","default","none"}
+    def _norm(s: str) -> str:
+        return re.sub(r"\s+", " ", s.strip()).lower() if isinstance(s, str) else ""
+
+    # Collect images list; photo may be overridden by ImageCustomization below
+    images = [p for p in files if p.suffix.lower() in {".jpg", ".jpeg", ".png"}]
+    photo_path = images[0] if images else None
+    photo_image_name: str | None = None
+    photo_buyer_name: str | None = None
+    photo_via: str = "-"
+
+    lines: List[str] = []
+    graphics: str | None = None
+    KEYWORDS = ["graphic", "background", "design", "surface", "face", "border", "frame", "vine", "rose", "cat", "dog"]
+    candidates: List[Tuple[str, str]] = []  # (path_hint, value)
+    selected_by_surfaces: List[str] = []
+
+    # JSON first
+    for p in files:
+        if p.suffix.lower() == ".json":
+            try:
+                with p.open("rb") as fh:
+                    raw = json.load(fh)
+                data = _norm_keys(raw)
+                # direct keys
+                for k in ("line_1", "line_2", "line_3"):
+                    v = data.get(k)
+                    if isinstance(v, str):
+                        lines.append(v)
+                if isinstance(data.get("graphic"), str) and not graphics:
+                    graphics = data.get("graphic")
+
+                # walk customizationData trees
+                def walk(node: Any, ancestors: List[str] | None = None):
+                    nonlocal graphics, lines, candidates, photo_path, photo_image_name, photo_buyer_name, photo_via
+                    ancestors = ancestors or []
+                    if isinstance(node, dict):
+                        t = node.get("__typename") or node.get("type")
+                        if isinstance(t, str) and t.lower().startswith("textcustomization"):
+                            iv = node.get("inputvalue")
+                            if isinstance(iv, str):
+                                lines.append(iv)
+                        # ImageCustomization: prefer explicit imageName
+                        if isinstance(t, str) and t.lower() == "imagecustomization":
+                            img = node.get("image") or {}
+                            if isinstance(img, dict):
+                                name = img.get("imagename") or img.get("imageName")
+                                buyer = img.get("buyerfilename") or img.get("buyerFilename")
+                                # Prefer primary imageName (real photo)
+                                if isinstance(name, str) and name.strip():
+                                    for cand in images:
+                                        if cand.name.lower() == name.strip().lower():
+                                            photo_path = cand
+                                            photo_image_name = name.strip()
+                                            photo_via = "imageName"
+                                            break
+                                # Fallback to buyerFilename if primary not matched
+                                if (photo_via == "-" or photo_path is None) and isinstance(buyer, str) and buyer.strip():
+                                    for cand in images:
+                                        if cand.name.lower() == buyer.strip().lower():
+                                            photo_path = cand
+                                            photo_buyer_name = buyer.strip()
+                                            photo_via = "buyerFilename"
+                                            break
+                        # Explicitly ignore preview snapshots and SVG overlay images
+                        snap = node.get("snapshot") if isinstance(node.get("snapshot"), dict) else None
+                        if isinstance(snap, dict):
+                            # ignore snapshot.imageName entirely
+                            pass
+                        # explicit support for Option/Select customizations: collect candidates
+                        if isinstance(t, str) and t in ("OptionCustomization", "SelectCustomization"):
+                            sel = node.get("optionSelection") or {}
+                            val = None
+                            if isinstance(sel, dict):
+                                val = sel.get("name") or sel.get("label")
+                            if not isinstance(val, str) or not val.strip():
+                                dv = node.get("displayValue")
+                                if isinstance(dv, str) and dv.strip():
+                                    val = dv
+                            if isinstance(val, str) and val.strip():
+                                name_or_label = (node.get("name") or node.get("label") or "")
+                                hint = " > ".join([*ancestors, str(name_or_label)])
+                                candidates.append((hint, val.strip()))
+                        # other select-like nodes: still collect optionvalue/value/name as weak candidates
+                        for key in ("optionvalue", "value", "name", "graphic"):
+                            val = node.get(key)
+                            if isinstance(val, str) and val.strip():
+                                hint = " > ".join([*ancestors, str(node.get("name") or node.get("label") or t or "")])
+                                candidates.append((hint, val.strip()))
+                        # recurse
+                        for child_key in ("children", "items", "nodes", "options"):
+                            child = node.get(child_key)
+                            if isinstance(child, list):
+                                for el in child:
+                                    walk(el, ancestors + [str(node.get("name") or node.get("label") or t or "")])
+                            elif isinstance(child, dict):
+                                walk(child, ancestors + [str(node.get("name") or node.get("label") or t or "")])
+                    elif isinstance(node, list):
+                        for el in node:
+                            walk(el, ancestors)
+
+                for k in ("customizationdata", "customization_data"):
+                    if k in data:
+                        walk(data[k])
+
+                # PRIMARY: customizationInfo.version3.0.surfaces[].areas[]
+                ci = data.get("customizationinfo") or {}
+                v3 = isinstance(ci, dict) and (ci.get("version3.0") or ci.get("version3_0") or ci.get("v3"))
+                if isinstance(v3, dict):
+                    surfaces = v3.get("surfaces")
+                    if isinstance(surfaces, list):
+                        done = False
+                        for s in surfaces:
+                            areas = isinstance(s, dict) and s.get("areas")
+                            if isinstance(areas, list):
+                                for a in areas:
+                                    if not isinstance(a, dict):
+                                        continue
+                                    ctype = _norm(a.get("customizationtype") or "")
+                                    nm = (a.get("name") or a.get("label") or "")
+                                    nm_l = _norm(nm)
+                                    val = a.get("optionvalue") or a.get("optionValue")
+                                    if (ctype == "options" and "graphic" in nm_l and isinstance(val, str) and val.strip()):
+                                        graphics = val.strip()
+                                        done = True
+                                        break
+                                    # also collect surface values for ranking reference
+                                    if isinstance(val, str) and val.strip():
+                                        selected_by_surfaces.append(val.strip())
+                            if done:
+                                break
+
+                if lines or candidates or selected_by_surfaces or photo:
+                    break
+            except Exception:
+                continue
+
+    # XML fallback
+    if not (lines or graphics):
+        for p in files:
+            if p.suffix.lower() == ".xml":
+                try:
+                    with p.open("rb") as fh:
+                        root = ET.parse(fh).getroot()
+                    # find text-like nodes
+                    texts: List[str] = []
+                    for el in root.iter():
+                        tag = el.tag.lower() if isinstance(el.tag, str) else ""
+                        if "text" in tag and el.text and el.text.strip():
+                            texts.append(el.text.strip())
+                        if ("graphic" in tag or "option" in tag) and (el.text and el.text.strip()):
+                            if not graphics:
+                                graphics = el.text.strip()
+                    lines.extend(texts)
+                    if lines or graphics:
+                        break
+                except Exception:
+                    continue
+
+    # If surfaces logic selected, keep it; otherwise FALLBACK to Option/Select candidates in encounter order
+    if not graphics:
+        noise = _CONTAINER_NOISE | {"text", "line 1", "line 2", "line 3"}
+        chosen: str | None = None
+        for hint, v in candidates:
+            # derive node label from hint's last segment
+            label = _norm(hint.split(" > ")[-1]) if hint else ""
+            if _TEXT_INPUT_RE.match(label):
+                continue
+            if _norm(v) in noise:
+                continue
+            if isinstance(v, str) and v.strip():
+                chosen = v.strip()
+                break
+        graphics = chosen
+
+    # Final photo fallback to first extracted image if none matched by name
+    if photo_path is None and images:
+        photo_path = images[0]
+        photo_via = "fallback"
+
+    out = {
+        "line_1": lines[0] if len(lines) > 0 else None,
+        "line_2": lines[1] if len(lines) > 1 else None,
+        "line_3": lines[2] if len(lines) > 2 else None,
+        "graphics_key": graphics,
+        # New explicit photo fields
+        "photo_path": photo_path,
+        "photo_filename": (photo_image_name or photo_buyer_name),
+        "photo_via": photo_via,
+        # Backward compatibility
+        "photo": {
+            "path": str(photo_path) if photo_path else None,
+            "imageName": photo_image_name,
+            "buyerFilename": photo_buyer_name,
+        },
+    }
+
+    return out
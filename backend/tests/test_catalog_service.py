@@ -0,0 +1,84 @@
+from pathlib import Path
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.settings import settings
+from app.utils import catalog_service
+
+client = TestClient(app)
+
+
+def _template(tid: str, max_len: int) -> dict:
+    return {
+        "id": tid,
+        "processor": {"name": "uv_regular", "version": "1.0.0"},
+        "w": 140,
+        "h": 90,
+        "options": {"fields": [{"id": "line_1", "type": "text", "maxLen": max_len}, {"id": "photo", "type": "image"}]},
+    }
+
+
+def _write_catalog(data: Path, *templates: dict) -> Path:
+    p = data / "catalog.json"
+    p.write_text(json.dumps({"templates": list(templates)}), encoding="utf-8")
+    return p
+
+
+@pytest.fixture
+def data(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(settings, "CATALOG_CHECK_S", 0)
+    (tmp_path / "machines").mkdir()
+    (tmp_path / "machines" / "M1.json").write_text(json.dumps({"id": "M1", "bed_w": 480}), encoding="utf-8")
+    _write_catalog(tmp_path, _template("T1", 20))
+    catalog_service.invalidate()
+    yield tmp_path
+    catalog_service.invalidate()
+
+
+def test_snapshot_indexes_and_reuse(data):
+    snap = catalog_service.get_catalog()
+    assert snap.maxlens == {"T1": {"line_1": 20}}
+    assert snap.template_info["T1"] == {"w": 140, "h": 90, "processor": "uv_regular", "requires_photo": False}
+    assert snap.machines == [{"id": "M1", "bed_w": 480}] and snap.materials == []
+    # Unchanged files: the same snapshot object is served
+    assert catalog_service.get_catalog() is snap
+
+
+def test_reload_on_mtime_change(data):
+    first = catalog_service.get_catalog()
+    p = _write_catalog(data, _template("T1", 12))
+    st = p.stat()
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    second = catalog_service.get_catalog()
+    assert second is not first
+    assert catalog_service.template_maxlens("T1") == {"line_1": 12}
+    assert second.etag != first.etag
+
+
+def test_check_interval_skips_stat(data, monkeypatch):
+    monkeypatch.setattr(settings, "CATALOG_CHECK_S", 3600)
+    snap = catalog_service.get_catalog()
+    _write_catalog(data, _template("T2", 5))
+    assert catalog_service.get_catalog() is snap
+
+
+def test_endpoint_serves_etag_and_304(data):
+    resp = client.get("/api/catalog")
+    assert resp.status_code == 200
+    etag = resp.headers["etag"]
+    assert [t["id"] for t in resp.json()["templates"]] == ["T1"]
+    again = client.get("/api/catalog", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["etag"] == etag
+
+
+def test_ingest_uses_cached_maxlens(data):
+    _write_catalog(data, _template("PLAQUE-140x90-V1", 3))
+    txt = "\t".join(["amazon-order-id", "sku", "line_1", "template_id"]) + "\n"
+    txt += "\t".join(["113-1", "X", "Too long", "PLAQUE-140x90-V1"]) + "\n"
+    codes = {w["code"] for w in client.post("/api/ingest/amazon", json={"text": txt}).json()["warnings"]}
+    assert "OVER_MAXLEN" in codes
@@ -0,0 +1,143 @@
+from pathlib import Path
+import json
+import time
+import zipfile
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.settings import settings
+from app.utils.circuit_breaker import HostBreaker, RetryBudget
+from app.utils.retry_queue import RetryQueue
+
+client = TestClient(app)
+
+HEADER = "\t".join(["amazon-order-id", "sku", "quantity", "customized-url"]) + "\n"
+
+
+def _report(n: int, host: str = "down.example") -> str:
+    return HEADER + "".join("\t".join([f"113-{i}", "OD045004-PLAQUE", "1", f"https://{host}/{i}.zip"]) + "\n" for i in range(n))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_trips_probes_and_recovers():
+    clock = Clock()
+    b = HostBreaker(threshold=3, cooldown_s=10, clock=clock)
+    for _ in range(2):
+        b.record_failure("h")
+    assert b.allow("h")
+    b.record_failure("h")
+    assert not b.allow("h") and b.snapshot()["h"]["state"] == "open"
+
+    clock.now += 10
+    assert b.allow("h")  # the single half-open probe
+    assert not b.allow("h")
+    b.record_failure("h")  # failed probe re-opens immediately
+    assert not b.allow("h") and b.retry_after("h") == 10
+
+    clock.now += 10
+    assert b.allow("h")
+    b.record_success("h")
+    assert b.allow("h") and b.allow("h") and b.snapshot() == {}
+
+
+def test_retry_budget_is_shared():
+    budget = RetryBudget(2)
+    assert [budget.take() for _ in range(3)] == [True, True, False]
+
+
+@pytest.fixture
+def isolated(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "DOWNLOAD_TMP_DIR", tmp_path / "dl")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "ALLOW_EXTERNAL_DOWNLOADS", True)
+    monkeypatch.setattr(settings, "DOWNLOAD_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "DOWNLOAD_RETRIES", 3)
+    import app.routers.ingest_amazon as ia
+    calls = []
+
+    def unreachable(url, dest_path, **kw):
+        calls.append(url)
+        raise requests.ConnectionError("connection refused")
+
+    monkeypatch.setattr(ia, "download_zip", unreachable)
+    return calls
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    q = RetryQueue(delay_s=3600)
+    monkeypatch.setattr(settings, "DOWNLOAD_RETRY_QUEUE_ENABLED", True)
+    import app.routers.ingest_amazon as ia
+    monkeypatch.setattr(ia, "get_queue", lambda: q)
+    yield q
+    q.shutdown()
+
+
+def test_tripped_host_fails_fast_and_queues_rows(isolated, queue, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_BREAKER_FAILURES", 3)
+    start = time.monotonic()
+    resp = client.post("/api/ingest/amazon", json={"text": _report(20)})
+    assert resp.status_code == 200, resp.text
+    # Row 0 uses its three attempts and trips the host; the rest never dial out
+    assert len(isolated) == 3
+    assert time.monotonic() - start < 5
+    failed = [w for w in resp.json()["warnings"] if w["code"] == "ZIP_DOWNLOAD_FAILED"]
+    assert len(failed) == 19
+    assert all("queued for background retry" in w["message"] for w in failed)
+    assert queue.stats()["pending"] == 20
+
+    status = client.get("/status").json()
+    assert status["download_hosts"]["down.example"]["state"] == "open"
+
+
+def test_retries_draw_on_shared_budget(isolated, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_BREAKER_FAILURES", 100)
+    monkeypatch.setattr(settings, "DOWNLOAD_RETRY_BUDGET", 2)
+    client.post("/api/ingest/amazon", json={"text": _report(5)})
+    # One attempt per row plus the two budgeted retries
+    assert len(isolated) == 5 + 2
+
+
+def test_background_retry_fills_ingest_cache(isolated, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_BREAKER_FAILURES", 1)
+    monkeypatch.setattr(settings, "DOWNLOAD_BREAKER_COOLDOWN_S", 0.05)
+    monkeypatch.setattr(settings, "DOWNLOAD_RETRY_QUEUE_ENABLED", True)
+    q = RetryQueue(delay_s=0.01)
+    import app.routers.ingest_amazon as ia
+    monkeypatch.setattr(ia, "get_queue", lambda: q)
+    try:
+        first = client.post("/api/ingest/amazon", json={"text": _report(1)}).json()
+        assert "ZIP_DOWNLOAD_FAILED" in {w["code"] for w in first["warnings"]}
+
+        # Upstream recovers; the queued row is fetched off the request path
+        recovered = []
+
+        def working(url, dest_path, **kw):
+            recovered.append(url)
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            with zipfile.ZipFile(dest_path, "w") as zf:
+                zf.writestr("c.json", json.dumps({"line_1": "Recovered"}))
+            return dest_path
+
+        monkeypatch.setattr(ia, "download_zip", working)
+        deadline = time.monotonic() + 5
+        while q.stats()["succeeded"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert q.stats() == {"pending": 0, "queued": 1, "succeeded": 1, "gave_up": 0, "rejected": 0}
+
+        again = client.post("/api/ingest/amazon", json={"text": _report(1)}).json()
+        assert again["cache"]["hits"] == 1 and len(recovered) == 1
+        assert again["items"][0]["lines"][0]["value"] == "Recovered"
+    finally:
+        q.shutdown()
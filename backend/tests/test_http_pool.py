@@ -0,0 +1,59 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import threading
+
+import pytest
+
+from app.settings import settings
+from app.utils import http_pool
+from app.utils.zip_ingest import download_zip
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = b"PK\x05\x06" + b"\x00" * 18  # empty ZIP
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    http_pool.close_session()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    http_pool.close_session()
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_sequential_downloads_reuse_one_connection(server, tmp_path: Path):
+    for i in range(5):
+        download_zip(f"{server}/{i}.zip", tmp_path / f"{i}.zip", timeout=5, user_agent="t")
+    stats = http_pool.pool_stats()
+    assert stats["active"]
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    (host,) = stats["hosts"].values()
+    assert host["idle"] == 1
+
+
+def test_session_is_process_wide_and_sized_for_concurrency(server, monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_POOL_MAXSIZE", 2)
+    monkeypatch.setattr(settings, "DOWNLOAD_CONCURRENCY", 6)
+    assert http_pool.get_session() is http_pool.get_session()
+    assert http_pool.pool_stats()["maxsize"] == 6
+
+
+def test_stats_before_first_use():
+    http_pool.close_session()
+    stats = http_pool.pool_stats()
+    assert stats["active"] is False and stats["hosts"] == {}
@@ -0,0 +1,92 @@
+from pathlib import Path
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.settings import settings
+
+client = TestClient(app)
+
+HEADER = "\t".join(["amazon-order-id", "order-item-id", "sku", "quantity", "customized-url"]) + "\n"
+
+
+def _report(*lines) -> bytes:
+    body = "".join("\t".join([o, oi, "OD045004-PLAQUE", "1", f"https://h/{oi}.zip"]) + "\n" for o, oi in lines)
+    return (HEADER + body).encode()
+
+
+@pytest.fixture
+def downloads(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "DOWNLOAD_TMP_DIR", tmp_path / "dl")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "ALLOW_EXTERNAL_DOWNLOADS", True)
+    calls = []
+
+    def fake_download(url: str, dest_path: Path, *, timeout: int, user_agent: str, retries: int = 3) -> Path:
+        calls.append(url)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(dest_path, "w") as zf:
+            zf.writestr("c.json", json.dumps({"line_1": url.rsplit("/", 1)[-1][:-4]}))
+        return dest_path
+
+    import app.routers.ingest_amazon as ia
+    monkeypatch.setattr(ia, "download_zip", fake_download)
+    return calls
+
+
+def _zip_of(**reports: bytes) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in reports.items():
+            zf.writestr(name, data)
+        zf.writestr("__MACOSX/._a.txt", b"junk")
+    return buf.getvalue()
+
+
+def test_batch_merges_and_dedups_with_provenance(downloads):
+    monday = _report(("113-1", "A1"), ("113-2", "A2"))
+    tuesday = _report(("113-2", "A2"), ("113-3", "A3"))
+    archive = _zip_of(**{"wed.txt": _report(("113-3", "A3"), ("113-4", "A4"))})
+    resp = client.post(
+        "/api/ingest/amazon/batch",
+        files=[
+            ("files", ("mon.txt", monday, "text/plain")),
+            ("files", ("tue.txt", tuesday, "text/plain")),
+            ("files", ("more.zip", archive, "application/zip")),
+            ("files", ("notes.pdf", b"%PDF", "application/pdf")),
+        ],
+    )
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+
+    assert [i["order_ref"] for i in body["items"]] == ["113-1", "113-2", "113-3", "113-4"]
+    assert [i["lines"][0]["value"] for i in body["items"]] == ["A1", "A2", "A3", "A4"]
+    # One download per distinct line, however many reports repeat it
+    assert sorted(downloads) == [f"https://h/A{n}.zip" for n in range(1, 5)]
+
+    assert body["provenance"][1] == [{"file": "mon.txt", "row": 1}, {"file": "tue.txt", "row": 0}]
+    assert body["provenance"][2] == [{"file": "tue.txt", "row": 1}, {"file": "more.zip/wed.txt", "row": 0}]
+    files = {f["name"]: f for f in body["files"]}
+    assert files["mon.txt"] == {"name": "mon.txt", "rows": 2, "duplicates": 0, "error": None}
+    assert files["tue.txt"]["duplicates"] == 1
+    assert files["more.zip/wed.txt"]["duplicates"] == 1
+    assert files["notes.pdf"]["error"] == "Invalid file type"
+
+
+def test_batch_reports_corrupt_zip_and_keeps_going(downloads):
+    resp = client.post(
+        "/api/ingest/amazon/batch",
+        files=[
+            ("files", ("broken.zip", b"not a zip", "application/zip")),
+            ("files", ("mon.txt", _report(("113-1", "A1")), "text/plain")),
+        ],
+    )
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert len(body["items"]) == 1
+    assert body["files"][0]["name"] == "broken.zip" and body["files"][0]["error"]
@@ -0,0 +1,129 @@
+from pathlib import Path
+import json
+import os
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.settings import settings
+from app.utils import ingest_cache
+
+client = TestClient(app)
+
+HEADER = "\t".join(["amazon-order-id", "sku", "quantity", "customized-url"]) + "\n"
+
+
+def _write_zip(dest: Path, name: str) -> None:
+    data = {
+        "customizationData": {
+            "children": [
+                {"type": "TextCustomization", "inputValue": name},
+                {"type": "ImageCustomization", "image": {"imageName": "p.jpg"}},
+            ]
+        }
+    }
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(dest, "w") as zf:
+        zf.writestr("c.json", json.dumps(data))
+        zf.writestr("p.jpg", b"\xff\xd8" + name.encode())
+
+
+@pytest.fixture
+def downloads(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "PHOTOS_DIR", tmp_path / "data" / "photos")
+    monkeypatch.setattr(settings, "DOWNLOAD_TMP_DIR", tmp_path / "dl")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "ALLOW_EXTERNAL_DOWNLOADS", True)
+    calls = []
+
+    def fake_download(url: str, dest_path: Path, *, timeout: int, user_agent: str, retries: int = 3) -> Path:
+        calls.append(url)
+        # Content depends on the last path segment, so two URLs can share a ZIP
+        _write_zip(dest_path, url.rsplit("/", 1)[-1].split("?")[0])
+        return dest_path
+
+    import app.routers.ingest_amazon as ia
+    monkeypatch.setattr(ia, "download_zip", fake_download)
+    return calls
+
+
+def _ingest(*urls):
+    txt = HEADER + "".join("\t".join([f"113-{i}", "OD045004-PLAQUE", "1", u]) + "\n" for i, u in enumerate(urls))
+    resp = client.post("/api/ingest/amazon", json={"text": txt})
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def test_reingest_skips_download_and_parse(downloads):
+    urls = ["https://h/Anna", "https://h/Ben"]
+    first = _ingest(*urls)
+    assert first["cache"] == {"hits": 0, "misses": 2}
+    second = _ingest(*urls)
+    assert second["cache"] == {"hits": 2, "misses": 0}
+    assert len(downloads) == 2
+    assert [i["lines"][0]["value"] for i in second["items"]] == ["Anna", "Ben"]
+    # The cached photo is still published for the new row
+    assert all(i["photo_asset_url"] for i in second["items"])
+
+
+def test_same_zip_behind_new_url_is_a_content_hit(downloads):
+    _ingest("https://h/Anna?sig=1")
+    again = _ingest("https://h/Anna?sig=2")
+    assert again["cache"] == {"hits": 1, "misses": 0}
+    assert len(downloads) == 2
+    # The new URL is now indexed too
+    assert ingest_cache.lookup_url("https://h/Anna?sig=2") is not None
+
+
+def test_hit_republishes_members_under_the_new_order(downloads):
+    import shutil
+
+    first = _ingest("https://h/Anna")["items"][0]
+    assert first["assets"] == ["storage/downloads/113-0/0/c.json", "storage/downloads/113-0/0/p.jpg"]
+    # The janitor clears downloads/ long before cache entries expire
+    shutil.rmtree(settings.DATA_DIR / "storage" / "downloads")
+
+    txt = HEADER + "\t".join(["114-9", "OD045004-PLAQUE", "1", "https://h/Anna"]) + "\n"
+    again = client.post("/api/ingest/amazon", json={"text": txt}).json()
+    assert again["cache"] == {"hits": 1, "misses": 0}
+    assets = again["items"][0]["assets"]
+    assert assets == ["storage/downloads/114-9/0/c.json", "storage/downloads/114-9/0/p.jpg"]
+    assert (settings.DATA_DIR / assets[1]).read_bytes() == b"\xff\xd8Anna"
+
+
+def test_expired_entries_are_misses(downloads, monkeypatch):
+    _ingest("https://h/Anna")
+    monkeypatch.setattr(settings, "INGEST_CACHE_TTL_S", 1)
+    monkeypatch.setattr(time, "time", lambda real=time.time: real() + 5)
+    assert _ingest("https://h/Anna")["cache"] == {"hits": 0, "misses": 1}
+
+
+def test_sweep_evicts_least_recently_used_over_size_cap(downloads, monkeypatch):
+    _ingest("https://h/Anna", "https://h/Ben")
+    entries = list((ingest_cache.cache_root() / "entries").glob("*/*"))
+    sizes = {e: sum(p.stat().st_size for p in e.rglob("*") if p.is_file()) for e in entries}
+    assert len(sizes) == 2
+    # Age both entries, then touch Anna so Ben is the least recently used
+    past = time.time() - 60
+    for e in entries:
+        os.utime(e / "result.json", (past, past))
+    assert ingest_cache.lookup_url("https://h/Anna") is not None
+    ben = min(entries, key=lambda e: (e / "result.json").stat().st_mtime)
+    # Room for either entry, but not both
+    monkeypatch.setattr(settings, "INGEST_CACHE_MAX_MB", max(sizes.values()) / (1024 * 1024))
+    stats = ingest_cache.sweep()
+    assert stats == {"removed": 1, "bytes_freed": sizes[ben]}
+    assert not ben.exists()
+    assert ingest_cache.lookup_url("https://h/Ben") is None
+    assert ingest_cache.lookup_url("https://h/Anna") is not None
+
+
+def test_disabled_cache_reports_nothing(downloads, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CACHE_ENABLED", False)
+    _ingest("https://h/Anna")
+    assert _ingest("https://h/Anna")["cache"] == {"hits": 0, "misses": 0}
+    assert len(downloads) == 2
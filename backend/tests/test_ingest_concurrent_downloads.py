@@ -0,0 +1,145 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import io
+import json
+import threading
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.settings import settings
+from app.utils.download_stage import DownloadStage
+
+client = TestClient(app)
+
+
+def _zip_bytes(n: int) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("personalization.json", json.dumps({"line_1": f"Name {n}", "graphic": "Rose"}))
+    return buf.getvalue()
+
+
+class _ZipServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _ZipHandler)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.hits = 0
+
+
+class _ZipHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.in_flight += 1
+            srv.hits += 1
+            srv.max_in_flight = max(srv.max_in_flight, srv.in_flight)
+        try:
+            time.sleep(0.15)
+            name = self.path.rsplit("/", 1)[-1]
+            if not name.endswith(".zip"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = _zip_bytes(int(name[:-4]))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/zip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with srv.lock:
+                srv.in_flight -= 1
+
+
+@pytest.fixture
+def zip_server():
+    srv = _ZipServer()
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def isolated(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "PHOTOS_DIR", tmp_path / "data" / "photos")
+    monkeypatch.setattr(settings, "DOWNLOAD_TMP_DIR", tmp_path / "dl")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "ALLOW_EXTERNAL_DOWNLOADS", True)
+    return tmp_path
+
+
+def _tsv(base: str, n: int) -> str:
+    head = "\t".join(["amazon-order-id", "sku", "quantity", "customized-url"]) + "\n"
+    rows = "".join("\t".join([f"113-0000000-{i:07d}", "OD045004-PLAQUE", "1", f"{base}/{i}.zip"]) + "\n" for i in range(n))
+    return head + rows
+
+
+def test_ingest_downloads_concurrently_and_keeps_row_order(isolated, zip_server, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_CONCURRENCY", 3)
+    monkeypatch.setattr(settings, "DOWNLOAD_PER_HOST_CONCURRENCY", 3)
+    base = f"http://127.0.0.1:{zip_server.server_address[1]}"
+
+    resp = client.post("/api/ingest/amazon", json={"text": _tsv(base, 8)})
+    assert resp.status_code == 200, resp.text
+    items = resp.json()["items"]
+    assert [i["lines"][0]["value"] for i in items] == [f"Name {n}" for n in range(8)]
+    assert zip_server.hits == 8
+    assert 1 < zip_server.max_in_flight <= 3
+
+
+def test_per_host_limit_caps_parallel_requests(isolated, zip_server, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_CONCURRENCY", 6)
+    monkeypatch.setattr(settings, "DOWNLOAD_PER_HOST_CONCURRENCY", 2)
+    base = f"http://127.0.0.1:{zip_server.server_address[1]}"
+
+    resp = client.post("/api/ingest/amazon", json={"text": _tsv(base, 6)})
+    assert resp.status_code == 200, resp.text
+    assert len(resp.json()["items"]) == 6
+    assert zip_server.max_in_flight == 2
+
+
+def test_http_error_maps_to_download_failed(isolated, zip_server, monkeypatch):
+    base = f"http://127.0.0.1:{zip_server.server_address[1]}"
+    txt = "\t".join(["amazon-order-id", "sku", "quantity", "customized-url"]) + "\n"
+    txt += "\t".join(["113-1", "OD045004-PLAQUE", "1", f"{base}/missing"]) + "\n"
+
+    import app.routers.ingest_amazon as ia
+    real = ia.download_zip
+    # No retry back-off in tests
+    monkeypatch.setattr(ia, "download_zip", lambda *a, **k: real(*a, **{**k, "retries": 1}))
+    resp = client.post("/api/ingest/amazon", json={"text": txt})
+    codes = {w["code"] for w in resp.json()["warnings"]}
+    assert "ZIP_DOWNLOAD_FAILED" in codes
+
+
+def test_stage_cancel_drops_queued_work():
+    started = []
+    gate = threading.Event()
+
+    def work(n):
+        started.append(n)
+        gate.wait(2)
+        return n
+
+    stage = DownloadStage(concurrency=1, per_host=1)
+    futs = [stage.submit("http://h/x", work, n) for n in range(3)]
+    time.sleep(0.05)
+    stage.close(cancel=True)
+    gate.set()
+    assert futs[0].result() == 0
+    assert all(f.cancelled() for f in futs[1:])
+    assert started == [0]
@@ -0,0 +1,203 @@
+from pathlib import Path
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import get_db
+from app.main import app
+from app.models import OrderLine
+from app.settings import settings
+
+client = TestClient(app)
+
+HEADER = "\t".join(["amazon-order-id", "sku", "quantity", "customized-url"]) + "\n"
+
+
+def _row(order_id: str, qty: int = 1) -> str:
+    return "\t".join([order_id, "OD045004-PLAQUE", str(qty), f"https://h/{order_id}.zip"]) + "\n"
+
+
+@pytest.fixture
+def env(tmp_path: Path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    Session = sessionmaker(bind=engine)
+
+    def _db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _db
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "DOWNLOAD_TMP_DIR", tmp_path / "dl")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "ALLOW_EXTERNAL_DOWNLOADS", True)
+    monkeypatch.setattr(settings, "INGEST_CACHE_ENABLED", False)
+    calls = []
+
+    def fake_download(url: str, dest_path: Path, *, timeout: int, user_agent: str, retries: int = 3) -> Path:
+        calls.append(url)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(dest_path, "w") as zf:
+            zf.writestr("c.json", json.dumps({"line_1": url.rsplit("/", 1)[-1][:-4]}))
+        return dest_path
+
+    import app.routers.ingest_amazon as ia
+    monkeypatch.setattr(ia, "download_zip", fake_download)
+    yield calls, Session
+    app.dependency_overrides.pop(get_db, None)
+
+
+def _ingest(txt: str, mode: str | None = None):
+    url = "/api/ingest/amazon" + (f"?mode={mode}" if mode else "")
+    resp = client.post(url, json={"text": txt})
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def test_incremental_reingest_processes_only_new_rows(env):
+    calls, Session = env
+    first = _ingest(HEADER + _row("A") + _row("B"))
+    assert first["skipped"] == 0 and len(calls) == 2
+
+    again = _ingest(HEADER + _row("A") + _row("B") + _row("C"), mode="incremental")
+    assert again["skipped"] == 2
+    assert calls[2:] == ["https://h/C.zip"]
+    # Stored items come back in row order alongside the new one
+    assert [i["lines"][0]["value"] for i in again["items"]] == ["A", "B", "C"]
+    assert [i["order_ref"] for i in again["items"]] == ["A", "B", "C"]
+    with Session() as db:
+        assert db.query(OrderLine).count() == 3
+
+
+def test_changed_row_is_reingested(env):
+    calls, _ = env
+    _ingest(HEADER + _row("A"))
+    out = _ingest(HEADER + _row("A", qty=2), mode="incremental")
+    assert out["skipped"] == 0 and len(calls) == 2
+    assert out["items"][0]["quantity"] == 2
+
+
+def test_full_mode_ignores_index(env):
+    calls, _ = env
+    _ingest(HEADER + _row("A"))
+    out = _ingest(HEADER + _row("A"))
+    assert out["skipped"] == 0 and len(calls) == 2
+
+
+def test_failed_rows_are_retried(env, monkeypatch):
+    calls, Session = env
+    import app.routers.ingest_amazon as ia
+    from app.utils.zip_ingest import ZipHttpError
+
+    def broken(url, dest_path, **kw):
+        raise ZipHttpError(503, url)
+
+    working = ia.download_zip
+    monkeypatch.setattr(ia, "download_zip", broken)
+    first = _ingest(HEADER + _row("A"))
+    assert "ZIP_DOWNLOAD_FAILED" in {w["code"] for w in first["warnings"]}
+    with Session() as db:
+        assert db.query(OrderLine).one().status == "failed"
+
+    monkeypatch.setattr(ia, "download_zip", working)
+    out = _ingest(HEADER + _row("A"), mode="incremental")
+    assert out["skipped"] == 0 and calls == ["https://h/A.zip"]
+    with Session() as db:
+        assert db.query(OrderLine).one().status == "ingested"
+
+
+def test_rejects_unknown_mode(env):
+    resp = client.post("/api/ingest/amazon?mode=bogus", json={"text": HEADER + _row("A")})
+    assert resp.status_code == 422
+
+
+def test_index_write_failure_does_not_abort_ingest(env, monkeypatch):
+    calls, _ = env
+    from app.utils import order_index
+
+    def locked(*args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(order_index, "record", locked)
+    out = _ingest(HEADER + _row("A") + _row("B"))
+    assert [i["order_ref"] for i in out["items"]] == ["A", "B"]
+
+    resp = client.post("/api/ingest/amazon", json={"text": HEADER + _row("C")}, headers={"Accept": "application/x-ndjson"})
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["type"] for r in records] == ["item", "summary"]
+
+
+def _photo_download(calls):
+    def download(url: str, dest_path: Path, *, timeout: int, user_agent: str, retries: int = 3) -> Path:
+        calls.append(url)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        name = url.rsplit("/", 1)[-1][:-4]
+        data = {"customizationData": {"children": [
+            {"type": "TextCustomization", "inputValue": name},
+            {"type": "ImageCustomization", "image": {"imageName": "p.jpg"}},
+        ]}}
+        with zipfile.ZipFile(dest_path, "w") as zf:
+            zf.writestr("c.json", json.dumps(data))
+            zf.writestr("p.jpg", b"\xff\xd8" + name.encode())
+        return dest_path
+    return download
+
+
+def test_replay_rebuilds_urls_instead_of_trusting_stored_ones(env, monkeypatch, tmp_path: Path):
+    import shutil
+    import app.routers.ingest_amazon as ia
+
+    calls, _ = env
+    monkeypatch.setattr(settings, "PHOTOS_DIR", tmp_path / "photos")
+    monkeypatch.setattr(ia, "download_zip", _photo_download(calls))
+    first = _ingest(HEADER + _row("A"))["items"][0]
+    photo_url = first["photo_asset_url"]
+    assert photo_url.startswith("/static/photos/") and first["assets"]
+
+    # The janitor has cleared downloads/: replayed assets are dropped, the photo still resolves
+    shutil.rmtree(settings.DATA_DIR / "storage" / "downloads")
+    again = _ingest(HEADER + _row("A"), mode="incremental")
+    assert again["skipped"] == 1 and len(calls) == 1
+    assert again["items"][0]["assets"] == []
+    assert again["items"][0]["photo_asset_url"] == photo_url
+
+    # Once the photo blob is reclaimed too, the row is ingested again
+    for p in settings.PHOTOS_DIR.iterdir():
+        p.unlink()
+    out = _ingest(HEADER + _row("A"), mode="incremental")
+    assert out["skipped"] == 0 and len(calls) == 2
+    assert out["items"][0]["photo_asset_url"] == photo_url
+    assert (settings.PHOTOS_DIR / photo_url.rsplit("/", 1)[-1]).is_file()
+
+
+def test_replay_presigns_photo_url_again_on_s3(monkeypatch):
+    import app.routers.ingest_amazon as ia
+    from app.models import PhotoRef
+
+    class Signer:
+        def __init__(self):
+            self.n = 0
+
+        def presign_get(self, key, expires_s):
+            self.n += 1
+            return f"https://s3/{key}?sig={self.n}"
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "s3")
+    stored = {"order_ref": "A", "template_id": "T", "photo_asset_id": "https://s3/photos/x.jpg?sig=old",
+              "photo_asset_url": "https://s3/photos/x.jpg?sig=old", "assets": ["downloads/A/0/c.json"]}
+    line = OrderLine(order_id="A", sku="S", fingerprint="f", status="ingested", item_json=json.dumps(stored), warnings_json="[]")
+    ref = PhotoRef(order_id="A", sku="S", fingerprint="f", sha256="x" * 64, blob_name="x.jpg")
+
+    item, _ = ia._replay_row(line, ref, Signer())
+    assert item.photo_asset_url == item.photo_asset_id == "https://s3/photos/x.jpg?sig=1"
+    assert item.assets == ["downloads/A/0/c.json"]
+    assert ref.updated_at is not None
+    # No reference to serve the photo from: ingest the row again
+    assert ia._replay_row(line, None, Signer()) is None
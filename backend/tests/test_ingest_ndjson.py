@@ -0,0 +1,76 @@
+from pathlib import Path
+import asyncio
+import json
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import IngestItem
+from app.routers.ingest_amazon import _ndjson_stream
+from app.settings import settings
+
+client = TestClient(app)
+
+HEADER = "\t".join(["amazon-order-id", "sku", "quantity", "customized-url"]) + "\n"
+
+
+def test_ndjson_emits_item_records_then_summary(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "DOWNLOAD_TMP_DIR", tmp_path / "dl")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "ALLOW_EXTERNAL_DOWNLOADS", True)
+
+    def fake_download(url: str, dest_path: Path, *, timeout: int, user_agent: str, retries: int = 3) -> Path:
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(dest_path, "w") as zf:
+            zf.writestr("c.json", json.dumps({"line_1": url.rsplit("/", 1)[-1]}))
+        return dest_path
+
+    import app.routers.ingest_amazon as ia
+    monkeypatch.setattr(ia, "download_zip", fake_download)
+
+    txt = HEADER + "".join("\t".join([f"113-{i}", "OD045004-PLAQUE", "1", f"https://h/n{i}"]) + "\n" for i in range(3))
+    txt += "\t".join(["113-9", "OD045004-PLAQUE", "1", ""]) + "\n"
+    resp = client.post("/api/ingest/amazon", json={"text": txt}, headers={"Accept": "application/x-ndjson"})
+    assert resp.status_code == 200, resp.text
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    items, summary = records[:-1], records[-1]
+    assert [r["type"] for r in items] == ["item"] * 4
+    assert [r["row"] for r in items] == [0, 1, 2, 3]
+    assert [r["item"]["lines"][0]["value"] for r in items[:3]] == ["n0", "n1", "n2"]
+    # Each row carries its own warnings only
+    assert "MISSING_CUSTOMIZED_URL" in {w["code"] for w in items[3]["warnings"]}
+    assert not any(w["code"] == "MISSING_CUSTOMIZED_URL" for r in items[:3] for w in r["warnings"])
+    assert summary["type"] == "summary" and summary["items"] == 4
+    assert summary["warnings"] == sum(len(r["warnings"]) for r in items)
+    assert summary["cache"] == {"hits": 0, "misses": 3}
+
+
+def test_plain_json_response_is_unchanged():
+    txt = HEADER + "\t".join(["113-1", "ABC", "1", ""]) + "\n"
+    data = client.post("/api/ingest/amazon", json={"text": txt}).json()
+    assert set(data) >= {"items", "warnings", "cache", "skipped"}
+
+
+def test_stream_yields_each_row_before_later_rows_finish():
+    release = asyncio.Event()
+    seen = []
+
+    async def rows():
+        yield 0, IngestItem(order_ref="a"), []
+        await release.wait()
+        yield 1, IngestItem(order_ref="b"), []
+
+    async def consume():
+        gen = _ndjson_stream(rows(), {"hits": 0, "misses": 0}, 0)
+        seen.append(json.loads(await gen.__anext__()))
+        # Row 1 is still pending, yet row 0 has already been emitted
+        release.set()
+        seen.extend([json.loads(chunk) async for chunk in gen])
+
+    asyncio.run(consume())
+    assert [r["type"] for r in seen] == ["item", "item", "summary"]
+    assert seen[0]["item"]["order_ref"] == "a"
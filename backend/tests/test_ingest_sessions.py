@@ -0,0 +1,82 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import IngestItem, LineField
+from app.utils.ingest_sessions import IngestSessionStore, get_store, to_order_item
+
+client = TestClient(app)
+
+ROWS = [
+    {"order_id": "113-1", "template_id": "PLAQUE-140x90-V1", "line_1": "In loving memory", "line_2": "John", "line_3": "1950-2024"},
+    {"order_id": "113-2", "template_id": "PLAQUE-140x90-V1", "line_1": "In loving memory", "line_2": "Jane", "line_3": "1951-2024"},
+    {"order_id": "113-3", "template_id": "PLAQUE-140x90-V1", "line_1": "In loving memory", "line_2": "Alex", "line_3": "2001-2020"},
+]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _item(ref: str) -> IngestItem:
+    return IngestItem(order_ref=ref)
+
+
+def test_generate_by_ingest_id_with_selection():
+    ing = client.post("/api/ingest/amazon", json={"rows": ROWS})
+    assert ing.status_code == 200, ing.text
+    ingest_id = ing.json()["ingest_id"]
+    assert ingest_id
+
+    resp = client.post("/api/jobs/generate", json={"ingest_id": ingest_id, "selection": [0, 2], "machine_id": "MUTOH-UJF-461", "seed": 42})
+    assert resp.status_code == 200, resp.text
+    item_svgs = [a for a in resp.json()["artifacts"] if a.rsplit("/", 1)[-1].startswith("i")]
+    assert len(item_svgs) == 2
+    batch = client.get(next(a for a in resp.json()["artifacts"] if a.endswith("batch.csv"))).text
+    assert "113-1" in batch and "113-3" in batch and "113-2" not in batch
+
+
+def test_generate_by_ingest_id_matches_posting_items():
+    ingest_id = client.post("/api/ingest/amazon", json={"rows": ROWS}).json()["ingest_id"]
+    inline = [to_order_item(i).model_dump() for i in get_store().get(ingest_id)]
+    by_id = client.post("/api/jobs/generate", json={"ingest_id": ingest_id, "machine_id": "MUTOH-UJF-461", "seed": 7}).json()
+    posted = client.post("/api/jobs/generate", json={"items": inline, "machine_id": "MUTOH-UJF-461", "seed": 7}).json()
+    bed = lambda d: client.get(next(a for a in d["artifacts"] if a.endswith("bed_1.svg"))).content
+    assert bed(by_id) == bed(posted)
+
+
+def test_generate_rejects_unknown_id_and_bad_selection():
+    resp = client.post("/api/jobs/generate", json={"ingest_id": "nope", "machine_id": "MUTOH-UJF-461"})
+    assert resp.status_code == 404
+    ingest_id = client.post("/api/ingest/amazon", json={"rows": ROWS}).json()["ingest_id"]
+    resp = client.post("/api/jobs/generate", json={"ingest_id": ingest_id, "selection": [3], "machine_id": "MUTOH-UJF-461"})
+    assert resp.status_code == 400
+
+
+def test_to_order_item_matches_frontend_mapping():
+    item = IngestItem(order_ref="113-9", lines=[LineField(id="line_2", value="Bob")], decoration_type="Photo", photo_asset_url="/static/photos/x.jpg")
+    oi = to_order_item(item)
+    assert oi.template_id == "PLAQUE-140x90-V1" and oi.channel == "amazon"
+    assert [(l.id, l.value) for l in oi.lines] == [("line_1", ""), ("line_2", "Bob"), ("line_3", "")]
+    assert oi.requires_photo and oi.photo_url == "/static/photos/x.jpg"
+    assert oi.item_id == "" and oi.graphics_key == ""
+
+
+def test_sessions_expire_when_idle_and_evict_least_recently_used():
+    clock = Clock()
+    store = IngestSessionStore(ttl_s=10, max_sessions=2, clock=clock)
+    a = store.put([_item("a")])
+    b = store.put([_item("b")])
+    clock.now = 5
+    assert store.get(a)  # a is now the most recently used
+    store.put([_item("c")])
+    assert store.get(b) is None and store.get(a)
+
+    clock.now = 14
+    assert store.order_items(a) is not None  # use slides the expiry
+    clock.now = 25
+    assert store.get(a) is None
+    assert store.stats() == {"sessions": 0, "created": 3, "expired": 2, "evicted": 1}
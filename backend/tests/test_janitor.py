@@ -0,0 +1,142 @@
+from pathlib import Path
+import os
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.janitor import Area, Janitor
+
+client = TestClient(app)
+
+NOW = 1_000_000.0
+MB = 1024 * 1024
+
+
+def _entry(root: Path, name: str, size: int, age_s: float) -> Path:
+    # A job-style folder whose newest file was used age_s ago
+    d = root / name
+    (d / "sub").mkdir(parents=True)
+    f = d / "sub" / "bed_1.svg"
+    f.write_bytes(b"x" * size)
+    for p in (f, d / "sub", d):
+        os.utime(p, (NOW - age_s, NOW - age_s))
+    return d
+
+
+def test_ttl_then_lru_quota(tmp_path: Path):
+    root = tmp_path / "jobs"
+    _entry(root, "expired", MB, 10_000)
+    _entry(root, "old", MB, 3_000)
+    _entry(root, "mid", MB, 2_000)
+    _entry(root, "fresh", MB, 100)  # within the grace period
+    janitor = Janitor(areas_fn=lambda: [Area("jobs", root, ttl_s=5_000, max_bytes=int(1.5 * MB))], grace_s=600, clock=lambda: NOW)
+
+    result = janitor.run_once()["jobs"]
+    # TTL takes "expired"; the quota then evicts least recently used first
+    # but never touches an entry inside the grace period
+    assert sorted(p.name for p in root.iterdir()) == ["fresh"]
+    assert result == {"entries": 1, "bytes": MB, "removed": 3, "freed_bytes": 3 * MB}
+    assert janitor.stats()["freed_bytes"] == 3 * MB and janitor.stats()["runs"] == 1
+
+
+def test_access_time_counts_as_use(tmp_path: Path):
+    root = tmp_path / "previews"
+    _entry(root, "a", 10, 10_000)
+    d = _entry(root, "b", 10, 10_000)
+    f = d / "sub" / "bed_1.svg"
+    os.utime(f, (NOW - 50, NOW - 10_000))  # read recently, written long ago
+    janitor = Janitor(areas_fn=lambda: [Area("previews", root, ttl_s=1_000, max_bytes=0)], grace_s=0, clock=lambda: NOW)
+    janitor.run_once()
+    assert [p.name for p in root.iterdir()] == ["b"]
+
+
+def test_missing_area_and_status(tmp_path: Path):
+    janitor = Janitor(areas_fn=lambda: [Area("downloads", tmp_path / "absent", ttl_s=1, max_bytes=1)], clock=lambda: NOW)
+    assert janitor.run_once() == {"downloads": {"entries": 0, "bytes": 0, "removed": 0, "freed_bytes": 0}}
+    assert "janitor" in client.get("/status").json()
+
+
+def test_referenced_entries_are_kept(tmp_path: Path):
+    root = tmp_path / "photos"
+    _entry(root, "aaa.jpg", MB, 10_000)
+    _entry(root, "bbb.jpg", MB, 9_000)
+    _entry(root, "ccc.jpg", MB, 8_000)
+    area = Area("photos", root, ttl_s=5_000, max_bytes=0, keep=lambda: {"aaa.jpg"})
+    Janitor(areas_fn=lambda: [area], grace_s=0, clock=lambda: NOW).run_once()
+    assert [p.name for p in root.iterdir()] == ["aaa.jpg"]
+
+    # The quota skips referenced entries too, and a failing lookup removes nothing
+    _entry(root, "ddd.jpg", MB, 100)
+    quota = Area("photos", root, ttl_s=0, max_bytes=MB, keep=lambda: {"aaa.jpg"})
+    Janitor(areas_fn=lambda: [quota], grace_s=0, clock=lambda: NOW).run_once()
+    assert [p.name for p in root.iterdir()] == ["aaa.jpg"]
+
+    def db_down():
+        raise RuntimeError("database is locked")
+    _entry(root, "eee.jpg", MB, 10_000)
+    broken = Area("photos", root, ttl_s=1, max_bytes=0, keep=db_down)
+    assert Janitor(areas_fn=lambda: [broken], grace_s=0, clock=lambda: NOW).run_once() == {}
+    assert sorted(p.name for p in root.iterdir()) == ["aaa.jpg", "eee.jpg"]
+
+
+def test_photo_refs_protect_their_blobs(tmp_path: Path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import app.database as database
+    from app.models import PhotoRef
+    from app.utils import janitor as janitor_mod
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'refs.db'}")
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", Session)
+    PhotoRef.__table__.create(bind=engine)
+    with Session() as db:
+        db.add(PhotoRef(order_id="113-1", sku="S", fingerprint="f", sha256="a" * 64, blob_name="a.jpg"))
+        db.commit()
+    assert janitor_mod._referenced_photos() == {"a.jpg"}
+
+
+def test_stale_photo_refs_stop_protecting_their_blobs(tmp_path: Path, monkeypatch):
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import app.database as database
+    from app.models import PhotoRef
+    from app.settings import settings
+    from app.utils import janitor as janitor_mod
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'refs.db'}")
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", Session)
+    PhotoRef.__table__.create(bind=engine)
+    long_ago = datetime.utcnow() - timedelta(days=90)
+    with Session() as db:
+        db.add(PhotoRef(order_id="113-1", sku="S", fingerprint="f", sha256="a" * 64, blob_name="a.jpg"))
+        db.add(PhotoRef(order_id="113-2", sku="S", fingerprint="f", sha256="b" * 64, blob_name="b.jpg",
+                        created_at=long_ago, updated_at=long_ago))
+        db.commit()
+
+    root = tmp_path / "photos"
+    monkeypatch.setattr(settings, "PHOTOS_DIR", root)
+    monkeypatch.setattr(settings, "JANITOR_PHOTOS_TTL_S", 30 * 24 * 3600)
+    monkeypatch.setattr(settings, "JANITOR_PHOTOS_MAX_MB", 1)
+    root.mkdir()
+    now = time.time()
+    for name in ("a.jpg", "b.jpg"):
+        (root / name).write_bytes(b"x" * MB)
+        os.utime(root / name, (now - 60 * 24 * 3600, now - 60 * 24 * 3600))
+
+    assert janitor_mod._referenced_photos() == {"a.jpg"}
+    photos = [a for a in janitor_mod.areas() if a.name == "photos"]
+    result = Janitor(areas_fn=lambda: photos, grace_s=0).run_once()["photos"]
+    # The blob only a stale reference points at is reclaimed; the live one stays
+    assert [p.name for p in root.iterdir()] == ["a.jpg"]
+    assert result["removed"] == 1
+
+    # Once its reference goes stale too, the blob ages out like any other
+    with Session() as db:
+        db.query(PhotoRef).update({PhotoRef.updated_at: long_ago})
+        db.commit()
+    Janitor(areas_fn=lambda: photos, grace_s=0).run_once()
+    assert list(root.iterdir()) == []
@@ -0,0 +1,83 @@
+from pathlib import Path
+from uuid import uuid4
+import os
+import shutil
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.settings import settings
+from app.utils import job_paths
+from app.utils.janitor import Area, Janitor
+from app.utils.storage import LocalStorage
+
+client = TestClient(app)
+
+
+def test_layout_and_storage_keys(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "JOBS_DIR", tmp_path / "jobs")
+    s = job_paths.shard("abcd1234")
+    assert len(s) == 5 and s[2] == "/" and s == job_paths.shard("abcd1234")
+    assert job_paths.job_dir("abcd1234") == tmp_path / "jobs" / s / "abcd1234"
+    # Pipeline sub-jobs shard with their parent
+    assert job_paths.job_dir("abcd1234/k-001") == tmp_path / "jobs" / s / "abcd1234" / "k-001"
+    assert job_paths.job_url("abcd1234", "bed_1.svg") == "/static/jobs/abcd1234/bed_1.svg"
+
+    storage = LocalStorage(tmp_path)
+    storage.put_bytes("jobs/abcd1234/bed_1.svg", b"<svg/>", content_type="image/svg+xml")
+    assert (tmp_path / "jobs" / s / "abcd1234" / "bed_1.svg").read_bytes() == b"<svg/>"
+    storage.put_bytes("photos/p.jpg", b"x", content_type="image/jpeg")
+    assert (tmp_path / "photos" / "p.jpg").exists()
+
+    monkeypatch.setattr(settings, "JOB_DIR_SHARDING", False)
+    assert job_paths.job_dir("abcd1234") == tmp_path / "jobs" / "abcd1234"
+
+
+def test_migrate_moves_flat_dirs_once(tmp_path: Path):
+    root = tmp_path / "jobs"
+    for job_id in ("aaaa0001", "aaaa0002"):
+        (root / job_id).mkdir(parents=True)
+        (root / job_id / "batch.csv").write_text(job_id)
+    (root / "stray.txt").write_text("x")
+    # Unmigrated jobs are still found
+    assert job_paths.local_path(tmp_path, "jobs/aaaa0001/batch.csv").read_text() == "aaaa0001"
+
+    assert job_paths.migrate(root) == (2, 0)
+    assert job_paths.migrate(root) == (0, 0)
+    assert (root / job_paths.sharded("aaaa0002/batch.csv")).read_text() == "aaaa0002"
+    assert sorted(p.name for p in job_paths.iter_entries(root)) == ["aaaa0001", "aaaa0002", "stray.txt"]
+
+
+def test_static_urls_serve_both_layouts():
+    new_id, old_id = uuid4().hex[:8], uuid4().hex[:8]
+    new_dir = job_paths.job_dir(new_id)
+    old_dir = settings.JOBS_DIR / old_id
+    try:
+        new_dir.mkdir(parents=True)
+        old_dir.mkdir(parents=True)
+        (new_dir / "batch.csv").write_text("new")
+        (old_dir / "batch.csv").write_text("old")
+        assert client.get(job_paths.job_url(new_id, "batch.csv")).text == "new"
+        assert client.get(job_paths.job_url(old_id, "batch.csv")).text == "old"
+        assert client.get(job_paths.job_url(new_id, "missing.csv")).status_code == 404
+        assert client.get("/static/jobs/../settings.py").status_code == 404
+    finally:
+        shutil.rmtree(new_dir, ignore_errors=True)
+        job_paths.prune(new_dir, settings.JOBS_DIR)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def test_janitor_sweeps_job_dirs_and_prunes_shards(tmp_path: Path):
+    root = tmp_path / "jobs"
+    now = 1_000_000.0
+    for job_id in ("old00001", "new00001"):
+        d = root / job_paths.sharded(job_id)
+        d.mkdir(parents=True)
+        (d / "bed_1.svg").write_bytes(b"x" * 10)
+        age = 10_000 if job_id.startswith("old") else 10
+        for p in (d / "bed_1.svg", d):
+            os.utime(p, (now - age, now - age))
+    janitor = Janitor(areas_fn=lambda: [Area("jobs", root, ttl_s=1_000, max_bytes=0, sharded=True)], grace_s=0, clock=lambda: now)
+    assert janitor.run_once()["jobs"]["removed"] == 1
+    assert [p.name for p in job_paths.iter_entries(root)] == ["new00001"]
+    assert not (root / job_paths.shard("old00001")).exists()
@@ -0,0 +1,51 @@
+from app.models import IngestItem
+from app.packer.grouping import count_changeovers, group_by_material, material_key, plan_beds
+
+
+def _items(colours):
+    return [IngestItem(order_ref=f"o{i}", colour=c) for i, c in enumerate(colours)]
+
+
+def test_material_key_normalises_and_defaults():
+    a, b, c = _items(["Gold", " gold ", None])
+    assert material_key(a) == material_key(b) == "gold"
+    assert material_key(c) == "unspecified"
+
+
+def test_group_by_material_orders_by_priority_and_keeps_input_order():
+    items = _items(["Silver", "Gold", "Slate", "Silver", "Copper", "Gold"])
+    groups = group_by_material(items)
+    assert [k for k, _ in groups] == ["copper", "gold", "silver", "slate"]
+    assert [it.order_ref for it in dict(groups)["silver"]] == ["o0", "o3"]
+
+
+def test_count_changeovers():
+    assert count_changeovers([]) == 0
+    assert count_changeovers([["gold"], ["gold"], ["silver"]]) == 1
+    # Mixed bed needs two loads; the next bed starts with the material already loaded
+    assert count_changeovers([["gold", "silver"], ["silver"]]) == 1
+    assert count_changeovers([["gold", "silver"], ["gold", "silver"]]) == 2
+
+
+def test_plan_beds_grouped_trades_beds_for_changeovers():
+    colours = ["Gold", "Silver", "Copper"] * 6  # 18 items, interleaved
+    items = _items(colours)
+    grouped = plan_beds(items, 9, grouped=True)
+    assert [m for m, _ in grouped.beds] == ["copper", "gold", "silver"]
+    assert grouped.changeovers == 2
+    assert grouped.ungrouped_beds == 2
+    assert grouped.ungrouped_changeovers > grouped.changeovers
+    assert sum(len(b) for _, b in grouped.beds) == 18
+    assert all(len({material_key(it) for it in b}) == 1 for _, b in grouped.beds)
+
+    summary = grouped.summary()
+    assert summary["beds"] == 3
+    assert summary["groups"] == {"copper": 6, "gold": 6, "silver": 6}
+
+
+def test_plan_beds_ungrouped_is_input_order_chunks():
+    items = _items(["Gold", "Silver", "Gold"])
+    plan = plan_beds(items, 2, grouped=False)
+    assert [[it.order_ref for it in b] for _, b in plan.beds] == [["o0", "o1"], ["o2"]]
+    assert plan.beds[0][0] == "mixed"
+    assert plan.changeovers == plan.ungrouped_changeovers
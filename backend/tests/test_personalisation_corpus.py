@@ -0,0 +1,58 @@
+from pathlib import Path
+import json
+
+import pytest
+
+from app.utils import zip_ingest
+from app.utils.zip_ingest import parse_personalisation
+
+import personalisation_reference
+
+CORPUS = Path(__file__).parent / "fixtures" / "customisation"
+CASES = sorted(p.name for p in CORPUS.iterdir() if p.is_dir())
+
+
+def _files(case: str):
+    return sorted((CORPUS / case).iterdir())
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_matches_reference_implementation(case: str):
+    files = _files(case)
+    assert parse_personalisation(files) == personalisation_reference.parse_personalisation(files)
+
+
+def test_corpus_spot_checks():
+    out = parse_personalisation(_files("plaque_text_and_graphic"))
+    assert (out["line_1"], out["line_3"], out["graphics_key"]) == ("In Loving Memory", "1941 - 2023", "Rose Vine")
+
+    out = parse_personalisation(_files("photo_by_buyer_filename"))
+    assert out["photo_path"].name == "IMG_7781.jpeg"
+    assert (out["photo_filename"], out["photo_via"]) == ("IMG_7781.jpeg", "buyerFilename")
+    # The unmatched image node no longer stops the walk before the text
+    assert out["line_1"] == "Forever Loved"
+
+    out = parse_personalisation(_files("xml_nested_order"))
+    assert (out["line_1"], out["line_2"], out["line_3"]) == ("Outer", "Inner A", "Inner B")
+    assert out["graphics_key"] == "First"
+
+
+def test_deep_payload_needs_no_recursion(tmp_path: Path):
+    # Within json.load's nesting limit, but too deep for the old recursive walk
+    depth = 450
+    leaf = json.dumps({"type": "TextCustomization", "inputValue": "Bottom"})
+    body = '{"type": "Container", "children": [' * depth + leaf + "]}" * depth
+    p = tmp_path / "c.json"
+    p.write_text('{"customizationData": ' + body + "}", encoding="utf-8")
+    assert parse_personalisation([p])["line_1"] == "Bottom"
+
+
+def test_payload_dicts_are_not_copied(tmp_path: Path, monkeypatch):
+    p = tmp_path / "c.json"
+    p.write_text(json.dumps({"customizationData": {"children": [{"type": "TextCustomization", "inputValue": "A"}]}}))
+    loaded = []
+    real_load = zip_ingest.json.load
+    monkeypatch.setattr(zip_ingest.json, "load", lambda fh: loaded.append(real_load(fh)) or loaded[-1])
+    parse_personalisation([p])
+    # The payload is read in place, keys keep their original spelling
+    assert loaded == [{"customizationData": {"children": [{"type": "TextCustomization", "inputValue": "A"}]}}]
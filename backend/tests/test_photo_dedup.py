@@ -0,0 +1,133 @@
+from pathlib import Path
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import get_db
+from app.main import app
+from app.models import PhotoRef
+from app.settings import settings
+from app.utils import photo_store
+from app.utils.storage import Storage
+
+client = TestClient(app)
+
+HEADER = "\t".join(["amazon-order-id", "sku", "quantity", "customized-url"]) + "\n"
+PHOTO = b"\xff\xd8\xff\xe0 same customer photo \xff\xd9"
+
+
+def _report(*order_ids: str) -> str:
+    return HEADER + "".join("\t".join([o, "OD045004-PHOTO", "1", f"https://h/{o}.zip"]) + "\n" for o in order_ids)
+
+
+class FakeS3(Storage):
+    def __init__(self):
+        self.objects = {}
+        self.puts = []
+        self.heads = []
+
+    def exists(self, key):
+        self.heads.append(key)
+        return key in self.objects
+
+    def put_bytes(self, key, data, content_type):
+        self.puts.append(key)
+        self.objects[key] = data
+
+    def presign_get(self, key, expires_s):
+        return f"https://s3.test/{key}?sig=x"
+
+
+@pytest.fixture
+def env(tmp_path: Path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    Session = sessionmaker(bind=engine)
+
+    def _db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _db
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "PHOTOS_DIR", tmp_path / "data" / "photos")
+    monkeypatch.setattr(settings, "DOWNLOAD_TMP_DIR", tmp_path / "dl")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "ALLOW_EXTERNAL_DOWNLOADS", True)
+    monkeypatch.setattr(photo_store, "_uploaded", set())
+
+    def fake_download(url: str, dest_path: Path, *, timeout: int, user_agent: str, retries: int = 3) -> Path:
+        # Every order carries the same photo bytes, under a per-order name
+        order_id = url.rsplit("/", 1)[-1][:-4]
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(dest_path, "w") as zf:
+            zf.writestr("c.json", json.dumps({"customizationData": {"children": [
+                {"type": "ImageCustomization", "image": {"imageName": f"{order_id}.jpg"}},
+            ]}}))
+            zf.writestr(f"{order_id}.jpg", PHOTO)
+        return dest_path
+
+    import app.routers.ingest_amazon as ia
+    monkeypatch.setattr(ia, "download_zip", fake_download)
+    copies = []
+    real_copy = photo_store._copy_into
+    monkeypatch.setattr(photo_store, "_copy_into", lambda src, dest: copies.append(dest) or real_copy(src, dest))
+    yield copies, Session
+    app.dependency_overrides.pop(get_db, None)
+
+
+def _ingest(txt: str):
+    resp = client.post("/api/ingest/amazon", json={"text": txt})
+    assert resp.status_code == 200, resp.text
+    return resp.json()["items"]
+
+
+def test_same_bytes_stored_once_locally(env):
+    copies, Session = env
+    items = _ingest(_report("113-1", "113-2"))
+    urls = {i["photo_asset_url"] for i in items}
+    assert len(urls) == 1 and next(iter(urls)).startswith("/static/photos/")
+    assert [i["photo_filename"] for i in items] == ["113-1.jpg", "113-2.jpg"]
+    assert len(copies) == 1
+    assert [p.name for p in settings.PHOTOS_DIR.iterdir()] == [urls.pop().rsplit("/", 1)[-1]]
+
+    with Session() as db:
+        refs = db.query(PhotoRef).order_by(PhotoRef.order_id).all()
+        assert [r.order_id for r in refs] == ["113-1", "113-2"]
+        assert len({r.sha256 for r in refs}) == 1
+
+
+def test_reingest_is_reference_update_only(env):
+    copies, Session = env
+    first = _ingest(_report("113-1"))
+    second = _ingest(_report("113-1", "113-3"))
+    assert len(copies) == 1
+    assert {i["photo_asset_url"] for i in second} == {first[0]["photo_asset_url"]}
+    with Session() as db:
+        assert db.query(PhotoRef).count() == 2
+
+
+def test_s3_uploads_each_blob_once(env, monkeypatch):
+    s3 = FakeS3()
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "s3")
+    import app.routers.ingest_amazon as ia
+    monkeypatch.setattr(ia, "get_storage", lambda: s3)
+
+    items = _ingest(_report("113-1", "113-2"))
+    photo_puts = [k for k in s3.puts if k.startswith("photos/")]
+    assert len(photo_puts) == 1
+    assert items[0]["photo_asset_url"] == f"https://s3.test/{photo_puts[0]}?sig=x"
+
+    # A fresh process: nothing remembered in memory, the reference index
+    # alone says the blob is already there, so no HEAD and no upload.
+    monkeypatch.setattr(photo_store, "_uploaded", set())
+    s3.heads.clear()
+    _ingest(_report("113-1", "113-2"))
+    assert [k for k in s3.puts if k.startswith("photos/")] == photo_puts
+    assert s3.heads == []
@@ -0,0 +1,108 @@
+from pathlib import Path
+import json
+import threading
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import IngestItem
+from app.packer.grouping import BedFiller, plan_beds
+from app.settings import settings
+from app.utils import job_paths
+
+client = TestClient(app)
+
+HEADER = "\t".join(["amazon-order-id", "sku", "quantity", "customized-url"]) + "\n"
+
+
+def _report(n: int) -> str:
+    return HEADER + "".join("\t".join([f"113-{i}", "TEST-PIPE", "1", f"https://h/{i}.zip"]) + "\n" for i in range(n))
+
+
+@pytest.mark.parametrize("grouped", [True, False])
+def test_bed_filler_matches_plan_beds(grouped):
+    colours = ["Gold", "Silver", None, "Gold", "Copper", "Gold", "Silver"] * 5
+    items = [IngestItem(order_ref=f"o{i}", colour=c) for i, c in enumerate(colours)]
+    filler = BedFiller(lambda key: 4, grouped=grouped)
+    beds = [bed for it in items if (bed := filler.add("k", it)) is not None]
+    assert all(len(b) == 4 for _k, _m, b in beds)  # only full beds before the input ends
+    beds += filler.flush()
+
+    expected = plan_beds(items, 4, grouped=grouped).beds
+    as_refs = lambda bs: sorted((m, [i.order_ref for i in b]) for m, b in bs)
+    assert as_refs((m, b) for _k, m, b in beds) == as_refs(expected)
+
+
+def test_bed_filler_without_capacity_holds_until_flush():
+    filler = BedFiller(lambda key: None)
+    assert all(filler.add("k", IngestItem(order_ref=str(i))) is None for i in range(30))
+    [(key, material, bed)] = filler.flush()
+    assert (key, material, len(bed)) == ("k", "unspecified", 30)
+
+
+@pytest.fixture
+def env(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "JOBS_DIR", tmp_path / "data" / "jobs")
+    monkeypatch.setattr(settings, "DOWNLOAD_TMP_DIR", tmp_path / "dl")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "ALLOW_EXTERNAL_DOWNLOADS", True)
+    monkeypatch.setattr(settings, "DOWNLOAD_CONCURRENCY", 4)
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 0)
+    import app.routers.ingest_amazon as ia
+    import app.routers.pipeline as pl
+
+    first_bed = threading.Event()
+    seen = {}
+
+    def slow_tail_download(url: str, dest_path: Path, *, timeout: int, user_agent: str, retries: int = 3) -> Path:
+        n = int(url.rsplit("/", 1)[-1][:-4])
+        if n == 19:
+            # The last row only arrives once a bed has been rendered
+            seen["bed_before_last_download"] = first_bed.wait(timeout=10)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(dest_path, "w") as zf:
+            zf.writestr("c.json", json.dumps({"line_1": f"Name {n}"}))
+        return dest_path
+
+    real_run_batch = pl.run_batch
+
+    def run_batch(key, items, cfg):
+        out = real_run_batch(key, items, cfg)
+        first_bed.set()
+        return out
+
+    monkeypatch.setattr(ia, "download_zip", slow_tail_download)
+    monkeypatch.setattr(pl, "run_batch", run_batch)
+    return seen
+
+
+def test_pipeline_renders_full_beds_while_downloads_continue(env):
+    resp = client.post("/api/jobs/pipeline", json={"text": _report(20)})
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert env["bed_before_last_download"] is True
+
+    assert len(body["items"]) == 20 and body["held"] == []
+    assert [b["items"] for b in body["beds"]] == [9, 9, 2]
+    assert {b["processor"] for b in body["beds"]} == {"text_only_v1"}
+    assert body["timings"]["first_bed_s"] <= body["timings"]["ingest_s"]
+
+    # Each bed is its own batch run with its own artifacts
+    csvs = [u for u in body["artifacts"] if u.endswith("batch.csv")]
+    assert len(csvs) == 3 and len(set(csvs)) == 3
+    rendered = "".join(job_paths.local_path(settings.DATA_DIR, u.removeprefix("/static/")).read_text() for u in csvs)
+    assert all(f"Name {n}" in rendered for n in range(20))
+    assert body["ingest_id"]
+
+
+def test_pipeline_holds_items_failing_qa(env):
+    rows = [
+        {"order_id": "113-ok", "template_id": "PLAQUE-140x90-V1", "line_1": "Fine"},
+        {"order_id": "113-late", "template_id": "PLAQUE-140x90-V1", "line_1": "Fine", "line_3": "1990-2099"},
+    ]
+    body = client.post("/api/jobs/pipeline", json={"rows": rows}).json()
+    assert body["held"] == ["113-late"]
+    assert sum(b["items"] for b in body["beds"]) == 1
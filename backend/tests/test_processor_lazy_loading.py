@@ -0,0 +1,64 @@
+from pathlib import Path
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from app.processors import item_router
+
+_BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_router_import_does_not_load_processors():
+    code = textwrap.dedent("""
+        import sys
+        import app.routers.jobs
+        heavy = [m for m in ("app.processors.regular_stake_pdf_v1", "app.processors.photo_stakes_pdf_v1",
+                             "app.processors.text_only_v1", "reportlab.pdfgen.canvas") if m in sys.modules]
+        assert not heavy, heavy
+        from app.processors.item_router import get_batch
+        get_batch("regular_stake_pdf_v1")
+        assert "app.processors.regular_stake_pdf_v1" in sys.modules
+        assert "app.processors.photo_stakes_pdf_v1" not in sys.modules
+    """)
+    env_path = [str(_BACKEND_DIR), *[p for p in sys.path if p]]
+    r = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=_BACKEND_DIR,
+        env={"PYTHONPATH": ":".join(env_path)},
+        capture_output=True,
+        text=True,
+    )
+    assert r.returncode == 0, r.stderr[-2000:]
+
+
+def test_get_batch_imports_once_and_caches():
+    fn1 = item_router.get_batch("text_only_v1")
+    fn2 = item_router.get_batch("text_only_v1")
+    assert fn1 is fn2
+    assert "text_only_v1" in item_router.available_batch()
+
+
+def test_unknown_batch_processor_raises_keyerror():
+    with pytest.raises(KeyError):
+        item_router.get_batch("no_such_processor_v9")
+
+
+def test_entry_point_processor_is_registered(monkeypatch):
+    calls = []
+
+    def fake_run(items, cfg):
+        calls.append(len(items))
+        return "a.svg", "b.csv", []
+
+    class FakeEP:
+        name = "plugin_v1"
+
+        def load(self):
+            return fake_run
+
+    monkeypatch.setattr(item_router, "_entry_points_cache", {"plugin_v1": FakeEP()})
+    monkeypatch.setattr(item_router, "_batch_registry", dict(item_router._batch_registry))
+    assert item_router.get_batch("plugin_v1") is fake_run
+    assert "plugin_v1" in item_router.available_batch()
@@ -0,0 +1,93 @@
+import json
+import os
+
+from app.models import LineField, OrderItem
+from app.settings import settings
+from app.utils.qa import (
+    DATE_FUTURE,
+    OVER_MAXLEN,
+    PHRASE_INCORRECT,
+    PHOTO_MISSING,
+    QaEngine,
+    QaSubject,
+    phrase_rules,
+    qa_item,
+    qa_items,
+    run_qa,
+)
+
+LIMITS = {"PLAQUE-140x90-V1": {"line_1": 30, "line_2": 30, "line_3": 30}, "SMALL": {"line_1": 5}}
+
+SUBJECTS = [
+    QaSubject({"line_1": "In living memory", "line_2": "", "line_3": "1950-2024"}, template_id="PLAQUE-140x90-V1"),
+    QaSubject({"line_1": "Grandad", "line_3": "d. 2030 2031"}, template_id="SMALL"),
+    QaSubject({"line_1": "memory", "line_3": "2026"}, require_photo=True),
+    QaSubject({"line_1": "In", "line_2": "living", "line_3": "memory"}, template_id="unknown", require_photo=True, has_photo=True),
+    QaSubject({}, maxlens={"line_2": 3}),
+]
+
+
+def _codes(ws):
+    return [(w.code, w.field) for w in ws]
+
+
+def test_batch_matches_item_by_item():
+    engine = QaEngine(limits=LIMITS, current_year=2025)
+    batch = engine.run(SUBJECTS)
+    assert batch.items == [engine.run([s]).items[0] for s in SUBJECTS]
+    assert _codes(batch.items[0]) == [(PHRASE_INCORRECT, None), (OVER_MAXLEN, "line_1")]
+    assert _codes(batch.items[1]) == [(DATE_FUTURE, None), (OVER_MAXLEN, "line_1")]
+    assert batch.items[1][0].message == "Future year 2030 detected"
+    # Words split across lines still read as one phrase, but never across items
+    assert _codes(batch.items[2]) == [(DATE_FUTURE, None), (PHOTO_MISSING, None)]
+    assert _codes(batch.items[3]) == [(PHRASE_INCORRECT, None)]
+    assert _codes(batch.items[4]) == [(OVER_MAXLEN, "line_2")]
+
+
+def test_report_groups_by_code_and_item():
+    report = QaEngine(limits=LIMITS, current_year=2025).run(SUBJECTS)
+    assert report.by_code() == {
+        PHRASE_INCORRECT: [0, 3],
+        OVER_MAXLEN: [0, 1, 4],
+        DATE_FUTURE: [1, 2],
+        PHOTO_MISSING: [2],
+    }
+    assert report.errors() == [1, 2]
+    assert len(report.flat()) == sum(len(ws) for ws in report.items)
+
+
+def test_run_qa_and_qa_item_keep_their_output():
+    lines = {"line_1": "in LIVING memory", "line_2": "x" * 31, "line_3": "2026"}
+    assert _codes(run_qa(lines, template_maxlens={"line_1": 30, "line_2": 30}, current_year=2025)) == [
+        (PHRASE_INCORRECT, None), (DATE_FUTURE, None), (OVER_MAXLEN, "line_2"),
+    ]
+    assert _codes(run_qa({"line_1": "ok"}, template_maxlens=None, current_year=2025)) == []
+
+    items = [
+        OrderItem(template_id="T", lines=[LineField(id="line_1", value="Hello")]),
+        OrderItem(template_id="T", lines=[LineField(id="line_1", value="Hi")], requires_photo=True),
+    ]
+    template = {"maxLen": 30}
+    assert qa_items(items, template).items == [qa_item(it, template) for it in items]
+
+
+def test_phrase_rules_from_file_reload_on_change(tmp_path, monkeypatch):
+    path = tmp_path / "qa_rules.json"
+    path.write_text(json.dumps({"phrases": [
+        {"code": "SPELLING", "pattern": r"\bgrandad\b", "message": "Spelt 'Granddad' in the catalogue"},
+        {"code": "BANNED_WORD", "pattern": r"\bdarn\b", "message": "Banned word", "severity": "error"},
+    ]}))
+    monkeypatch.setattr(settings, "QA_RULES_PATH", path)
+    report = QaEngine(current_year=2025).run([
+        QaSubject({"line_1": "Grandad"}),
+        QaSubject({"line_1": "In living memory", "line_2": "darn"}),
+    ])
+    assert _codes(report.items[0]) == [("SPELLING", None)]
+    assert _codes(report.items[1]) == [(PHRASE_INCORRECT, None), ("BANNED_WORD", None)]
+    assert report.errors() == [1]
+
+    # A broken file falls back to the built-in rules
+    path.write_text(json.dumps({"phrases": [{"code": "BAD", "pattern": "(", "message": "x"}]}))
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert [r.code for r in phrase_rules()] == [PHRASE_INCORRECT]
@@ -11,6 +11,7 @@ from fastapi.testclient import TestClient
 from app.main import app
 from app.processors import registry as reg
 from app.settings import settings
+from app.utils import job_paths
 
 
 def _make_items(n=3, key_prefix="rose"):
@@ -55,7 +56,7 @@ def test_regular_stake_batch_outputs(tmp_path: Path):
     assert svg_url and csv_url
 
     # Fetch SVG contents
-    svg_path = settings.DATA_DIR / svg_url.lstrip("/static/")
+    svg_path = job_paths.local_path(settings.DATA_DIR, svg_url.lstrip("/static/"))
     assert svg_path.exists(), f"Missing {svg_path}"
     svg = svg_path.read_text(encoding="utf-8")
 
@@ -65,7 +66,7 @@ def test_regular_stake_batch_outputs(tmp_path: Path):
     assert "In loving memory 0" in svg
 
     # CSV row count equals items placed (+1 header)
-    csv_path = settings.DATA_DIR / csv_url.lstrip("/static/")
+    csv_path = job_paths.local_path(settings.DATA_DIR, csv_url.lstrip("/static/"))
     assert csv_path.exists()
     rows = csv_path.read_text(encoding="utf-8").strip().splitlines()
     assert len(rows) == 1 + 3
@@ -75,7 +76,7 @@ def test_regular_stake_batch_outputs(tmp_path: Path):
     assert r2.status_code == 200
     data2 = r2.json()
     svg_url2 = next((a for a in data2.get("artifacts", []) if a.endswith("/bed_1.svg")), None)
-    svg_path2 = settings.DATA_DIR / svg_url2.lstrip("/static/")
+    svg_path2 = job_paths.local_path(settings.DATA_DIR, svg_url2.lstrip("/static/"))
     assert svg_path2.exists()
     assert svg_path.read_bytes() == svg_path2.read_bytes()
 
@@ -96,12 +97,12 @@ def test_text_only_batch_outputs(tmp_path: Path):
     csv_url = next((a for a in arts if a.endswith("/batch.csv")), None)
     assert svg_url and csv_url
 
-    svg_path = settings.DATA_DIR / svg_url.lstrip("/static/")
+    svg_path = job_paths.local_path(settings.DATA_DIR, svg_url.lstrip("/static/"))
     assert svg_path.exists()
     svg = svg_path.read_text(encoding="utf-8")
     assert "In loving memory 0" in svg
 
-    csv_path = settings.DATA_DIR / csv_url.lstrip("/static/")
+    csv_path = job_paths.local_path(settings.DATA_DIR, csv_url.lstrip("/static/"))
     rows = csv_path.read_text(encoding="utf-8").strip().splitlines()
     assert len(rows) == 1 + 3
 
@@ -109,5 +110,5 @@ def test_text_only_batch_outputs(tmp_path: Path):
     r2 = client.post("/api/jobs/generate", json=payload)
     assert r2.status_code == 200
     svg_url2 = next((a for a in r2.json().get("artifacts", []) if a.endswith("/bed_1.svg")), None)
-    svg_path2 = settings.DATA_DIR / svg_url2.lstrip("/static/")
+    svg_path2 = job_paths.local_path(settings.DATA_DIR, svg_url2.lstrip("/static/"))
     assert svg_path.read_bytes() == svg_path2.read_bytes()
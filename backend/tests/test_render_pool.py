@@ -0,0 +1,148 @@
+from pathlib import Path
+import multiprocessing
+import sys
+import threading
+import time
+
+import pytest
+
+from app.models import OrderItem, LineField
+from app.processors import render_pool
+from app.settings import settings
+from app.utils import job_paths
+
+
+def _items(n=2):
+    return [OrderItem(template_id="PLAQUE-140x90-V1", order_ref=f"o{i}", lines=[LineField(id="line_1", value=f"Name {i}")]) for i in range(n)]
+
+
+@pytest.fixture
+def isolated(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    yield tmp_path
+    render_pool.shutdown()
+
+
+def test_in_process_when_workers_disabled(isolated, monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 0)
+    cfg = {"job_id": "j0", "output_dir": isolated / "out"}
+    svg_url, csv_url, _ = render_pool.run_batch("text_only_v1", _items(), cfg)
+    assert svg_url.endswith("bed_1.svg")
+    assert cfg["bed_plan"]["beds"] == 1
+
+
+def test_worker_round_trip_returns_outputs_and_cfg(isolated, monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 1)
+    cfg = {"job_id": "j1", "output_dir": isolated / "out"}
+    svg_url, csv_url, _ = render_pool.run_batch("text_only_v1", _items(3), cfg)
+    assert csv_url.endswith("batch.csv")
+    # Processor outputs written into cfg in the worker come back to the caller
+    assert cfg["bed_urls"] == [svg_url]
+    # Worker used the parent's (patched) settings
+    assert job_paths.local_path(isolated / "data", "jobs/j1/bed_1.svg").exists()
+
+
+def test_unknown_processor_is_keyerror(isolated, monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 1)
+    with pytest.raises(KeyError):
+        render_pool.run_batch("no_such_processor_v9", _items(), {"job_id": "j", "output_dir": isolated})
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="RLIMIT_AS enforcement is Linux-specific")
+def test_worker_out_of_memory_becomes_render_error(isolated, monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 1)
+    # Far below what an interpreter needs to import the processor
+    monkeypatch.setattr(settings, "RENDER_WORKER_MAX_MB", 16)
+    render_pool.shutdown()
+    with pytest.raises(render_pool.RenderWorkerError):
+        render_pool.run_batch("text_only_v1", _items(), {"job_id": "j2", "output_dir": isolated / "out"})
+    # The API process is unaffected and a fresh pool works again
+    monkeypatch.setattr(settings, "RENDER_WORKER_MAX_MB", 0)
+    svg_url, _, _ = render_pool.run_batch("text_only_v1", _items(), {"job_id": "j3", "output_dir": isolated / "out3"})
+    assert svg_url.endswith("bed_1.svg")
+
+
+def _hang_or_run(key, model, data, cfg, settings_snapshot):
+    # Submitted in place of _run_task; runs in the worker process
+    if cfg.get("hang"):
+        time.sleep(60)
+    return render_pool._run_task(key, model, data, cfg, settings_snapshot)
+
+
+def test_timeout_fails_only_the_hung_job(isolated, monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 1)
+    monkeypatch.setattr(settings, "RENDER_TIMEOUT_S", 3)
+    monkeypatch.setattr(render_pool, "_run_task", _hang_or_run)
+    render_pool.run_batch("text_only_v1", _items(), {"job_id": "warm", "output_dir": isolated / "warm"})
+    reported = render_pool._pool_pids[render_pool._get_pool()]
+
+    results = {}
+
+    def run(name, cfg):
+        try:
+            results[name] = render_pool.run_batch("text_only_v1", _items(), cfg)
+        except Exception as e:
+            results[name] = e
+
+    hung = threading.Thread(target=run, args=("hung", {"job_id": "j4", "output_dir": isolated / "o4", "hang": True}))
+    hung.start()
+    time.sleep(1.5)  # queued behind the hung job on the only worker
+    other = threading.Thread(target=run, args=("other", {"job_id": "j5", "output_dir": isolated / "o5"}))
+    other.start()
+    hung.join(30)
+    other.join(30)
+
+    assert isinstance(results["hung"], render_pool.RenderWorkerError)
+    assert "timed out" in str(results["hung"])
+    # The queued job was resubmitted to the fresh pool, not failed
+    assert results["other"][0].endswith("bed_1.svg")
+    # and the worker stuck on the hung job was terminated
+    old_pids = render_pool._worker_pids(reported)
+    assert old_pids
+    deadline = time.time() + 10
+    while old_pids & {p.pid for p in multiprocessing.active_children()} and time.time() < deadline:
+        time.sleep(0.1)
+    assert not old_pids & {p.pid for p in multiprocessing.active_children()}
+
+
+def test_refused_submits_are_not_retried_forever(isolated, monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 1)
+    pools = []
+
+    class Refusing:
+        def submit(self, *args, **kwargs):
+            raise RuntimeError("cannot schedule new futures after interpreter shutdown")
+
+    def get_pool():
+        pools.append(Refusing())
+        return pools[-1]
+
+    monkeypatch.setattr(render_pool, "_get_pool", get_pool)
+    with pytest.raises(render_pool.RenderWorkerError, match="render pool unavailable"):
+        render_pool.run_batch("text_only_v1", _items(), {"job_id": "j7", "output_dir": isolated / "o7"})
+    assert len(pools) == render_pool._RESUBMITS + 1
+
+
+def test_shutdown_while_queued_is_a_render_error(isolated, monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 1)
+    monkeypatch.setattr(settings, "RENDER_TIMEOUT_S", 30)
+    monkeypatch.setattr(render_pool, "_run_task", _hang_or_run)
+    pool = render_pool._get_pool()
+    for _ in range(2):  # the running call plus the executor's one queued call
+        pool.submit(time.sleep, 2)
+    errors = []
+    t = threading.Thread(target=lambda: errors.append(_catch(lambda: render_pool.run_batch(
+        "text_only_v1", _items(), {"job_id": "j6", "output_dir": isolated / "o6"}))))
+    t.start()
+    time.sleep(0.5)
+    render_pool.shutdown()  # cancels the job still pending
+    t.join(30)
+    assert isinstance(errors[0], render_pool.RenderWorkerError)
+
+
+def _catch(fn):
+    try:
+        return fn()
+    except Exception as e:
+        return e
@@ -0,0 +1,95 @@
+from pathlib import Path
+from types import SimpleNamespace
+import os
+
+import pytest
+
+from app.settings import settings
+from app.utils import storage
+from app.utils.storage import LocalStorage, S3Storage, close_storage, get_storage
+
+
+@pytest.fixture(autouse=True)
+def fresh_storage():
+    close_storage()
+    yield
+    close_storage()
+
+
+def test_backend_is_cached_until_settings_change(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "a")
+    first = get_storage()
+    assert isinstance(first, LocalStorage) and get_storage() is first
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "b")
+    assert get_storage().root == tmp_path / "b"
+
+
+def test_one_pooled_client_per_process(monkeypatch):
+    # Records client construction; stands in for boto3 whether or not it is installed
+    built = []
+
+    class Session:
+        def client(self, service, **kw):
+            built.append(kw)
+            return SimpleNamespace(close=lambda: built.append("closed"))
+
+    monkeypatch.setattr(storage, "boto3", SimpleNamespace(session=SimpleNamespace(Session=Session)))
+    monkeypatch.setattr(storage, "BotoConfig", lambda **kw: kw)
+    monkeypatch.setattr(storage, "TransferConfig", lambda **kw: kw)
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "s3")
+    monkeypatch.setattr(settings, "S3_BUCKET", "b1")
+    monkeypatch.setattr(settings, "S3_MAX_POOL_CONNECTIONS", 50)
+
+    s3 = get_storage()
+    assert all(get_storage() is s3 for _ in range(5))
+    assert len(built) == 1
+    assert built[0]["config"]["max_pool_connections"] == 50
+    assert built[0]["config"]["retries"]["mode"] == "standard"
+    assert s3.transfer_config["multipart_threshold"] == settings.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024
+
+    monkeypatch.setattr(settings, "S3_BUCKET", "b2")
+    assert get_storage().bucket == "b2"
+    assert len(built) == 3 and built[2] == "closed"  # new client built, then the old one closed
+
+
+@pytest.fixture
+def s3_server(monkeypatch):
+    # A local S3-compatible endpoint (moto's server); MinIO works the same way
+    boto3 = pytest.importorskip("boto3")
+    server_mod = pytest.importorskip("moto.server")
+    server = server_mod.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint = f"http://{host}:{port}"
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "s3")
+    monkeypatch.setattr(settings, "S3_BUCKET", "test-bucket")
+    monkeypatch.setattr(settings, "S3_REGION", "us-east-1")
+    monkeypatch.setattr(settings, "S3_ENDPOINT_URL", endpoint)
+    monkeypatch.setattr(settings, "S3_ACCESS_KEY_ID", "test")
+    monkeypatch.setattr(settings, "S3_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setattr(settings, "S3_ADDRESSING_STYLE", "path")
+    monkeypatch.setattr(settings, "S3_MULTIPART_THRESHOLD_MB", 5)
+    monkeypatch.setattr(settings, "S3_MULTIPART_CHUNK_MB", 5)
+    get_storage().client.create_bucket(Bucket="test-bucket")
+    yield get_storage()
+    server.stop()
+
+
+def test_put_file_single_and_multipart(s3_server: S3Storage, tmp_path: Path):
+    small = tmp_path / "bed_1.svg"
+    small.write_text("<svg/>")
+    big = tmp_path / "bed_1.pdf"
+    big.write_bytes(os.urandom(12 * 1024 * 1024))
+
+    s3_server.put_file("jobs/j1/bed_1.svg", small, content_type="image/svg+xml")
+    s3_server.put_file("jobs/j1/bed_1.pdf", big, content_type="application/pdf")
+
+    head = s3_server.client.head_object(Bucket="test-bucket", Key="jobs/j1/bed_1.svg")
+    assert head["ContentType"] == "image/svg+xml" and "-" not in head["ETag"]
+    head = s3_server.client.head_object(Bucket="test-bucket", Key="jobs/j1/bed_1.pdf")
+    assert head["ContentType"] == "application/pdf"
+    assert head["ETag"].strip('"').endswith("-3")  # uploaded in three parts
+    body = s3_server.client.get_object(Bucket="test-bucket", Key="jobs/j1/bed_1.pdf")["Body"].read()
+    assert body == big.read_bytes()
+    assert s3_server.exists("jobs/j1/bed_1.pdf") and not s3_server.exists("jobs/j1/nope")
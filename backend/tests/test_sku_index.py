@@ -0,0 +1,84 @@
+from pathlib import Path
+import os
+
+import pytest
+
+from app.settings import settings
+from app.utils import sku_map
+
+
+CSV = """SKU,COLOUR,TYPE,DecorationType,Theme
+OM009005L Slate,Slate,Large Metal,Graphic,Heart
+OM009005L Gold,Gold,Large Metal,Graphic,Heart
+OM009005,Black,Regular Stake,Photo,Pet
+OD045004_1Silver,Silver,Regular Stake,Graphic,Pet
+"""
+
+
+@pytest.fixture
+def skulist(tmp_path: Path, monkeypatch):
+    p = tmp_path / "SKULIST.csv"
+    p.write_text(CSV, encoding="utf-8")
+    monkeypatch.setattr(settings, "SKULIST_PATH", p)
+    monkeypatch.setattr(sku_map, "_SKU_CACHE", None)
+    monkeypatch.setattr(sku_map, "_SKU_MTIME", None)
+    monkeypatch.setattr(sku_map, "_INDEX", None)
+    sku_map._load_if_needed()
+    return p
+
+
+def test_exact_and_normalised_lookup(skulist):
+    assert sku_map.get_meta_for_sku("OD045004_1Silver")["COLOUR"] == "Silver"
+    assert sku_map.get_meta_for_sku("  om009005l   slate ")["COLOUR"] == "Slate"
+    assert sku_map.get_meta_for_sku("OM009005LSLATE")["COLOUR"] == "Slate"
+
+
+def test_prefix_match_prefers_first_listed_row(skulist):
+    # Both "om009005l slate" and "om009005l gold" match; the CSV lists Slate first
+    assert sku_map.get_meta_for_sku("OM009005L")["COLOUR"] == "Slate"
+    # An exact key beats a longer prefix match
+    assert sku_map.get_meta_for_sku("OM009005")["COLOUR"] == "Black"
+    assert sku_map.get_meta_for_sku("ZZ-UNKNOWN")["COLOUR"] is None
+    assert sku_map.get_meta_for_sku("")["COLOUR"] is None
+
+
+def test_prefix_index_matches_a_linear_scan():
+    rows = ["ab", "abc2", "abc1", "b", "abd", "xyz-long", "abc"]
+    idx = sku_map.SkuIndex({k: {"SKU": k} for k in rows})
+
+    def scan(prefix: str):
+        hits = [k for k in rows if k.startswith(prefix)]
+        return {"SKU": hits[0]} if hits else {}
+
+    for probe in ["a", "abc", "abc1x", "x", "xy", "xyz-l", "b", "c", "zz"]:
+        expect = idx.exact.get(probe) or scan(probe)
+        assert idx.lookup(probe) == expect, probe
+
+
+def test_lookups_do_not_touch_the_filesystem(skulist, monkeypatch):
+    def boom(*a, **k):
+        raise AssertionError("stat() on lookup")
+
+    monkeypatch.setattr(Path, "stat", boom)
+    monkeypatch.setattr(Path, "exists", boom)
+    assert sku_map.get_meta_for_sku("OM009005L")["COLOUR"] == "Slate"
+
+
+def test_many_matches_single_lookups(skulist):
+    skus = ["OM009005L", "OD045004_1Silver", "nope", "OM009005L"]
+    many = sku_map.get_meta_for_sku_many(skus)
+    assert set(many) == set(skus)
+    for s in skus:
+        assert many[s] == sku_map.get_meta_for_sku(s)
+
+
+def test_reload_publishes_new_index_atomically(skulist):
+    old = sku_map._INDEX
+    skulist.write_text(CSV.replace("Slate,Slate", "Slate,Granite"), encoding="utf-8")
+    st = skulist.stat()
+    os.utime(skulist, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    sku_map._load_if_needed()
+    assert sku_map._INDEX is not old
+    # Readers still holding the old snapshot see consistent old data
+    assert old.lookup("OM009005L")["COLOUR"] == "Slate"
+    assert sku_map.get_meta_for_sku("OM009005L")["COLOUR"] == "Granite"
@@ -0,0 +1,60 @@
+from pathlib import Path
+import os
+
+import pytest
+
+from app.settings import settings
+from app.utils import job_paths, storage
+from app.utils.storage import LocalStorage, publish_file, put_artifact, put_photo_local
+
+
+@pytest.fixture
+def no_read_bytes(monkeypatch):
+    # Publishing must never pull a file into Python memory
+    def refuse(self):
+        raise AssertionError(f"read_bytes({self})")
+    monkeypatch.setattr(Path, "read_bytes", refuse)
+
+
+def test_put_artifact_in_place_is_a_no_op(tmp_path: Path, monkeypatch, no_read_bytes):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(settings, "JOBS_DIR", tmp_path / "jobs")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    out = job_paths.job_dir("abcd1234")
+    out.mkdir(parents=True)
+    (out / "bed_1.pdf").write_text("%PDF")
+    before = os.stat(out / "bed_1.pdf")
+    assert put_artifact("abcd1234", out / "bed_1.pdf") == "/static/jobs/abcd1234/bed_1.pdf"
+    after = os.stat(out / "bed_1.pdf")
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    assert [p.name for p in out.iterdir()] == ["bed_1.pdf"]  # no temp files left
+
+
+def test_link_or_copy(tmp_path: Path, monkeypatch, no_read_bytes):
+    monkeypatch.setattr(settings, "PHOTOS_DIR", tmp_path / "photos")
+    src = tmp_path / "src.csv"
+    src.write_text("a,b\n")
+    local = LocalStorage(tmp_path / "data")
+    local.put_file("jobs/j1/batch.csv", src, content_type="text/csv", link=True)
+    linked = job_paths.local_path(tmp_path / "data", "jobs/j1/batch.csv")
+    assert os.path.samefile(src, linked)
+
+    local.put_file("downloads/o1/batch.csv", src, content_type="text/csv")
+    copied = tmp_path / "data" / "downloads" / "o1" / "batch.csv"
+    assert copied.read_text() == "a,b\n" and not os.path.samefile(src, copied)
+
+    # Replacing an existing file works, and a photo is copied, never linked
+    src.write_text("new")
+    assert publish_file(src, copied) is True and copied.read_text() == "new"
+    assert put_photo_local(src, "p/x.jpg") == "/static/photos/p/x.jpg"
+    assert not os.path.samefile(src, tmp_path / "photos" / "p" / "x.jpg")
+
+
+def test_copy_falls_back_without_copy_file_range(tmp_path: Path, monkeypatch):
+    def unsupported(*args):
+        raise OSError(38, "Function not implemented")
+    monkeypatch.setattr(storage.os, "copy_file_range", unsupported, raising=False)
+    src = tmp_path / "a.bin"
+    src.write_bytes(os.urandom(300_000))
+    assert publish_file(src, tmp_path / "out" / "b.bin")
+    assert (tmp_path / "out" / "b.bin").read_bytes() == src.read_bytes()
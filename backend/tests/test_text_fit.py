@@ -0,0 +1,73 @@
+from reportlab.pdfbase import pdfmetrics
+
+from app.utils.text_fit import fit_text, shrink_to_fit, string_width_mm, wrap_lines, PT_TO_MM
+
+
+def test_width_matches_reportlab_metrics():
+    text = "In loving memory of Joan"
+    expected = pdfmetrics.stringWidth(text, "Helvetica", 12) * PT_TO_MM
+    assert abs(string_width_mm(text, "Helvetica", 12) - expected) < 1e-6
+
+
+def test_unregistered_family_falls_back_to_core_metrics():
+    text = "Forever loved"
+    assert string_width_mm(text, "Times New Roman", 14) == string_width_mm(text, "Times-Roman", 14)
+
+
+def test_wrap_lines_respects_width_and_newlines():
+    text = "Sleep peacefully our beloved mother and grandmother\nxxx"
+    lines = wrap_lines(text, "Times-Roman", 14, 60.0)
+    assert lines[-1] == "xxx"
+    assert len(lines) > 2
+    assert all(string_width_mm(l, "Times-Roman", 14) <= 60.0 for l in lines)
+    assert " ".join(lines[:-1]).split() == text.split("\n")[0].split()
+
+
+def test_overlong_word_is_hard_broken():
+    lines = wrap_lines("W" * 60, "Helvetica", 20, 40.0)
+    assert len(lines) > 1
+    assert "".join(lines) == "W" * 60
+    assert all(string_width_mm(l, "Helvetica", 20) <= 40.0 for l in lines)
+
+
+def test_fit_text_shrinks_to_max_lines():
+    text = "Forever in our hearts, always loved and never forgotten by all the family"
+    at_full = wrap_lines(text, "Times-Roman", 20, 84.0)
+    fit = fit_text(text, "Times-Roman", 84.0, size_pt=20, min_size_pt=8, max_lines=2)
+    assert len(at_full) > 2
+    assert len(fit.lines) <= 2 and not fit.overflow
+    assert 8 <= fit.size_pt < 20
+    # Largest fitting size: one step up no longer fits
+    assert len(wrap_lines(text, "Times-Roman", fit.size_pt + 0.5, 84.0)) > 2
+
+
+def test_fit_text_reports_overflow():
+    fit = fit_text("word " * 80, "Times-Roman", 30.0, size_pt=12, min_size_pt=10, max_lines=2)
+    assert fit.overflow
+    assert fit.size_pt == 10
+    assert len(fit.lines) == 2
+
+
+def test_shrink_to_fit_single_line():
+    name = "Margaret Elizabeth Thompson-Smythe"
+    size = shrink_to_fit(name, "Times-Roman", 100.0, size_pt=30, min_size_pt=8)
+    assert size < 30
+    assert string_width_mm(name, "Times-Roman", size) <= 100.0 + 1e-6
+    assert shrink_to_fit("Jo", "Times-Roman", 100.0, size_pt=30, min_size_pt=8) == 30
+
+
+def test_registering_a_font_replaces_its_fallback_metrics():
+    import os
+    import reportlab
+    from app.utils.text_fit import fit_text, register_font
+
+    text = "Always in our hearts"
+    fallback = string_width_mm(text, "FitTestSerif", 14)
+    assert fallback == string_width_mm(text, "Times-Roman", 14)
+    before = fit_text(text, "FitTestSerif", 60.0, size_pt=14, min_size_pt=8, max_lines=1)
+
+    register_font("FitTestSerif", os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf"))
+    expected = pdfmetrics.stringWidth(text, "FitTestSerif", 14) * PT_TO_MM
+    assert abs(string_width_mm(text, "FitTestSerif", 14) - expected) < 1e-6
+    assert expected != fallback
+    assert fit_text(text, "FitTestSerif", 60.0, size_pt=14, min_size_pt=8, max_lines=1) is not before
@@ -0,0 +1,65 @@
+from pathlib import Path
+import csv
+import xml.etree.ElementTree as ET
+
+from app.models import IngestItem, LineField
+from app.processors import text_only_v1, photo_basic_v1
+from app.settings import settings
+from app.utils.svg_stream import SvgStreamWriter
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def _items(n):
+    return [
+        IngestItem(order_ref=f"o{i}", lines=[LineField(id="line_1", value=f"Name {i} & <family>")])
+        for i in range(n)
+    ]
+
+
+def _run(mod, n, tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    cfg = {"job_id": "job1", "output_dir": tmp_path / "out"}
+    svg_url, csv_url, _ = mod.run(_items(n), cfg)
+    return cfg, svg_url, csv_url
+
+
+def test_streaming_writer_produces_valid_svg(tmp_path: Path):
+    path = tmp_path / "a.svg"
+    with SvgStreamWriter(path, width="10mm", height="10mm") as w:
+        w.start_group(id="g1")
+        w.text("A & B", x="1mm", y="1mm", text_anchor="middle")
+    root = ET.parse(path).getroot()
+    assert root.tag == f"{SVG}svg"
+    t = root.find(f"{SVG}g/{SVG}text")
+    assert t.text == "A & B" and t.get("text-anchor") == "middle"
+
+
+def test_text_only_paginates_within_bed(tmp_path: Path, monkeypatch):
+    n = 40
+    cfg, svg_url, _ = _run(text_only_v1, n, tmp_path, monkeypatch)
+    beds = sorted((tmp_path / "out").glob("bed_*.svg"))
+    per_bed = text_only_v1.BATCH_SIZE
+    assert len(beds) == -(-n // per_bed)
+    assert svg_url.endswith("bed_1.svg")
+    assert len(cfg["bed_urls"]) == len(beds)
+
+    texts = 0
+    for bed in beds:
+        root = ET.parse(bed).getroot()
+        for t in root.iter(f"{SVG}text"):
+            texts += 1
+            assert float(t.get("y").rstrip("mm")) < text_only_v1.BED_H_MM
+    assert texts == n
+
+    rows = list(csv.DictReader((tmp_path / "out" / "batch.csv").open(encoding="utf-8")))
+    assert len(rows) == n
+    assert max(int(r["bed"]) for r in rows) == len(beds)
+    assert max(int(r["cell_row"]) for r in rows) < text_only_v1.ROWS
+
+
+def test_photo_basic_paginates(tmp_path: Path, monkeypatch):
+    cfg, _, _ = _run(photo_basic_v1, 12, tmp_path, monkeypatch)
+    assert cfg["bed_plan"]["beds"] == 2
+    assert (tmp_path / "out" / "bed_2.svg").exists()
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.tsv import TsvRowReader, aiter_tsv_rows, parse_tsv
+
+SAMPLES = [
+    "\ufeffamazon-order-id\tsku\tquantity\r\n113-1\tSKU-A\t1\r\n113-2\tSKU-B\r\n\r\n",
+    "a\tb\nx\ty\tz-extra\n\n  p \t q  \nlast\tno-newline",
+    "h1\th2\r1\tZoë – café\r2\t日本\r",
+    "only\theaders\n",
+    "",
+]
+
+
+class _Upload:
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+
+    async def read(self, n: int = -1) -> bytes:
+        end = len(self._data) if n < 0 else self._pos + n
+        out = self._data[self._pos:end]
+        self._pos += len(out)
+        return out
+
+
+def _expected(text: str):
+    headers, rows = parse_tsv(text)
+    return [dict(zip(headers, r)) for r in rows]
+
+
+async def _collect(data: bytes, chunk_size: int):
+    return [r async for r in aiter_tsv_rows(_Upload(data), chunk_size=chunk_size)]
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64 * 1024])
+def test_chunked_reader_matches_parse_tsv(text: str, chunk_size: int):
+    # Small chunks split CRLF pairs and multi-byte UTF-8 sequences
+    assert asyncio.run(_collect(text.encode("utf-8"), chunk_size)) == _expected(text)
+
+
+def test_reader_holds_only_partial_line():
+    reader = TsvRowReader()
+    assert reader.feed("a\tb\n1\t") == []
+    assert reader.feed("2\n3") == [{"a": "1", "b": "2"}]
+    assert reader.close() == [{"a": "3", "b": ""}]
+
+
+def test_upload_is_parsed_from_chunks():
+    client = TestClient(app)
+    body = "\ufeffamazon-order-id\tsku\tquantity\tcustomized-url\r\n113-7\tABC\t2\t\r\n".encode("utf-8")
+    resp = client.post("/api/ingest/amazon", files={"file": ("report.txt", body, "text/plain")})
+    assert resp.status_code == 200, resp.text
+    (item,) = resp.json()["items"]
+    assert item["order_ref"] == "113-7" and item["quantity"] == 2
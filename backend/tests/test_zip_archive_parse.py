@@ -0,0 +1,73 @@
+from pathlib import Path
+import json
+import zipfile
+
+import pytest
+
+from app.utils.zip_ingest import ZipTooLargeError, parse_archive, parse_personalisation, safe_extract
+
+
+def _make_zip(path: Path) -> Path:
+    data = {
+        "customizationData": {
+            "children": [
+                {"type": "TextCustomization", "inputValue": "In Loving Memory"},
+                {"type": "TextCustomization", "inputValue": "Joan"},
+                {"type": "ImageCustomization", "image": {"imageName": "photo.jpg", "buyerFilename": "IMG_1.jpg"}},
+            ]
+        }
+    }
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("order/personalization.json", json.dumps(data))
+        zf.writestr("order/preview.png", b"\x89PNG preview")
+        zf.writestr("order/photo.jpg", b"\xff\xd8 real photo")
+        zf.writestr("order/notes.bin", b"ignored")
+    return path
+
+
+@pytest.mark.parametrize("inmemory", [0, 1 << 20])
+def test_archive_mode_matches_extract_mode(tmp_path: Path, inmemory: int):
+    zp = _make_zip(tmp_path / "c.zip")
+    expected = parse_personalisation(safe_extract(zp, tmp_path / "extracted", max_mb=5))
+
+    dest = tmp_path / "archive"
+    got, written = parse_archive(zp, dest, max_mb=5, inmemory_max_bytes=inmemory)
+
+    for k in ("line_1", "line_2", "line_3", "graphics_key", "photo_filename", "photo_via"):
+        assert got[k] == expected[k]
+    # Only the chosen photo is written, streamed from the archive
+    assert written == [dest / "photo.jpg"]
+    assert sorted(p.name for p in dest.iterdir()) == ["photo.jpg"]
+    assert got["photo_path"] == dest / "photo.jpg"
+    assert got["photo_path"].read_bytes() == b"\xff\xd8 real photo"
+
+
+def test_archive_mode_keep_members_publishes_what_extract_mode_does(tmp_path: Path):
+    zp = _make_zip(tmp_path / "c.zip")
+    extracted = safe_extract(zp, tmp_path / "extracted", max_mb=5)
+
+    dest = tmp_path / "archive"
+    got, written = parse_archive(zp, dest, max_mb=5, keep_members=True)
+
+    # Same members, same relative paths, same order: the published asset list is unchanged
+    assert [p.relative_to(dest) for p in written] == [p.relative_to(tmp_path / "extracted") for p in extracted]
+    assert [p.read_bytes() for p in written] == [p.read_bytes() for p in extracted]
+    assert got["photo_path"] == dest / "order" / "photo.jpg"
+    assert got["photo"]["path"] == str(dest / "order" / "photo.jpg")
+
+
+def test_archive_mode_without_photo_writes_nothing(tmp_path: Path):
+    zp = tmp_path / "t.zip"
+    with zipfile.ZipFile(zp, "w") as zf:
+        zf.writestr("data.xml", "<root><text1>Hello</text1><graphic>Rose</graphic></root>")
+    got, written = parse_archive(zp, tmp_path / "out", max_mb=5)
+    assert got["line_1"] == "Hello" and got["graphics_key"] == "Rose"
+    assert written == [] and not (tmp_path / "out").exists()
+
+
+def test_archive_mode_enforces_size_limit(tmp_path: Path):
+    zp = tmp_path / "big.zip"
+    with zipfile.ZipFile(zp, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("a.json", "{}" + " " * 2048)
+    with pytest.raises(ZipTooLargeError):
+        parse_archive(zp, tmp_path / "out", max_mb=0)
@@ -6,6 +6,7 @@ export default function OrdersTable(){
   const [loadingIngest, setLoadingIngest] = useState(false);
   const [loadingGen, setLoadingGen] = useState(false);
   const [items, setItems] = useState<IngestItem[]>([]);
+  const [ingestId, setIngestId] = useState<string|undefined>();
   const [warnings, setWarnings] = useState<any[]>([]);
   const [artifacts, setArtifacts] = useState<string[]>([]);
   const [bedPreview, setBedPreview] = useState<string|undefined>();
@@ -18,6 +19,7 @@ export default function OrdersTable(){
       const text = taRef.current?.value || "";
       const res = await ingestAmazon({ text });
       setItems(res.items || []);
+      setIngestId(res.ingest_id || undefined);
       setWarnings(res.warnings || []);
     }catch(e:any){
       alert(e?.message||String(e));
@@ -32,6 +34,7 @@ export default function OrdersTable(){
     try{
       const res = await ingestAmazon({ file: f });
       setItems(res.items || []);
+      setIngestId(res.ingest_id || undefined);
       setWarnings(res.warnings || []);
     }catch(e:any){
       alert(e?.message||String(e));
@@ -74,7 +77,12 @@ export default function OrdersTable(){
     setArtifacts([]);
     setBedPreview(undefined);
     try{
-      const res = await generateJob(toOrderItems(items));
+      let res = ingestId ? await generateJob({ ingest_id: ingestId }) : await generateJob(toOrderItems(items));
+      if(res.status===404 && ingestId){
+        // Session expired server-side: fall back to sending the items
+        setIngestId(undefined);
+        res = await generateJob(toOrderItems(items));
+      }
       if(res.status===422){
         const errs = res.data?.warnings || res.data?.detail?.warnings;
         alert("Errors in items: " + JSON.stringify(errs));
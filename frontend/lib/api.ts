@@ -52,15 +52,18 @@ export async function ingestAmazon(input: { text?: string, file?: File }) {
   }
 }
 
-export async function generateJob(items: any[]) {
+// Pass the items themselves, or the ingest_id from the ingest response
+// (optionally with indexes into its items) to skip re-uploading them.
+export async function generateJob(source: any[] | { ingest_id: string, selection?: number[] }) {
   const url = `${API_BASE}/api/jobs/generate`;
+  const payload = Array.isArray(source) ? { items: source } : source;
   try {
     const res = await fetch(url, {
       method: 'POST',
       headers: { 
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ items, machine_id: 'MUTOH-UJF-461' })
+      body: JSON.stringify({ ...payload, machine_id: 'MUTOH-UJF-461' })
     });
     const data = await res.json().catch(() => ({}));
     return { status: res.status, data };